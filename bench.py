@@ -0,0 +1,187 @@
+"""
+bench.py
+run every mp_* animation in the host simulator at several panel
+geometries and record frames/sec, writes per frame and memory as JSON
+
+    python3 bench.py                         # all scripts, all geometries
+    python3 bench.py -o before.json          # save a run
+    python3 bench.py --compare before.json   # compare a new run against it
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import hostsim
+
+SCRIPTS = ("mp_lines", "mp_random_gamma", "mp_rects", "mp_roundrect", "mp_matrix")
+
+# name -> settings.toml values LedPanel reads
+GEOMETRIES = {
+    "32x32": {"mx_base_width": 32, "mx_base_height": 32, "mx_chain_across": 1, "mx_tile_down": 1},
+    "64x32": {"mx_base_width": 64, "mx_base_height": 32, "mx_chain_across": 1, "mx_tile_down": 1},
+    "128x64": {"mx_base_width": 64, "mx_base_height": 32, "mx_chain_across": 2, "mx_tile_down": 2},
+}
+
+WARMUP_FRAMES = 5  # frames left out of the per-frame averages (startup drawing)
+
+
+def _press_every(period_ns: int):
+    """
+    button input that goes low (pressed) for half of every period
+    """
+    return lambda now_ns: (now_ns // period_ns) % 2 == 1
+
+
+# scripts that only draw on input get their buttons pressed
+INPUTS = {
+    "mp_roundrect": {"BUTTON_DOWN": _press_every(50_000_000)},
+}
+
+
+class FrameSampler:
+    """
+    frame hook: wall time, counters and heap at the end of warmup and
+    at the latest frame
+    """
+
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.warm = None
+        self.last = None
+
+    def __call__(self, sim: hostsim.Simulation) -> None:
+        heap = hostsim.tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        sample = (
+            time.perf_counter_ns(),
+            sim.frames,
+            sim.pixel_writes,
+            sim.palette_writes,
+            heap,
+            sys.getallocatedblocks(),
+        )
+        if sim.frames == WARMUP_FRAMES:
+            self.warm = sample
+        self.last = sample
+
+    def steady(self) -> tuple:
+        """
+        differences between the warmup sample and the latest one
+        (None when the run never got past warmup)
+        """
+        if self.warm is None or self.last[1] <= self.warm[1]:
+            return None
+        return tuple(last - warm for last, warm in zip(self.last, self.warm))
+
+
+def run_case(script: str, geometry: str, frames: int, max_seconds: float) -> dict:
+    """
+    one script at one geometry: a timing run, then a tracemalloc run for memory
+    per-frame numbers only count frames after warmup
+    """
+    settings = GEOMETRIES[geometry]
+    inputs = INPUTS.get(script)
+
+    sampler = FrameSampler(trace_memory=False)
+    timed = hostsim.run_script(
+        script,
+        frames=frames,
+        settings=settings,
+        inputs=inputs,
+        frame_hook=sampler,
+        max_seconds=max_seconds,
+    )
+    case = {
+        "script": script,
+        "geometry": geometry,
+        "frames": timed.frames,
+        "stop_reason": timed.stop_reason,
+        "error": timed.error,
+    }
+    steady = sampler.steady()
+    if steady is None:
+        return case
+    elapsed_ns, steady_frames, pixel_writes, palette_writes, _, _ = steady
+    case["fps"] = round(steady_frames * 1_000_000_000 / elapsed_ns, 2)
+    case["pixel_writes_per_frame"] = round(pixel_writes / steady_frames, 1)
+    case["palette_writes_per_frame"] = round(palette_writes / steady_frames, 1)
+
+    sampler = FrameSampler(trace_memory=True)
+    traced = hostsim.run_script(
+        script,
+        frames=frames,
+        trace_memory=True,
+        settings=settings,
+        inputs=inputs,
+        frame_hook=sampler,
+        max_seconds=max_seconds,
+    )
+    steady = sampler.steady()
+    if steady is not None:
+        _, steady_frames, _, _, heap_growth, blocks = steady
+        # net figures: what each frame leaves allocated, not what it churns through
+        case["heap_growth_per_frame"] = round(heap_growth / steady_frames, 1)
+        case["blocks_per_frame"] = round(blocks / steady_frames, 2)
+    case["peak_memory"] = traced.peak_memory
+    return case
+
+
+def compare(old: dict, new: dict) -> None:
+    """
+    print fps and per-frame write changes between two saved runs
+    """
+    old_cases = {(c["script"], c["geometry"]): c for c in old["cases"]}
+    print(f"{'script':<18}{'geometry':<10}{'fps':>22}{'pixel writes/frame':>28}")
+    for case in new["cases"]:
+        before = old_cases.get((case["script"], case["geometry"]))
+        if before is None:
+            continue
+        ratio = case.get("fps", 0) / before["fps"] if before.get("fps") else float("nan")
+        print(
+            f"{case['script']:<18}{case['geometry']:<10}"
+            f"{before.get('fps', 0):>9} -> {case.get('fps', 0):<9} ({ratio:4.2f}x)"
+            f"{before.get('pixel_writes_per_frame', '-'):>12} -> {case.get('pixel_writes_per_frame', '-')}"
+        )
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    parser = argparse.ArgumentParser(description="benchmark the mp_* scripts in hostsim")
+    parser.add_argument("--scripts", nargs="+", default=list(SCRIPTS))
+    parser.add_argument("--geometries", nargs="+", default=list(GEOMETRIES))
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--max-seconds", type=float, default=20.0)
+    parser.add_argument("-o", "--output", help="write results to this JSON file")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output")
+    args = parser.parse_args()
+
+    results = {
+        "python": platform.python_version(),
+        "numpy": hostsim.np is not None,
+        "frames": args.frames,
+        "cases": [],
+    }
+    for script in args.scripts:
+        for geometry in args.geometries:
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+                case = run_case(script, geometry, args.frames, args.max_seconds)
+            results["cases"].append(case)
+            print(json.dumps(case), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous:
+            compare(json.load(previous), results)
+    elif not args.output:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
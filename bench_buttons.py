@@ -0,0 +1,113 @@
+"""
+bench_buttons.py
+CPU time the buttons take away from rendering in the host simulator:
+Debouncer.update() polled as fast as possible (the old busy loop) or every
+10 ms, against keypad events read every 50 ms, each next to a 60 fps render
+task for SECONDS of virtual time with a button pressed every PRESS_MS
+board costs are modelled (hostsim.DEBOUNCER_UPDATE_NS, KEYPAD_READ_NS)
+
+    python3 bench_buttons.py
+"""
+import hostsim
+
+SECONDS = 10
+FPS = 60
+PRESS_MS = 250  # down for PRESS_MS, up for PRESS_MS
+MODES = (
+    ("Debouncer, busy loop", "debouncer", 0),
+    ("Debouncer every 10 ms", "debouncer", 0.01),
+    ("keypad every 50 ms", "keypad", 0.05),
+)
+
+
+def run(mode: str, interval: float) -> tuple:
+    """
+    (buttons task, render task, runner elapsed ns, presses seen) for one mode
+    """
+    period_ns = PRESS_MS * 1_000_000
+    sim = hostsim.Simulation(
+        frames=SECONDS * FPS,
+        inputs={"BUTTON_DOWN": lambda now_ns: (now_ns // period_ns) % 2 == 0},
+    )
+    with hostsim.install(sim):
+        # imported here so they bind to the simulator's modules
+        # pylint: disable=import-outside-toplevel
+        import board
+        import displayio
+        from digitalio import DigitalInOut, Direction, Pull
+        from adafruit_debouncer import Debouncer
+        from buttons import Buttons
+        from led_panel import LedPanel
+        from tasks import TaskRunner
+
+        panel = LedPanel()
+        display = panel.create_display()
+        bitmap = displayio.Bitmap(panel.matrix.width, panel.matrix.height, 2)
+        palette = displayio.Palette(2)
+        palette[1] = 0xFFFFFF
+        group = displayio.Group()
+        group.append(displayio.TileGrid(bitmap, pixel_shader=palette))
+        display.root_group = group
+        presses = 0
+        column = 0
+
+        if mode == "keypad":
+            buttons = Buttons()
+
+            def read_buttons():
+                nonlocal presses
+                for _, pressed in buttons.events():
+                    presses += pressed
+
+        else:
+            pins = []
+            for name in ("BUTTON_UP", "BUTTON_DOWN"):
+                pin = DigitalInOut(getattr(board, name))
+                pin.direction = Direction.INPUT
+                pin.pull = Pull.UP
+                pins.append(Debouncer(pin))
+
+            def read_buttons():
+                nonlocal presses
+                for switch in pins:
+                    switch.update()
+                    presses += switch.fell
+
+        def render():
+            nonlocal column
+            for y in range(bitmap.height):
+                bitmap[column, y] = 0
+            column = (column + 1) % bitmap.width
+            for y in range(bitmap.height):
+                bitmap[column, y] = 1
+            panel.refresh_now()
+
+        runner = TaskRunner()
+        buttons_task = runner.every("buttons", interval, read_buttons)
+        render_task = runner.every("render", 1 / FPS, render)
+        start = sim.monotonic_ns()
+        try:
+            runner.run()
+        except hostsim.StopSimulation:
+            pass
+        return buttons_task, render_task, sim.monotonic_ns() - start, presses
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    expected = SECONDS * 1000 // (2 * PRESS_MS)
+    for label, mode, interval in MODES:
+        buttons, render, elapsed, presses = run(mode, interval)
+        idle = elapsed - buttons.cpu_ns - render.cpu_ns
+        print(
+            f"{label:>22}: buttons {100 * buttons.cpu_ns / elapsed:6.2f}% cpu "
+            + f"({buttons.steps} checks), render {100 * render.cpu_ns / elapsed:4.1f}% "
+            + f"with {render.late} frames late, worst gap {render.worst_gap_ns / 1_000_000:.1f} ms, "
+            + f"idle {100 * max(0, idle) / elapsed:5.1f}%, {presses} presses seen (~{expected} made)"
+        )
+
+
+if __name__ == "__main__":
+    main()
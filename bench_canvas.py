@@ -0,0 +1,90 @@
+"""
+bench_canvas.py
+two sprites crossing a 4x2 wall of 64x32 panels in the host simulator:
+one wall-sized bitmap vs. VirtualCanvas, comparing the area displayio has
+to refresh each frame (one dirty rectangle per bitmap) and the drawing time
+
+    python3 bench_canvas.py
+"""
+import time
+import hostsim
+
+WALL = {
+    "mx_base_width": 64,
+    "mx_base_height": 32,
+    "mx_chain_across": 4,
+    "mx_tile_down": 2,
+    "mx_bit_depth": 4,
+}
+SPRITE = 4
+FRAMES = 252  # sprites travel the full 256 pixel width
+
+
+def draw_sprite(surface, x: int, y: int, value: int) -> None:
+    """
+    SPRITE x SPRITE square through surface[x, y], so both surfaces do the same writes
+    """
+    for dy in range(SPRITE):
+        for dx in range(SPRITE):
+            surface[x + dx, y + dy] = value
+
+
+def animate(surface, width: int, height: int) -> tuple:
+    """
+    one sprite left to right along the top row of panels, one right to left
+    along the bottom row; returns (total refreshed pixels, total tiles touched,
+    drawing ns) where refreshed pixels sums the frame's dirty rectangles
+    """
+    refreshed = 0
+    tiles = 0
+    elapsed = 0
+    top, bottom = height // 4, height * 3 // 4
+    for frame in range(FRAMES):
+        start = time.monotonic_ns()
+        if frame:
+            draw_sprite(surface, frame - 1, top, 0)
+            draw_sprite(surface, width - SPRITE - frame + 1, bottom, 0)
+        draw_sprite(surface, frame, top, 1)
+        draw_sprite(surface, width - SPRITE - frame, bottom, 2)
+        regions = surface.end_frame()[0]
+        elapsed += time.monotonic_ns() - start
+        for region in regions:
+            if isinstance(region[1], tuple):  # VirtualCanvas: (tile, region)
+                region = region[1]
+                tiles += 1
+            refreshed += (region[2] - region[0]) * (region[3] - region[1])
+    return refreshed, tiles, elapsed
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    sim = hostsim.Simulation(frames=10**9, settings=WALL)
+    with hostsim.install(sim):
+        # imported here so they bind to the simulator's displayio
+        import displayio  # pylint: disable=import-outside-toplevel
+        from canvas import VirtualCanvas  # pylint: disable=import-outside-toplevel
+        from dirty_bitmap import DirtyBitmap  # pylint: disable=import-outside-toplevel
+        from panel_config import load_config  # pylint: disable=import-outside-toplevel
+
+        config = load_config()
+        palette = displayio.Palette(3)
+        composite_ns, plane_ns = hostsim.REFRESH_COST_NS["Matrix Portal M4"]
+        pixel_ns = composite_ns + plane_ns * config.bit_depth
+
+        # max_regions=1: displayio keeps a single dirty rectangle per bitmap
+        single = DirtyBitmap(displayio.Bitmap(config.width, config.height, 3), max_regions=1)
+        canvas = VirtualCanvas(config, palette)
+        for name, surface in (("one bitmap", single), ("VirtualCanvas", canvas)):
+            refreshed, tiles, elapsed = animate(surface, config.width, config.height)
+            tile_note = f", {tiles / FRAMES:.1f} tiles" if tiles else ""
+            print(
+                f"{name:>14}: {refreshed // FRAMES:6} px refreshed per frame{tile_note}, "
+                f"~{refreshed * pixel_ns / FRAMES / 1_000_000:.2f} ms on an M4 (modelled), "
+                f"{elapsed / FRAMES / 1_000:.0f} us host drawing"
+            )
+
+
+if __name__ == "__main__":
+    main()
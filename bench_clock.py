@@ -0,0 +1,101 @@
+"""
+bench_clock.py
+I2C transactions per minute of mp_simpleclock and mp_weather themselves,
+run in the host simulator for SECONDS of virtual time (both refresh once a
+second), then a clock tick on its own: the DS3231 read and the whole HHMMSS
+label laid out every second (as before) against rtc_clock's CachedClock
+and DigitLabels; the tick times only add up hostsim's modelled board costs
+(I2C_TRANSACTION_NS, LABEL_NS_PER_GLYPH), they are not measured on a board
+
+    python3 bench_clock.py
+"""
+import contextlib
+import io
+import hostsim
+
+SECONDS = 600
+SCRIPTS = ("mp_simpleclock", "mp_weather")
+MODES = (("DS3231 read, whole label", False), ("CachedClock, DigitLabels", True))
+
+
+def run_script(script: str) -> tuple:
+    """
+    (I2C transactions per minute, error) of one script in the simulator
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = hostsim.run_script(script, frames=SECONDS)
+    return result.i2c_transactions / (result.frames / 60), result.error
+
+
+def run(cached: bool) -> tuple:
+    """
+    (clock task, I2C transactions, label glyphs laid out)
+    """
+    sim = hostsim.Simulation(frames=SECONDS)
+    with hostsim.install(sim):
+        # imported here so they bind to the simulator's modules
+        # pylint: disable=import-outside-toplevel
+        import displayio
+        from adafruit_bitmap_font import bitmap_font
+        from adafruit_display_text import label
+        from led_panel import LedPanel
+        from rtc_clock import CachedClock, DigitLabels
+        from runtime import Peripherals
+        from tasks import TaskRunner
+
+        panel = LedPanel()
+        display = panel.create_display()
+        group = displayio.Group()
+        display.root_group = group
+        hw = Peripherals()
+        font = bitmap_font.load_font("/fonts/5x7.pcf")
+        glyphs = 0
+        if cached:
+            clock = CachedClock(lambda: hw.ds3231.datetime)
+            text = DigitLabels(font, 6, x=1, y=3)
+            group.append(text.group)
+        else:
+            text = label.Label(font, text="000000")
+            group.append(text)
+
+        def tick():
+            nonlocal glyphs
+            now = clock.now() if cached else hw.ds3231.datetime
+            value = "{:02d}{:02d}{:02d}".format(now[3], now[4], now[5])
+            if cached:
+                before = text.updates
+                text.text = value
+                glyphs += text.updates - before
+            else:
+                text.text = value
+                glyphs += len(value)
+            panel.refresh_now()
+
+        runner = TaskRunner()
+        task = runner.every("clock", 1, tick)
+        try:
+            runner.run()
+        except hostsim.StopSimulation:
+            pass
+    return task, sim.i2c_transactions, glyphs
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    for script in SCRIPTS:
+        rate, error = run_script(script)
+        print(f"{script:>24}: {rate:5.1f} I2C transactions/min" + (f" ({error})" if error else ""))
+    for label, cached in MODES:
+        task, transactions, glyphs = run(cached)
+        minutes = task.steps / 60
+        print(
+            f"{label:>24}: {transactions / minutes:5.1f} I2C transactions/min, "
+            + f"{glyphs / task.steps:.1f} glyphs laid out per tick, modelled tick "
+            + f"{task.cpu_ns / task.slices / 1_000_000:.2f} ms mean, {task.longest_ns / 1_000_000:.2f} ms worst"
+        )
+
+
+if __name__ == "__main__":
+    main()
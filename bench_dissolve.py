@@ -0,0 +1,72 @@
+"""
+bench_dissolve.py
+draws per fill/clear: mp_random_gamma's old rejection sampling vs. Dissolve
+pure Python, runs on the board or on the host
+"""
+import random
+import time
+from dissolve import Dissolve
+
+GEOMETRIES = ((32, 32), (64, 32), (128, 64))
+PASSES = 5
+
+
+def rejection_pass(width: int, height: int, pixels: bytearray, color: int) -> int:
+    """
+    the old fill/clear loop: random (x, y) until every pixel has changed
+    returns the number of random draws taken
+    """
+    remaining = width * height
+    draws = 0
+    while remaining:
+        x = random.randint(0, width - 1)
+        y = random.randint(0, height - 1)
+        draws += 1
+        if pixels[y * width + x] != color:
+            pixels[y * width + x] = color
+            remaining -= 1
+    return draws
+
+
+def dissolve_pass(dissolve: Dissolve, pixels: bytearray, color: int) -> int:
+    """
+    one Dissolve fill/clear, returns the number of LFSR steps taken
+    """
+    width = dissolve.width
+    for x, y in dissolve:
+        pixels[y * width + x] = color
+    return dissolve.steps + 1  # plus the pixel 0 write at the start of the pass
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    random.seed(1)
+    for width, height in GEOMETRIES:
+        pixels = bytearray(width * height)
+        start = time.monotonic_ns()
+        draws = 0
+        for _ in range(PASSES):
+            draws += rejection_pass(width, height, pixels, 1)
+            draws += rejection_pass(width, height, pixels, 0)
+        rejection_ns = time.monotonic_ns() - start
+
+        dissolve = Dissolve(width, height, seed=1)
+        start = time.monotonic_ns()
+        steps = 0
+        for _ in range(PASSES):
+            steps += dissolve_pass(dissolve, pixels, 1)
+            steps += dissolve_pass(dissolve, pixels, 0)
+        dissolve_ns = time.monotonic_ns() - start
+
+        frames = PASSES * 2
+        print(
+            f"{width}x{height} ({width * height} px): "
+            + f"rejection {draws // frames} draws, {rejection_ns / frames / 1_000_000:.1f} ms; "
+            + f"dissolve {steps // frames} draws, {dissolve_ns / frames / 1_000_000:.1f} ms per pass"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+bench_gamma.py
+microbenchmark: fancy.gamma_adjust() per color vs. gamma.Gamma lookup tables
+runs on the board or on the host (pip install adafruit-circuitpython-fancyled)
+"""
+import random
+import time
+import adafruit_fancyled.adafruit_fancyled as fancy
+from gamma import Gamma
+
+PALETTE_SIZE = 253  # the mp_random_gamma palette refresh
+ROUNDS = 20
+
+
+def bench_fancy(colors: list, gamma_value: float) -> int:
+    """
+    correct every color with fancy.gamma_adjust, return elapsed ns
+    """
+    palette = [0] * len(colors)
+    start = time.monotonic_ns()
+    for _ in range(ROUNDS):
+        for i, (r, g, b) in enumerate(colors):
+            palette[i] = fancy.gamma_adjust(
+                fancy.CRGB(r, g, b), gamma_value=gamma_value
+            ).pack()
+    return time.monotonic_ns() - start
+
+
+def bench_lut(colors: list, gamma_value: float) -> int:
+    """
+    correct every color with one Gamma.correct_palette call, return elapsed ns
+    (table construction is included in the timing)
+    """
+    palette = [0] * len(colors)
+    start = time.monotonic_ns()
+    corrector = Gamma(gamma_value)
+    for _ in range(ROUNDS):
+        corrector.correct_palette(colors, palette)
+    return time.monotonic_ns() - start
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    random.seed(1)
+    colors = [
+        (random.randint(1, 255), random.randint(1, 255), random.randint(1, 255))
+        for _ in range(PALETTE_SIZE)
+    ]
+    for gamma_value in (1.8, 2.2, 2.8):
+        fancy_ns = bench_fancy(colors, gamma_value)
+        lut_ns = bench_lut(colors, gamma_value)
+        print(
+            f"gamma {gamma_value}: fancy {fancy_ns / ROUNDS / 1_000_000:.3f} ms, "
+            + f"lut {lut_ns / ROUNDS / 1_000_000:.3f} ms per {PALETTE_SIZE}-color palette "
+            + f"({fancy_ns / lut_ns:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
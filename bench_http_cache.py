@@ -0,0 +1,39 @@
+"""
+bench_http_cache.py
+mp_weather restarted in the host simulator with the same nvm: a cold boot,
+then reboots a few minutes, half an hour and days later, counting the HTTP
+requests each one makes against hostsim's canned ip-api/OpenWeatherMap routes
+
+    python3 bench_http_cache.py
+"""
+import contextlib
+import io
+import hostsim
+
+# (label, seconds after the cold boot)
+BOOTS = (
+    ("cold boot", 0),
+    ("5 minutes later", 5 * 60),
+    ("30 minutes later", 30 * 60),
+    ("4 days later", 4 * 24 * 60 * 60),
+)
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    nvm = bytearray(hostsim.NVM_SIZE)
+    for label, offset in BOOTS:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = hostsim.run_script("mp_weather", frames=3, nvm=nvm, clock_offset=offset)
+        stats = [line for line in output.getvalue().splitlines() if line.startswith("http cache:")]
+        print(
+            f"{label:>17}: {result.http_requests} requests, "
+            + f"{stats[-1] if stats else 'no cache stats'}, error {result.error}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+bench_http_session.py
+ROUNDS of mp_weather's two fetches plus set_ds3231's time fetch in the host
+simulator: a new wifi manager for every fetch (what set_ds3231 used to do)
+against one HttpSession that keeps the sockets open between requests,
+counting connections and the virtual time each request takes
+(hostsim.HTTP_CONNECT_NS per new connection, HTTP_WAIT_NS per request)
+--local runs HttpSession against a real HTTP server on 127.0.0.1 as well,
+with keep-alive and with a new connection per request
+
+    python3 bench_http_session.py [--local]
+"""
+import argparse
+import http.client
+import http.server
+import json
+import threading
+import time
+import hostsim
+from http_session import HttpSession
+
+ROUNDS = 10
+URLS = (
+    "http://ip-api.com/json/",
+    "https://api.openweathermap.org/data/2.5/weather?lat=47.6&lon=-122.3&appid=x&units=imperial",
+    "http://worldtimeapi.org/api/ip",
+)
+LOCAL_REQUESTS = 200
+
+
+def run_sim(shared: bool) -> tuple:
+    """
+    (connections, requests, mean ms per request, session stats) in the simulator
+    """
+    sim = hostsim.Simulation(frames=1)
+    with hostsim.install(sim):
+        from runtime import create_wifi_m4  # pylint: disable=import-outside-toplevel
+
+        secrets = {"ssid": "hostsim", "password": "hostsim"}
+        session = HttpSession(create_wifi_m4(secrets)) if shared else None
+        start = sim.monotonic_ns()
+        for _ in range(ROUNDS):
+            for url in URLS:
+                if shared:
+                    with session.get(url) as response:
+                        response.json()
+                else:
+                    create_wifi_m4(secrets).get(url).json()  # never closed
+        elapsed = sim.monotonic_ns() - start
+    requests = ROUNDS * len(URLS)
+    return (
+        sim.http_connections,
+        sim.http_requests,
+        elapsed / requests / 1_000_000,
+        session.stats() if shared else "",
+    )
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    body = json.dumps(hostsim.DEFAULT_ROUTES["http://ip-api.com/json/"]).encode()
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class _LocalResponse:
+    """
+    the parts of adafruit_requests.Response HttpSession uses, over http.client
+    """
+
+    def __init__(self, response, connection, keep_alive: bool):
+        self._response = response
+        self._connection = connection
+        self._keep_alive = keep_alive
+        self.status_code = response.status
+        self.headers = dict(response.getheaders())
+
+    @property
+    def content(self) -> bytes:
+        return self._response.read()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False):
+        while True:
+            chunk = self._response.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        self._response.read()
+        if not self._keep_alive:
+            self._connection.close()
+
+
+class _LocalBackend:
+    """
+    get() over one http.client connection per host, or a new one per request
+    """
+
+    def __init__(self, keep_alive: bool):
+        self.keep_alive = keep_alive
+        self.connections = 0
+        self._open = {}
+
+    def get(self, url: str, **kwargs) -> _LocalResponse:
+        host = url.split("/")[2]
+        connection = self._open.get(host) if self.keep_alive else None
+        if connection is None:
+            connection = http.client.HTTPConnection(host)
+            self.connections += 1
+            if self.keep_alive:
+                self._open[host] = connection
+        connection.request("GET", "/" + url.split("/", 3)[3])
+        return _LocalResponse(connection.getresponse(), connection, self.keep_alive)
+
+
+def run_local(keep_alive: bool) -> tuple:
+    """
+    (connections, requests per second, session stats) against a local server
+    """
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/json/"
+    backend = _LocalBackend(keep_alive)
+    session = HttpSession(backend)
+    start = time.perf_counter()
+    for _ in range(LOCAL_REQUESTS):
+        with session.get(url) as response:
+            response.json()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    return backend.connections, LOCAL_REQUESTS / elapsed, session.stats()
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--local", action="store_true", help="also run against a local HTTP server")
+    args = parser.parse_args()
+    for label, shared in (("wifi manager per fetch", False), ("shared HttpSession", True)):
+        connections, requests, mean_ms, stats = run_sim(shared)
+        print(f"{label:>22}: {requests} requests, {connections} connections, {mean_ms:.0f} ms per request")
+        if stats:
+            print(stats)
+    if args.local:
+        for label, keep_alive in (("local, keep-alive", True), ("local, no keep-alive", False)):
+            connections, rate, stats = run_local(keep_alive)
+            print(f"{label:>22}: {LOCAL_REQUESTS} requests, {connections} connections, {rate:.0f} per second")
+            print(stats)
+
+
+if __name__ == "__main__":
+    main()
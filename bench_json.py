@@ -0,0 +1,112 @@
+"""
+bench_json.py
+peak heap of response.json() against json_fields pulling out only the
+fields mp_weather uses, on hostsim's recorded ip-api and OpenWeatherMap
+responses (CPython objects are bigger than CircuitPython's, so compare
+the ratios, not the bytes); first checks JsonFields against json.loads on
+CASES, split into chunks of every size
+
+    python3 bench_json.py
+"""
+import json
+import time
+import tracemalloc
+import hostsim
+
+CHUNK_SIZE = 256
+PAYLOADS = (
+    ("ip-api", "http://ip-api.com/json/", ("query", "lat", "lon")),
+    (
+        "OpenWeatherMap",
+        "https://api.openweathermap.org/",
+        ("name", "main.temp", "main.humidity", "weather.0.description"),
+    ),
+)
+# (document, paths): escapes, nested lists, numbers right before the end
+CASES = (
+    (
+        rb'{"a\"b": "x\\y\u00e9\"", "s": "plain", "n": -1.5e3}',
+        ('a"b', "s", "n"),
+    ),
+    (
+        rb'{"skip": [[1, "]"], {"k": "}\""}], "list": [[1, 2], [3, [4, 5]]], "m": [0, [7, {"d": [8]}]]}',
+        ("list.1.1", "m.1.1.d", "list.0"),
+    ),
+    (
+        b'{"main":{"temp":52.3,"humidity":81},"ok":true,"none":null,"weather":[{"description":"mist"}],"z":7}',
+        ("main.temp", "main.humidity", "ok", "none", "weather.0.description", "z"),
+    ),
+    (rb'{"x" : "\\", "y":{ "t" : false } , "e" : 12 }', ("x", "y.t", "e")),
+)
+
+
+def _walk(value, path: str):
+    for part in path.split("."):
+        value = value[int(part) if isinstance(value, list) else part]
+    return value
+
+
+def check() -> None:
+    """
+    JsonFields on every case, split at every chunk size, against json.loads
+    """
+    from json_fields import extract  # pylint: disable=import-outside-toplevel
+
+    for document, paths in CASES:
+        whole = json.loads(document)
+        expected = {path: _walk(whole, path) for path in paths}
+        for size in range(1, len(document) + 1):
+            chunks = [document[i : i + size] for i in range(0, len(document), size)]
+            result = extract(chunks, paths)
+            if result != expected:
+                raise SystemExit(f"JsonFields, {size} B chunks of {document}: {result} != {expected}")
+    print(f"JsonFields matches json.loads on {len(CASES)} documents at every chunk size")
+
+
+def measure(read, url: str, payload: dict) -> tuple:
+    """
+    (peak bytes, ns) of read(response) on a fresh Response
+    """
+    response = hostsim.Response(url, payload)
+    tracemalloc.start()
+    start = time.perf_counter_ns()
+    read(response)
+    elapsed = time.perf_counter_ns() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    check()
+    with hostsim.install(hostsim.Simulation(frames=10**9)):
+        from json_fields import extract  # pylint: disable=import-outside-toplevel
+
+        for name, url, fields in PAYLOADS:
+            payload = hostsim.DEFAULT_ROUTES[url]
+
+            def whole(response):
+                return response.json()
+
+            def whole_dumped(response):
+                return json.dumps(response.json())  # what mp_weather printed
+
+            def streamed(response, fields=fields):
+                return extract(response.iter_content(chunk_size=CHUNK_SIZE), fields)
+
+            size = len(json.dumps(payload))
+            print(f"{name}, {size} bytes, fields {', '.join(fields)}:")
+            for label, read in (
+                ("response.json()", whole),
+                ("json() + json.dumps()", whole_dumped),
+                (f"JsonFields, {CHUNK_SIZE} B chunks", streamed),
+            ):
+                peak, elapsed = measure(read, url, payload)
+                print(f"  {label:>26}: peak heap {peak:6} bytes, {elapsed / 1_000:7.1f} us host")
+
+
+if __name__ == "__main__":
+    main()
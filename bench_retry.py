@@ -0,0 +1,85 @@
+"""
+bench_retry.py
+a fetch task like mp_weather's next to a 1 s render task in the host
+simulator, with the network down for OFFLINE seconds of SECONDS: the old
+loop (wifi.reset() and retry every second) against retry.Retry's defaults
+(jittered backoff, 60 s budget per call, breaker after 3 calls give up),
+counting attempts, wifi resets (hostsim.WIFI_CONNECT_NS each), how late
+rendering got and how long after the network came back the fetch got through
+
+    python3 bench_retry.py
+"""
+import contextlib
+import io
+import hostsim
+
+SECONDS = 1200
+OFFLINE = 600
+URL = "http://ip-api.com/json/"
+POLICIES = (
+    ("reset, retry every 1 s", {"base": 1, "factor": 1, "jitter": 0, "budget": None, "trip_after": None, "reset_after": 1}),
+    ("Retry() defaults", {}),
+)
+
+
+def run(options: dict) -> tuple:
+    """
+    (Retry, render task, seconds from the network coming back to the fetch)
+    """
+    payload = hostsim.DEFAULT_ROUTES[URL]
+    sim = hostsim.Simulation(
+        frames=SECONDS,
+        routes={URL: lambda now_ns: OSError("no route to host") if now_ns < OFFLINE * 1_000_000_000 else payload},
+    )
+    with hostsim.install(sim):
+        # imported here so they bind to the simulator's modules
+        # pylint: disable=import-outside-toplevel
+        from led_panel import LedPanel
+        from retry import Retry, RetryError
+        from runtime import create_wifi_m4
+        from tasks import TaskRunner, fetch_json
+
+        panel = LedPanel()
+        panel.create_display()
+        wifi = create_wifi_m4({"ssid": "hostsim", "password": "hostsim"})
+        retry = Retry(**options)
+        fetched_ns = None
+
+        async def fetch(task):
+            nonlocal fetched_ns
+            while True:
+                try:
+                    await fetch_json(task, wifi, URL, retry=retry)
+                    break
+                except RetryError:
+                    await task.sleep(retry.pause())
+            fetched_ns = sim.monotonic_ns() - sim.started_ns
+
+        runner = TaskRunner()
+        runner.spawn("fetch", fetch)
+        render = runner.every("render", 1, panel.refresh_now)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                runner.run()
+        except hostsim.StopSimulation:
+            pass
+    recovered = None if fetched_ns is None else fetched_ns / 1_000_000_000 - OFFLINE
+    return retry, render, recovered, sim.wifi_resets
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    for label, options in POLICIES:
+        retry, render, recovered, resets = run(options)
+        print(
+            f"{label:>22}: {retry.attempts} attempts, {resets} wifi resets, render "
+            + f"{render.late} late (worst gap {render.worst_gap_ns / 1_000_000:.0f} ms), "
+            + f"fetched {recovered:.0f} s after the network came back"
+        )
+        print("  " + retry.stats())
+
+
+if __name__ == "__main__":
+    main()
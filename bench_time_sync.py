@@ -0,0 +1,79 @@
+"""
+bench_time_sync.py
+DAYS of virtual time in the host simulator with a clock drifting against
+hostsim's fake time server (worldtimeapi.org answered from the simulated
+wall clock): set once at boot like set_ds3231.py used to, against
+time_sync.TimeSync in the background, checking the time read every CHECK
+seconds; DS3231s within and well outside their 2 ppm spec, and no DS3231
+at all (rtc.RTC instead)
+
+    python3 bench_time_sync.py
+"""
+import contextlib
+import io
+import hostsim
+
+DAYS = 30
+CHECK = 600
+UTC_OFFSET = -8 * 3600  # hostsim's time server is in UTC-8
+CLOCKS = (
+    ("DS3231 +2 ppm", {"ds3231_drift_ppm": 2.0}),
+    ("DS3231 -20 ppm", {"ds3231_drift_ppm": -20.0}),
+    ("no DS3231, RTC +50 ppm", {"has_ds3231": False, "rtc_drift_ppm": 50.0}),
+)
+
+
+def run(clock_options: dict, background: bool) -> tuple:
+    """
+    (TimeSync, worst error in seconds after the first sync, http requests)
+    """
+    sim = hostsim.Simulation(frames=DAYS * 24 * 3600 // CHECK, **clock_options)
+    with hostsim.install(sim):
+        # imported here so they bind to the simulator's modules
+        # pylint: disable=import-outside-toplevel
+        import time
+        from led_panel import LedPanel
+        from runtime import Peripherals
+        from tasks import TaskRunner
+        from rtc_clock import pick_clock
+        from time_sync import HttpTime, TimeSync
+
+        panel = LedPanel()
+        panel.create_display()
+        hw = Peripherals()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync = TimeSync(pick_clock(hw), HttpTime(hw.http, retry=hw.retry))
+        worst = 0
+
+        def check():
+            nonlocal worst
+            if sync.syncs:
+                # the clocks read whole seconds: half of one has gone by on average
+                error = time.mktime(sync.now()) + 0.5 - (sim.wall_time() + UTC_OFFSET)
+                worst = max(worst, abs(error))
+            panel.refresh_now()
+
+        runner = TaskRunner()
+        runner.spawn("time sync", sync.run if background else sync.sync)
+        runner.every("check", CHECK, check)
+        try:
+            runner.run()
+        except hostsim.StopSimulation:
+            pass
+    return sync, worst, sim.http_requests
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    for label, options in CLOCKS:
+        for mode, background in (("set at boot", False), ("TimeSync", True)):
+            sync, worst, requests = run(options, background)
+            print(f"{label:>22}, {mode:<11}: worst error {worst:5.1f} s over {DAYS} days, {requests} requests")
+            if background:
+                print("  " + sync.stats())
+
+
+if __name__ == "__main__":
+    main()
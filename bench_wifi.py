@@ -0,0 +1,72 @@
+"""
+bench_wifi.py
+the wifi runtime.create_wifi() picks on each board, the M4's ESP32 over SPI
+and the S3's native radio, against hostsim's stand-in server: latency of
+REQUESTS small requests through a shared HttpSession (the first one joins
+the access point and connects) and throughput of a BODY_BYTES response read
+in chunks like fetch_json does, with hostsim's modelled costs for each
+(HTTP_* for the ESP32, NATIVE_HTTP_* for the S3)
+
+    python3 bench_wifi.py
+"""
+import hostsim
+
+MACHINES = (
+    ("M4, ESP32 over SPI", hostsim.DEFAULT_MACHINE),
+    ("S3, native", "Adafruit MatrixPortal S3 with ESP32S3"),
+)
+REQUESTS = 20
+BODY_BYTES = 64 * 1024
+SMALL_URL = "http://ip-api.com/json/"
+LARGE_URL = "http://hostsim.local/large"
+
+
+def run(machine: str) -> tuple:
+    """
+    (wifi class, first request ms, mean ms of the rest, worst ms, bytes per second)
+    """
+    sim = hostsim.Simulation(frames=1, machine=machine, routes={LARGE_URL: ["x" * 60] * (BODY_BYTES // 64)})
+    with hostsim.install(sim):
+        # imported here so they bind to the simulator's modules
+        # pylint: disable=import-outside-toplevel
+        from http_session import HttpSession
+        from runtime import create_wifi
+
+        wifi = create_wifi()
+        http = HttpSession(wifi)
+        times = []
+        for _ in range(REQUESTS):
+            start = sim.monotonic_ns()
+            with http.get(SMALL_URL) as response:
+                response.json()
+            times.append(sim.monotonic_ns() - start)
+        received = 0
+        start = sim.monotonic_ns()
+        with http.get(LARGE_URL) as response:
+            for chunk in response.iter_content(chunk_size=256):
+                received += len(chunk)
+        elapsed = sim.monotonic_ns() - start
+    rest = times[1:]
+    return (
+        type(wifi).__name__,
+        times[0] / 1_000_000,
+        sum(rest) / len(rest) / 1_000_000,
+        max(rest) / 1_000_000,
+        received * 1_000_000_000 / elapsed,
+    )
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    for label, machine in MACHINES:
+        name, first_ms, mean_ms, worst_ms, rate = run(machine)
+        print(
+            f"{label:>18} ({name}): first request {first_ms:.0f} ms, then {mean_ms:.0f} ms "
+            + f"(worst {worst_ms:.0f} ms), {rate / 1024:.0f} KB/s reading {BODY_BYTES // 1024} KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+boot_profile.py
+what the driver libraries cost to import eagerly, one at a time:
+time and gc.mem_free() drop per import, for comparing against the
+lazily imported scripts' "boot profile:" output
+copy to CIRCUITPY and run it as code.py, or `python3 hostsim.py boot_profile`
+"""
+import gc
+from lazy import print_profile, timed_import
+
+# what every mp_*.py script used to import at the top, whether it needed it or not
+DRIVERS = (
+    "neopixel",
+    "adafruit_debouncer",
+    "adafruit_esp32spi.adafruit_esp32spi",
+    "adafruit_esp32spi.adafruit_esp32spi_wifimanager",
+    "adafruit_requests",
+    "adafruit_lis3dh",
+    "adafruit_ds3231",
+    "adafruit_display_text.label",
+    "adafruit_bitmap_font.bitmap_font",
+)
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    gc.collect()
+    print(f"free before imports: {gc.mem_free()} bytes")  # pylint: disable=no-member
+    for name in DRIVERS:
+        try:
+            timed_import(name)
+        except ImportError as error:
+            print(f"{name}: not installed ({error})")
+    print("eager import profile:")
+    print_profile()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+build_mpy.py
+cross-compile the shared modules to .mpy so the board doesn't compile them
+(and need the compiler's heap) on every boot, recording compile time and
+size, then measure in hostsim what loading precompiled modules saves
+run on the host, then copy build/*.mpy to CIRCUITPY in place of the .py files:
+    python3 build_mpy.py                      # mpy-cross from PATH
+    python3 build_mpy.py --mpy-cross PATH     # one matching the board's CircuitPython
+mpy-cross has to come from the same CircuitPython major version as the board
+(https://adafruit-circuit-python.s3.amazonaws.com/index.html?prefix=bin/mpy-cross/)
+"""
+import argparse
+import importlib
+import json
+import os
+import py_compile
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import hostsim
+
+# everything the scripts import from this repo; the mp_*.py scripts
+# themselves stay .py so they can be edited and run as code.py
+SHARED_MODULES = (
+    "lazy",
+    "panel_config",
+    "led_panel",
+    "calibrate",
+    "runtime",
+    "gamma",
+    "palette_tables",
+    "rainbow",
+    "dirty_bitmap",
+    "dissolve",
+    "scheduler",
+    "canvas",
+    "tasks",
+    "buttons",
+    "http_cache",
+    "http_session",
+    "retry",
+    "time_sync",
+    "rtc_clock",
+    "json_fields",
+)
+BUILD_DIR = "build"
+HOST_DIR = "host"  # under BUILD_DIR: CPython bytecode standing in for .mpy in hostsim
+STARTUP_RUNS = 5
+
+
+def find_mpy_cross(path: str = None) -> str:
+    """
+    the mpy-cross to use, or None when there isn't one
+    """
+    return path or os.getenv("MPY_CROSS") or shutil.which("mpy-cross")
+
+
+def compile_mpy(mpy_cross: str, module: str, out_dir: str) -> dict:
+    """
+    module.py -> out_dir/module.mpy, with its time and sizes
+    """
+    source = os.path.join(hostsim.REPO_DIR, module + ".py")
+    target = os.path.join(out_dir, module + ".mpy")
+    start = time.perf_counter_ns()
+    subprocess.run([mpy_cross, "-o", target, source], check=True)
+    return {
+        "module": module,
+        "source_bytes": os.path.getsize(source),
+        "mpy_bytes": os.path.getsize(target),
+        "compile_ms": round((time.perf_counter_ns() - start) / 1_000_000, 2),
+    }
+
+
+def compile_host(module: str, out_dir: str) -> None:
+    """
+    module.py -> out_dir/module.pyc, which CPython imports without the source
+    """
+    py_compile.compile(
+        os.path.join(hostsim.REPO_DIR, module + ".py"),
+        cfile=os.path.join(out_dir, module + ".pyc"),
+        doraise=True,
+    )
+
+
+def measure_startup(compiled_dir: str = None) -> dict:
+    """
+    import every shared module in hostsim, from source (compiled on import,
+    like .py on the board) or from compiled_dir's bytecode (like .mpy);
+    best time and heap of STARTUP_RUNS
+    """
+    best = None
+    for _ in range(STARTUP_RUNS):
+        saved = sys.dont_write_bytecode, sys.pycache_prefix
+        sim = hostsim.Simulation(frames=10**9)
+        with hostsim.install(sim), tempfile.TemporaryDirectory() as empty:
+            # no cached bytecode anywhere: source modules really compile
+            sys.dont_write_bytecode = True
+            sys.pycache_prefix = empty
+            sys.path.insert(0, compiled_dir or hostsim.REPO_DIR)
+            tracemalloc.start()
+            start = time.perf_counter_ns()
+            try:
+                for module in SHARED_MODULES:
+                    importlib.import_module(module)
+                elapsed = time.perf_counter_ns() - start
+                retained, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+                sys.path.pop(0)
+                for module in SHARED_MODULES:
+                    sys.modules.pop(module, None)
+                sys.dont_write_bytecode, sys.pycache_prefix = saved
+        run = {
+            "import_ms": round(elapsed / 1_000_000, 2),
+            "peak_heap": peak,
+            "retained_heap": retained,
+        }
+        if best is None or run["import_ms"] < best["import_ms"]:
+            best = run
+    return best
+
+
+def main() -> None:
+    """
+    ...main.
+    """
+    parser = argparse.ArgumentParser(description="compile the shared modules to .mpy")
+    parser.add_argument("--mpy-cross", help="mpy-cross binary (default: $MPY_CROSS or PATH)")
+    parser.add_argument("-o", "--output", default=BUILD_DIR)
+    args = parser.parse_args()
+
+    host_dir = os.path.join(args.output, HOST_DIR)
+    os.makedirs(host_dir, exist_ok=True)
+    report = {"modules": [], "mpy_cross": find_mpy_cross(args.mpy_cross)}
+
+    if report["mpy_cross"]:
+        version = subprocess.run(
+            [report["mpy_cross"], "--version"], capture_output=True, text=True, check=False
+        ).stdout.strip()
+        report["mpy_cross_version"] = version
+        print(f"compiling with {version}")
+        for module in SHARED_MODULES:
+            built = compile_mpy(report["mpy_cross"], module, args.output)
+            report["modules"].append(built)
+            print(
+                f"  {module + '.py':<20} {built['source_bytes']:7} -> "
+                f"{built['mpy_bytes']:6} bytes  {built['compile_ms']:7.1f} ms"
+            )
+        source_total = sum(m["source_bytes"] for m in report["modules"])
+        mpy_total = sum(m["mpy_bytes"] for m in report["modules"])
+        print(f"  {'total':<20} {source_total:7} -> {mpy_total:6} bytes on CIRCUITPY")
+    else:
+        print("no mpy-cross found (--mpy-cross or $MPY_CROSS), skipping the .mpy build")
+
+    for module in SHARED_MODULES:
+        compile_host(module, host_dir)
+    source = measure_startup()
+    compiled = measure_startup(host_dir)
+    report["startup"] = {"source": source, "compiled": compiled}
+    print(f"hostsim startup, importing {len(SHARED_MODULES)} shared modules (best of {STARTUP_RUNS}):")
+    for name, run in report["startup"].items():
+        print(
+            f"  {name:<9} {run['import_ms']:7.2f} ms, peak heap {run['peak_heap']:8} bytes, "
+            f"retained {run['retained_heap']:8} bytes"
+        )
+    print(
+        f"  precompiled saves {source['import_ms'] - compiled['import_ms']:.2f} ms and "
+        f"{source['peak_heap'] - compiled['peak_heap']} bytes of peak heap"
+    )
+
+    with open(os.path.join(args.output, "report.json"), "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+build_palettes.py
+compile the gamma-corrected palette tables loaded by palette_tables.py
+run on the host, then copy palettes/ to CIRCUITPY:
+    python3 build_palettes.py [output directory]
+"""
+import os
+import struct
+import sys
+from gamma import make_lut
+from palette_tables import BIT_DEPTHS, GAMMA_VALUES, PALETTE_DIR, table_name
+from rainbow import RAINBOW_RGB
+
+PALETTES = {
+    "rainbow": RAINBOW_RGB,
+}
+
+
+def gamma_channel(value: int, gamma_value: float, bit_depth: int) -> int:
+    """
+    gamma-correct one 8-bit channel, then drop the bits
+    the matrix can't show at this bit depth
+    """
+    return make_lut(gamma_value)[value] & (0xFF << (8 - bit_depth)) & 0xFF
+
+
+def compile_table(colors, gamma_value: float, bit_depth: int) -> bytes:
+    """
+    pack a list of (r, g, b) tuples into little-endian 0xRRGGBB words
+    """
+    packed = bytearray()
+    for r, g, b in colors:
+        packed += struct.pack(
+            "<I",
+            (gamma_channel(r, gamma_value, bit_depth) << 16)
+            | (gamma_channel(g, gamma_value, bit_depth) << 8)
+            | gamma_channel(b, gamma_value, bit_depth),
+        )
+    return bytes(packed)
+
+
+def main() -> None:
+    """
+    write every palette at every gamma value and bit depth
+    """
+    out_dir = sys.argv[1] if len(sys.argv) > 1 else PALETTE_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    total = 0
+    for name, colors in PALETTES.items():
+        for gamma_value in GAMMA_VALUES:
+            for bit_depth in BIT_DEPTHS:
+                data = compile_table(colors, gamma_value, bit_depth)
+                path = os.path.join(out_dir, table_name(name, gamma_value, bit_depth))
+                with open(path, "wb") as table_file:
+                    table_file.write(data)
+                total += len(data)
+    print(f"wrote {total} bytes of palette tables to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
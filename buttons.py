@@ -0,0 +1,58 @@
+"""
+buttons.py
+MatrixPortal buttons as debounced press/release events: keypad scans and
+debounces the pins in the background and queues every edge, so scripts
+read a queue now and then instead of polling Debouncer.update() in a loop
+    buttons = Buttons()
+    for name, pressed in buttons.events():   # ("BUTTON_DOWN", True), ...
+        ...
+"""
+# pylint: disable=import-error
+import board
+import keypad
+
+BUTTON_PINS = ("BUTTON_UP", "BUTTON_DOWN")
+
+
+class Buttons:
+    """
+    the named buttons (pressed pulls them low), scanned every interval seconds
+    """
+
+    def __init__(self, names: tuple = BUTTON_PINS, interval: float = 0.020, max_events: int = 16):
+        self.names = names
+        self.keys = keypad.Keys(
+            tuple(getattr(board, name) for name in names),
+            value_when_pressed=False,
+            pull=True,
+            interval=interval,
+            max_events=max_events,
+        )
+        self.held = set()  # names of the buttons down right now
+        self.overflows = 0  # times the queue filled up before it was read
+        self._event = keypad.Event()  # reused, so reading allocates nothing
+
+    def events(self):
+        """
+        (name, pressed) for every press and release since the last call
+        """
+        queue = self.keys.events
+        if queue.overflowed:
+            # the held set can't be trusted after lost events
+            self.overflows += 1
+            queue.clear()
+            self.keys.reset()
+            self.held.clear()
+        while queue.get_into(self._event):
+            name = self.names[self._event.key_number]
+            if self._event.pressed:
+                self.held.add(name)
+            else:
+                self.held.discard(name)
+            yield name, self._event.pressed
+
+    def deinit(self) -> None:
+        """
+        release the pins
+        """
+        self.keys.deinit()
@@ -0,0 +1,144 @@
+"""
+calibrate.py
+pick the deepest rgbmatrix bit depth that still refreshes at the target
+frame rate for this panel geometry, and remember it in nvm
+
+    mx_bit_depth = "auto"     # in settings.toml, LedPanel calls calibrated_bit_depth()
+    mx_calibrate = "True"     # measure again even if nvm has a result
+"""
+# pylint: disable=import-error
+import os
+import struct
+import time
+import displayio
+import framebufferio
+import microcontroller
+from led_panel import make_matrix
+from panel_config import PanelConfig
+
+NVM_OFFSET = 0  # where the result lives in microcontroller.nvm
+NVM_MAGIC = b"mxbd"
+# magic, width, height, tile, serpentine, target fps, bit depth
+NVM_FORMAT = "<4sHHBBHB"
+
+CALIBRATION_FRAMES = 20  # refreshes timed per bit depth
+LOOP_MS = 100  # how long to count main loop iterations per bit depth
+TEST_COLORS = 64
+
+
+def _geometry_key(config: PanelConfig) -> tuple:
+    """
+    the settings a stored result is only valid for
+    """
+    return (
+        config.width,
+        config.height,
+        config.tile_down,
+        int(config.serpentine),
+        config.target_fps,
+    )
+
+
+def load_calibration(config: PanelConfig) -> int:
+    """
+    bit depth stored by an earlier calibration of this geometry, or 0
+    """
+    size = struct.calcsize(NVM_FORMAT)
+    stored = struct.unpack(
+        NVM_FORMAT, bytes(microcontroller.nvm[NVM_OFFSET : NVM_OFFSET + size])
+    )
+    if stored[0] != NVM_MAGIC or stored[1:-1] != _geometry_key(config):
+        return 0
+    return stored[-1] if 1 <= stored[-1] <= 6 else 0
+
+
+def save_calibration(config: PanelConfig, bit_depth: int) -> None:
+    """
+    remember the chosen bit depth so later boots skip calibration
+    """
+    packed = struct.pack(NVM_FORMAT, NVM_MAGIC, *_geometry_key(config), bit_depth)
+    microcontroller.nvm[NVM_OFFSET : NVM_OFFSET + len(packed)] = packed
+
+
+def _test_pattern(width: int, height: int) -> displayio.Group:
+    """
+    a full-panel gradient, so every pixel has to be converted on refresh
+    """
+    bitmap = displayio.Bitmap(width, height, TEST_COLORS)
+    palette = displayio.Palette(TEST_COLORS)
+    for i in range(TEST_COLORS):
+        palette[i] = (i * 4) << 16 | (255 - i * 4) << 8 | (i * 2)
+    for y in range(height):
+        for x in range(width):
+            bitmap[x, y] = (x + y) % TEST_COLORS
+    group = displayio.Group()
+    group.append(displayio.TileGrid(bitmap, pixel_shader=palette))
+    return group
+
+
+def measure(config: PanelConfig, bit_depth: int, pattern: displayio.Group) -> tuple:
+    """
+    (refreshes per second, main loop iterations per second) with the
+    matrix running at one bit depth
+    """
+    displayio.release_displays()
+    matrix = make_matrix(config, bit_depth)
+    display = framebufferio.FramebufferDisplay(matrix, auto_refresh=False)
+    display.root_group = pattern
+
+    display.refresh(target_frames_per_second=None)  # first frame allocates
+    start = time.monotonic_ns()
+    for _ in range(CALIBRATION_FRAMES):
+        display.refresh(target_frames_per_second=None)
+    refresh_fps = CALIBRATION_FRAMES * 1_000_000_000 / (time.monotonic_ns() - start)
+
+    # the matrix interrupt takes CPU time away from the scripts at deeper bit
+    # depths, an empty loop shows how much is left
+    loops = 0
+    end = time.monotonic_ns() + LOOP_MS * 1_000_000
+    while time.monotonic_ns() < end:
+        loops += 1
+
+    display.root_group = None
+    displayio.release_displays()
+    return refresh_fps, loops * 1000 // LOOP_MS
+
+
+def calibrate(config: PanelConfig) -> int:
+    """
+    measure every bit depth and return the deepest one that refreshes
+    at least config.target_fps times a second (1 if none do)
+    """
+    print(f"calibrating bit depth for {config.width}x{config.height} at {config.target_fps} fps")
+    pattern = _test_pattern(config.width, config.height)
+    chosen = 0
+    for bit_depth in range(6, 0, -1):
+        refresh_fps, loop_rate = measure(config, bit_depth, pattern)
+        print(f"  bit depth {bit_depth}: {refresh_fps:7.1f} refreshes/s, {loop_rate} loops/s")
+        if not chosen and refresh_fps >= config.target_fps:
+            chosen = bit_depth
+    if not chosen:
+        print(f"no bit depth reaches {config.target_fps} fps, using 1")
+        chosen = 1
+    return chosen
+
+
+def calibrated_bit_depth(config: PanelConfig) -> int:
+    """
+    the stored bit depth for this geometry, calibrating (and storing) first
+    when there is none or mx_calibrate = "True"
+    """
+    bit_depth = 0
+    if os.getenv("mx_calibrate", "False") != "True":
+        bit_depth = load_calibration(config)
+    if bit_depth:
+        print(f"bit depth {bit_depth} from nvm")
+        return bit_depth
+    start = time.monotonic_ns()
+    bit_depth = calibrate(config)
+    save_calibration(config, bit_depth)
+    print(
+        f"bit depth {bit_depth} chosen in "
+        + f"{(time.monotonic_ns() - start) / 1_000_000_000:.1f} s, saved to nvm"
+    )
+    return bit_depth
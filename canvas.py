@@ -0,0 +1,176 @@
+"""
+canvas.py
+one logical drawing surface over a wall of chained panels, backed by a
+Bitmap and TileGrid per panel so displayio refreshes each changed panel
+on its own instead of the bounding box of every change on the wall
+"""
+# pylint: disable=import-error
+import displayio
+from panel_config import PanelConfig
+
+
+class VirtualCanvas:
+    """
+    config.width x config.height pixels addressed as canvas[x, y]
+
+    tiles are the panels numbered row-major in screen order; on the cable
+    the chain starts at the top-left panel and runs left to right, and with
+    serpentine each following row runs back the other way with its panels
+    mounted upside down (rgbmatrix's positive tile value)
+
+    every write is compared first, and the changed area of each tile is
+    recorded so drawing code can skip tiles that did not change
+    """
+
+    def __init__(self, config: PanelConfig, palette: displayio.Palette):
+        self.width = config.width
+        self.height = config.height
+        self.panel_width = config.base_width
+        self.panel_height = config.base_height
+        self.across = config.chain_across
+        self.down = config.tile_down
+        self.serpentine = config.serpentine
+        self.palette = palette
+        self.bitmaps = []
+        self.group = displayio.Group()
+        for tile in range(self.across * self.down):
+            bitmap = displayio.Bitmap(self.panel_width, self.panel_height, len(palette))
+            x, y = self.tile_origin(tile)
+            self.group.append(displayio.TileGrid(bitmap, pixel_shader=palette, x=x, y=y))
+            self.bitmaps.append(bitmap)
+        self.regions = [None] * len(self.bitmaps)  # per tile (x1, y1, x2, y2), exclusive
+        self.written = 0  # writes asked for this frame
+        self.changed = 0  # writes that actually changed a pixel this frame
+
+    def tile_at(self, x: int, y: int) -> int:
+        """
+        tile holding logical pixel (x, y)
+        """
+        return (y // self.panel_height) * self.across + x // self.panel_width
+
+    def tile_origin(self, tile: int) -> tuple:
+        """
+        logical (x, y) of a tile's top-left pixel
+        """
+        return (tile % self.across) * self.panel_width, (tile // self.across) * self.panel_height
+
+    def chain_position(self, tile: int) -> int:
+        """
+        how far along the cable a tile is, 0 being the panel wired to the board
+        """
+        row, column = divmod(tile, self.across)
+        if self.serpentine and row % 2:
+            column = self.across - 1 - column
+        return row * self.across + column
+
+    def to_physical(self, x: int, y: int) -> tuple:
+        """
+        (chain position, x, y) of logical pixel (x, y) on its panel as mounted
+        """
+        tile = self.tile_at(x, y)
+        tile_x, tile_y = self.tile_origin(tile)
+        x -= tile_x
+        y -= tile_y
+        if self.serpentine and (tile // self.across) % 2:
+            x = self.panel_width - 1 - x
+            y = self.panel_height - 1 - y
+        return self.chain_position(tile), x, y
+
+    def _check(self, x: int, y: int) -> None:
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise IndexError("pixel coordinates out of bounds")
+
+    def __getitem__(self, index: tuple) -> int:
+        x, y = index
+        self._check(x, y)
+        tile = self.tile_at(x, y)
+        tile_x, tile_y = self.tile_origin(tile)
+        return self.bitmaps[tile][x - tile_x, y - tile_y]
+
+    def __setitem__(self, index: tuple, value: int) -> None:
+        x, y = index
+        self._check(x, y)
+        self.written += 1
+        tile = self.tile_at(x, y)
+        tile_x, tile_y = self.tile_origin(tile)
+        bitmap = self.bitmaps[tile]
+        if bitmap[x - tile_x, y - tile_y] == value:
+            return
+        bitmap[x - tile_x, y - tile_y] = value
+        self.changed += 1
+        self._mark(tile, x, y, x + 1, y + 1)
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, value: int) -> None:
+        """
+        set a rectangle, clipped to the canvas, one tile at a time
+        """
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + width, self.width), min(y + height, self.height)
+        if x1 >= x2 or y1 >= y2:
+            return
+        self.written += (x2 - x1) * (y2 - y1)
+        for tile in range(len(self.bitmaps)):
+            tile_x, tile_y = self.tile_origin(tile)
+            tx1, ty1 = max(x1, tile_x), max(y1, tile_y)
+            tx2 = min(x2, tile_x + self.panel_width)
+            ty2 = min(y2, tile_y + self.panel_height)
+            if tx1 >= tx2 or ty1 >= ty2:
+                continue
+            bitmap = self.bitmaps[tile]
+            changed = 0
+            for py in range(ty1 - tile_y, ty2 - tile_y):
+                for px in range(tx1 - tile_x, tx2 - tile_x):
+                    if bitmap[px, py] != value:
+                        bitmap[px, py] = value
+                        changed += 1
+            if changed:
+                self.changed += changed
+                self._mark(tile, tx1, ty1, tx2, ty2)
+
+    def fill(self, value: int) -> None:
+        """
+        fill the whole canvas, marking every tile changed
+        """
+        for tile, bitmap in enumerate(self.bitmaps):
+            bitmap.fill(value)
+            tile_x, tile_y = self.tile_origin(tile)
+            self.regions[tile] = (
+                tile_x,
+                tile_y,
+                tile_x + self.panel_width,
+                tile_y + self.panel_height,
+            )
+        pixels = self.width * self.height
+        self.written += pixels
+        self.changed += pixels
+
+    def _mark(self, tile: int, x1: int, y1: int, x2: int, y2: int) -> None:
+        """
+        grow a tile's changed area to cover a rectangle
+        """
+        region = self.regions[tile]
+        if region is not None:
+            x1, y1 = min(x1, region[0]), min(y1, region[1])
+            x2, y2 = max(x2, region[2]), max(y2, region[3])
+        self.regions[tile] = (x1, y1, x2, y2)
+
+    def changed_tiles(self) -> list:
+        """
+        tiles written since the last end_frame()
+        """
+        return [tile for tile, region in enumerate(self.regions) if region is not None]
+
+    def end_frame(self) -> tuple:
+        """
+        return ([(tile, region), ...], written, changed) for the frame and
+        start a new one
+        """
+        frame = (
+            [(tile, region) for tile, region in enumerate(self.regions) if region is not None],
+            self.written,
+            self.changed,
+        )
+        self.regions = [None] * len(self.bitmaps)
+        self.written = 0
+        self.changed = 0
+        return frame
@@ -0,0 +1,91 @@
+"""
+dirty_bitmap.py
+thin wrapper around a displayio.Bitmap that skips writes which don't
+change a pixel and records the changed areas as a few coalesced rectangles
+hand .bitmap to the TileGrid and draw through the wrapper where draws often
+rewrite a pixel with its own value; every write costs a read and a compare
+on top, so loops that change every pixel they touch should write the bitmap
+directly. displayio tracks its own dirty areas: the regions are for the
+caller, to decide whether a refresh is needed at all
+"""
+
+
+class DirtyBitmap:
+    """
+    displayio.Bitmap wrapper with dirty-rectangle tracking and write counters
+    regions are (x1, y1, x2, y2) with x2/y2 exclusive, the same as
+    displayio's own dirty areas; once more than max_regions are pending
+    they collapse into their bounding box
+    """
+
+    def __init__(self, bitmap, max_regions: int = 8):
+        self.bitmap = bitmap
+        self.width = bitmap.width
+        self.height = bitmap.height
+        self.max_regions = max_regions
+        self.regions = []
+        self.written = 0  # writes asked for this frame
+        self.changed = 0  # writes that actually changed a pixel this frame
+
+    def __getitem__(self, index):
+        return self.bitmap[index]
+
+    def __setitem__(self, index, value: int) -> None:
+        self.written += 1
+        if isinstance(index, tuple):
+            x, y = index
+        else:
+            x, y = index % self.width, index // self.width
+        if self.bitmap[x, y] == value:
+            return
+        self.bitmap[x, y] = value
+        self.changed += 1
+        self._mark(x, y, x + 1, y + 1)
+
+    def fill(self, value: int) -> None:
+        """
+        fill the whole bitmap, counted as one write per pixel
+        """
+        pixels = self.width * self.height
+        self.written += pixels
+        self.changed += pixels
+        self.bitmap.fill(value)
+        self.regions = [(0, 0, self.width, self.height)]
+
+    def _mark(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """
+        add a changed rectangle, merging it into any region it touches
+        """
+        regions = self.regions
+        for i, (rx1, ry1, rx2, ry2) in enumerate(regions):
+            # touching counts as overlapping, so runs of pixels grow one region
+            if x1 <= rx2 and rx1 <= x2 and y1 <= ry2 and ry1 <= y2:
+                regions[i] = (min(x1, rx1), min(y1, ry1), max(x2, rx2), max(y2, ry2))
+                return
+        regions.append((x1, y1, x2, y2))
+        if len(regions) > self.max_regions:
+            self.regions = [
+                (
+                    min(r[0] for r in regions),
+                    min(r[1] for r in regions),
+                    max(r[2] for r in regions),
+                    max(r[3] for r in regions),
+                )
+            ]
+
+    @property
+    def dirty(self) -> bool:
+        """
+        True when something changed since the last end_frame()
+        """
+        return bool(self.regions)
+
+    def end_frame(self) -> tuple:
+        """
+        return (regions, written, changed) for the frame and start a new one
+        """
+        frame = (self.regions, self.written, self.changed)
+        self.regions = []
+        self.written = 0
+        self.changed = 0
+        return frame
@@ -0,0 +1,65 @@
+"""
+dissolve.py
+visit every pixel of a bitmap exactly once, in a scrambled order
+walks a maximal-length Galois LFSR over the pixel indices, so a fill or
+clear is exactly width * height writes with no bookkeeping memory
+"""
+
+# fmt: off
+# maximal-length Galois LFSR feedback masks, indexed by register width in bits
+LFSR_TAPS = {
+     2: 0x3,      3: 0x6,      4: 0xC,      5: 0x14,
+     6: 0x30,     7: 0x60,     8: 0xB8,     9: 0x110,
+    10: 0x240,   11: 0x500,   12: 0x829,   13: 0x100D,
+    14: 0x2015,  15: 0x6000,  16: 0xD008,  17: 0x12000,
+    18: 0x20400, 19: 0x40023, 20: 0x90000,
+}
+# fmt: on
+
+
+class Dissolve:
+    """
+    iterate over every (x, y) of a width x height surface exactly once
+    the same seed always gives the same sequence of passes; each pass
+    starts the LFSR somewhere else on its cycle, so consecutive passes
+    visit the pixels in different orders (a pass that just ran on from
+    where the last one stopped would replay it exactly)
+    """
+
+    def __init__(self, width: int, height: int, seed: int = 1):
+        self.width = width
+        self.height = height
+        self.total = width * height
+        bits = 2
+        while (1 << bits) < self.total:
+            bits += 1
+        if bits not in LFSR_TAPS:
+            raise ValueError(f"surface too large to dissolve: {width}x{height}")
+        self.taps = LFSR_TAPS[bits]
+        self.period = (1 << bits) - 1
+        self.state = (seed % self.period) + 1  # any non-zero state is on the cycle
+        self.jump = self.period * 5 // 8  # moves the start between passes
+        self.steps = 0  # LFSR steps taken by the last pass
+
+    def __iter__(self):
+        width = self.width
+        total = self.total
+        taps = self.taps
+        state = self.state
+        # the LFSR never produces 0, so pixel 0 goes first on every pass
+        yield 0, 0
+        steps = 0
+        remaining = total - 1
+        while remaining:
+            # state runs over 1..period; indices past the surface are skipped
+            index = state
+            if state & 1:
+                state = (state >> 1) ^ taps
+            else:
+                state >>= 1
+            steps += 1
+            if index < total:
+                remaining -= 1
+                yield index % width, index // width
+        self.state = (state - 1 + self.jump) % self.period + 1
+        self.steps = steps
@@ -0,0 +1,77 @@
+"""
+gamma.py
+integer lookup-table gamma correction
+replaces per-color fancy.gamma_adjust() calls; the tables give the same
+results as fancy.gamma_adjust(fancy.CRGB(r, g, b), gamma_value=...).pack()
+"""
+
+_luts = {}  # gamma value -> 256-entry table, shared by every Gamma instance
+
+
+def make_lut(gamma_value: float) -> bytes:
+    """
+    256-entry table of gamma-corrected 8-bit levels
+    (fancyled math: normalize by 255, denormalize by 256 and clip)
+    """
+    lut = _luts.get(gamma_value)
+    if lut is None:
+        lut = bytes(
+            min(255, int(pow(level / 255.0, gamma_value) * 256.0))
+            for level in range(256)
+        )
+        _luts[gamma_value] = lut
+    return lut
+
+
+class Gamma:
+    """
+    gamma corrector for 8-bit RGB colors
+    gamma_value is a single float or an (r, g, b) tuple of per-channel curves
+    """
+
+    def __init__(self, gamma_value=1.8):
+        if isinstance(gamma_value, (int, float)):
+            gamma_value = (gamma_value, gamma_value, gamma_value)
+        self.gamma_value = tuple(gamma_value)
+        self.red = make_lut(self.gamma_value[0])
+        self.green = make_lut(self.gamma_value[1])
+        self.blue = make_lut(self.gamma_value[2])
+
+    def correct(self, r: int, g: int, b: int) -> int:
+        """
+        gamma-correct one color, returned packed as 0xRRGGBB
+        """
+        return (self.red[r] << 16) | (self.green[g] << 8) | self.blue[b]
+
+    def correct_packed(self, color: int) -> int:
+        """
+        gamma-correct one packed 0xRRGGBB color
+        """
+        return (
+            (self.red[(color >> 16) & 0xFF] << 16)
+            | (self.green[(color >> 8) & 0xFF] << 8)
+            | self.blue[color & 0xFF]
+        )
+
+    def correct_palette(self, colors, palette=None, start: int = 0):
+        """
+        gamma-correct a whole palette in one call
+        colors is a sequence of (r, g, b) tuples or packed ints; the results
+        are written into palette (a displayio.Palette or list) from index start,
+        or into a new list when no palette is given
+        """
+        if palette is None:
+            palette = [0] * (start + len(colors))
+        red, green, blue = self.red, self.green, self.blue
+        i = start
+        for color in colors:
+            if isinstance(color, int):
+                palette[i] = (
+                    (red[(color >> 16) & 0xFF] << 16)
+                    | (green[(color >> 8) & 0xFF] << 8)
+                    | blue[color & 0xFF]
+                )
+            else:
+                palette[i] = (red[color[0]] << 16) | (green[color[1]] << 8) | blue[color[2]]
+            i += 1
+        return palette
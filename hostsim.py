@@ -0,0 +1,1780 @@
+"""
+hostsim.py
+headless CPython stand-in for the CircuitPython modules the scripts use
+(board, digitalio, busio, rgbmatrix, framebufferio, displayio and the
+Adafruit drivers), so any mp_*.py main loop can run for N frames on Linux
+frames are composited into a NumPy framebuffer when NumPy is installed,
+or a plain list of packed colors when it isn't
+
+    python3 hostsim.py mp_lines --frames 200 --set mx_chain_across=2 --dump lines.ppm
+
+scripts run with mx_auto_refresh = "False" unless told otherwise, so every
+LedPanel.refresh() call is one frame; time.sleep() advances a virtual clock
+instead of sleeping, so runs take as long as the rendering does
+"""
+import argparse
+import array
+import asyncio
+import gc
+import importlib
+import json
+import os
+import selectors
+import sys
+import time
+import tracemalloc
+import types
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MACHINE = "Adafruit Matrix Portal M4 with samd51j19"
+DEFAULT_SETTINGS = {
+    # a typical settings.toml for one 32x32 panel
+    "mx_base_width": 32,
+    "mx_base_height": 32,
+    "mx_bit_depth": 3,
+    "mx_chain_across": 1,
+    "mx_tile_down": 1,
+    "mx_auto_refresh": "False",
+    "CIRCUITPY_WIFI_SSID": "hostsim",
+    "CIRCUITPY_WIFI_PASSWORD": "hostsim",
+    "ow_apikey": "hostsim",
+}
+NVM_SIZE = 8192
+HEAP_SIZE = 192 * 1024  # roughly what a MatrixPortal M4 has free at boot
+IDLE_STEP_NS = 1_000_000  # virtual time per clock read in an idle busy-wait
+# virtual time a display refresh takes, (ns per pixel to composite, ns per
+# pixel per bit plane for the matrix), by os.uname().machine substring;
+# rough figures that make deeper bit depths and bigger walls cost more
+REFRESH_COST_NS = {
+    "Matrix Portal M4": (150, 60),
+    "MatrixPortal S3": (60, 25),
+}
+# virtual time an HTTP request blocks for: waiting for the headers, then
+# per body byte as it is read (about 100 KB/s over the ESP32's SPI link)
+HTTP_WAIT_NS = 150_000_000
+HTTP_NS_PER_BYTE = 10_000
+# a new connection (DNS, TCP and TLS handshakes) on top of that; closed
+# responses leave their socket open for the next request to the same host
+HTTP_CONNECT_NS = 250_000_000
+ESP32SPI_MAX_SOCKETS = 4  # sockets the ESP32 co-processor firmware has
+# joining the access point, after boot or a wifi.reset()
+WIFI_CONNECT_NS = 2_000_000_000
+# the same through the S3's own radio (wifi, socketpool): no SPI link in the
+# way, so the body arrives about ten times faster and handshakes cost less
+# (rough figures, the server's own latency stays)
+NATIVE_HTTP_WAIT_NS = 100_000_000
+NATIVE_HTTP_NS_PER_BYTE = 1_000
+NATIVE_CONNECT_NS = 100_000_000
+NATIVE_MAX_SOCKETS = 8
+# virtual time a button check takes in Python on the board: one
+# Debouncer.update() (a pin read plus its bookkeeping), or reading keypad's
+# event queue (keypad scans and debounces in the background for free)
+DEBOUNCER_UPDATE_NS = 40_000
+KEYPAD_READ_NS = 5_000
+# one register read or write on the I2C bus (the DS3231's time is 7 bytes
+# at 100 kHz plus the driver's Python), and adafruit_display_text laying a
+# label out again when its text is set (a TileGrid per glyph); rough figures
+I2C_TRANSACTION_NS = 1_500_000
+LABEL_NS_PER_GLYPH = 600_000
+
+# canned responses for the URLs the scripts fetch, keyed by URL prefix
+# (shaped like the real ones, documentation IP and made-up ids); a route can
+# also be an exception to raise, or callable(ns since the simulation
+# started) returning either
+DEFAULT_ROUTES = {
+    "http://ip-api.com/json/": {
+        "status": "success",
+        "country": "United States",
+        "countryCode": "US",
+        "region": "WA",
+        "regionName": "Washington",
+        "city": "Seattle",
+        "zip": "98101",
+        "lat": 47.6062,
+        "lon": -122.3321,
+        "timezone": "America/Los_Angeles",
+        "isp": "Example Networks",
+        "org": "Example Networks LLC",
+        "as": "AS64496 Example Networks LLC",
+        "query": "192.0.2.1",
+    },
+    "https://api.openweathermap.org/": {
+        "coord": {"lon": -122.3321, "lat": 47.6062},
+        "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+        "base": "stations",
+        "main": {
+            "temp": 61.2,
+            "feels_like": 60.1,
+            "temp_min": 57.9,
+            "temp_max": 64.4,
+            "pressure": 1021,
+            "humidity": 72,
+            "sea_level": 1021,
+            "grnd_level": 1012,
+        },
+        "visibility": 10000,
+        "wind": {"speed": 6.91, "deg": 340, "gust": 11.01},
+        "clouds": {"all": 0},
+        "dt": 1704139200,
+        "sys": {"type": 2, "id": 2041694, "country": "US", "sunrise": 1704124391, "sunset": 1704155613},
+        "timezone": -28800,
+        "id": 5809844,
+        "name": "Seattle",
+        "cod": 200,
+    },
+    # a time server answering from the simulated wall clock, see _world_time()
+    "http://worldtimeapi.org/api/ip": lambda elapsed_ns: _world_time(),
+    "https://worldtimeapi.org/api/ip": lambda elapsed_ns: _world_time(),
+}
+
+
+def _world_time() -> dict:
+    """
+    worldtimeapi.org's answer for the simulated wall clock, in UTC-8
+    """
+    now = current().wall_time()
+    raw_offset = -8 * 3600
+    local = time.gmtime(now + raw_offset)
+    return {
+        "abbreviation": "PST",
+        "datetime": time.strftime("%Y-%m-%dT%H:%M:%S", local)
+        + f".{int(now % 1 * 1_000_000):06d}-08:00",
+        "day_of_week": (local.tm_wday + 1) % 7,
+        "day_of_year": local.tm_yday,
+        "dst": False,
+        "dst_offset": 0,
+        "raw_offset": raw_offset,
+        "timezone": "America/Los_Angeles",
+        "unixtime": int(now),
+        "utc_offset": "-08:00",
+    }
+
+
+class StopSimulation(BaseException):
+    """
+    raised inside the script to end a run; BaseException so that the
+    scripts' own except clauses can't swallow it
+    """
+
+
+class Simulation:
+    """
+    state shared by every fake module for one run: the virtual clock,
+    settings, frame limits and counters
+    """
+
+    def __init__(
+        self,
+        frames: int = 100,
+        settings: dict = None,
+        machine: str = DEFAULT_MACHINE,
+        fast_sleep: bool = True,
+        max_seconds: float = 30.0,
+        routes: dict = None,
+        inputs: dict = None,
+        frame_hook=None,
+        nvm: bytearray = None,
+        clock_offset: float = 0.0,
+        has_ds3231: bool = True,
+        ds3231_drift_ppm: float = 0.0,
+        rtc_drift_ppm: float = 0.0,
+    ):
+        self.max_frames = frames
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self.machine = machine
+        self.fast_sleep = fast_sleep
+        self.max_seconds = max_seconds
+        self.routes = dict(DEFAULT_ROUTES)
+        self.routes.update(routes or {})
+        self.inputs = dict(inputs or {})  # pin name -> callable(now_ns) -> level
+        self.frame_hook = frame_hook  # called with the Simulation after every frame
+        self.offset_ns = int(clock_offset * 1_000_000_000)  # virtual time added by skipped sleeps
+        self.clock_offset_ns = self.offset_ns
+        # the clocks the scripts can set: is a DS3231 plugged in, and how
+        # fast it and the microcontroller's rtc.RTC run against the wall clock
+        self.has_ds3231 = has_ds3231
+        self.ds3231_drift_ppm = ds3231_drift_ppm
+        self.rtc_drift_ppm = rtc_drift_ppm
+        # microcontroller.nvm; pass the same one to several runs to keep it across "reboots"
+        self.nvm = bytearray(NVM_SIZE) if nvm is None else nvm
+        self.started_ns = _real_monotonic_ns()
+        self.displays = []
+        # counters
+        self.frames = 0  # refresh calls, manual or emulated auto refresh
+        self.rendered = 0  # frames actually composited
+        self.pixel_writes = 0
+        self.palette_writes = 0
+        self.http_requests = 0
+        self.http_connections = 0
+        self.wifi_resets = 0
+        self.i2c_transactions = 0
+        self.stop_reason = None
+        self.last_activity = -1
+        self.in_event_loop = False  # asyncio waits through the clock, no busy-waits to nudge
+        self.peak_memory = None  # bytes, when run with trace_memory
+
+    # clock
+
+    def monotonic_ns(self) -> int:
+        """
+        real time plus any virtual time from skipped sleeps
+        """
+        return _real_monotonic_ns() + self.offset_ns
+
+    def wall_time(self) -> float:
+        """
+        time.time() on the virtual clock: the true time the fake time server
+        answers with, and the clocks drift from
+        """
+        return time.time() + self.offset_ns / 1_000_000_000
+
+    def sleep(self, seconds: float) -> None:
+        """
+        advance the clock, without waiting unless fast_sleep is off
+        """
+        if self.fast_sleep:
+            self.offset_ns += int(seconds * 1_000_000_000)
+        else:
+            _real_sleep(seconds)
+        self.poll()
+
+    def poll(self) -> None:
+        """
+        called from every clock read: emulates auto refresh and enforces
+        the wall-clock limit for loops that never refresh
+        """
+        for display in self.displays:
+            display.auto_tick()
+        if (_real_monotonic_ns() - self.started_ns) / 1_000_000_000 > self.max_seconds:
+            self.stop("timeout")
+
+    def idle_step(self) -> None:
+        """
+        busy-wait loops poll the clock or the buttons with nothing else
+        happening; nudge virtual time along so they finish quickly too
+        """
+        if not self.fast_sleep or self.in_event_loop:
+            return
+        activity = self.frames + self.pixel_writes + self.palette_writes
+        if activity == self.last_activity:
+            self.offset_ns += IDLE_STEP_NS
+        self.last_activity = activity
+
+    def spend(self, cost_ns: int) -> None:
+        """
+        charge the modelled board cost of an operation to the virtual clock
+        """
+        if self.fast_sleep:
+            self.offset_ns += cost_ns
+
+    def read_input(self, pin, default: bool, now_ns: int = None) -> bool:
+        """
+        level of an input pin: inputs[pin name](now_ns) if one is scripted
+        """
+        source = self.inputs.get(getattr(pin, "name", None))
+        if source is None:
+            return default
+        return bool(source(self.monotonic_ns() if now_ns is None else now_ns))
+
+    def frame_done(self) -> None:
+        """
+        count one frame and end the run when the limit is reached
+        """
+        self.frames += 1
+        if self.frame_hook is not None:
+            self.frame_hook(self)
+        if self.max_frames and self.frames >= self.max_frames:
+            self.stop("frames")
+
+    def stop(self, reason: str) -> None:
+        """
+        end the run from inside the script
+        """
+        self.stop_reason = reason
+        raise StopSimulation(reason)
+
+    # settings.toml
+
+    def getenv(self, key: str, default=None):
+        """
+        CircuitPython's os.getenv: settings.toml values as their types, so a
+        quoted number stays a str; the host environment's are all str
+        """
+        if key in self.settings:
+            return self.settings[key]
+        value = _real_getenv(key)
+        return default if value is None else value
+
+
+_sim = None  # the running Simulation, if any
+_real_monotonic_ns = time.monotonic_ns
+_real_sleep = time.sleep
+_real_getenv = os.getenv
+
+
+def current() -> Simulation:
+    """
+    the running simulation (fake modules call this)
+    """
+    if _sim is None:
+        raise RuntimeError("no simulation is running")
+    return _sim
+
+
+# ---------------------------------------------------------------- displayio
+
+
+def _pack(color) -> int:
+    """
+    accept a packed int or an (r, g, b) sequence, return 0xRRGGBB
+    """
+    if isinstance(color, int):
+        return color & 0xFFFFFF
+    return ((color[0] & 0xFF) << 16) | ((color[1] & 0xFF) << 8) | (color[2] & 0xFF)
+
+
+class Bitmap:
+    """
+    displayio.Bitmap backed by an array('H'), viewed by NumPy without copying
+    """
+
+    def __init__(self, width: int, height: int, value_count: int):
+        if width < 1 or height < 1:
+            raise ValueError("Bitmap must have a width and height")
+        self.width = width
+        self.height = height
+        self.value_count = value_count
+        self._data = array.array("H", bytes(2 * width * height))
+
+    def _index(self, index) -> int:
+        if isinstance(index, tuple):
+            x, y = index
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError("pixel coordinates out of bounds")
+            return y * self.width + x
+        if not 0 <= index < self.width * self.height:
+            raise IndexError("pixel index out of bounds")
+        return index
+
+    def __getitem__(self, index) -> int:
+        return self._data[self._index(index)]
+
+    def __setitem__(self, index, value: int) -> None:
+        if not 0 <= value < self.value_count:
+            raise ValueError("pixel value out of range")
+        self._data[self._index(index)] = value
+        current().pixel_writes += 1
+
+    def fill(self, value: int) -> None:
+        """
+        set every pixel to value
+        """
+        for i in range(len(self._data)):
+            self._data[i] = value
+        current().pixel_writes += len(self._data)
+
+
+class Palette:
+    """
+    displayio.Palette
+    """
+
+    def __init__(self, color_count: int, dither: bool = False):
+        self._colors = [0] * color_count
+        self._transparent = set()
+        self.dither = dither
+
+    def __len__(self) -> int:
+        return len(self._colors)
+
+    def __getitem__(self, index: int) -> int:
+        return self._colors[index]
+
+    def __setitem__(self, index: int, color) -> None:
+        self._colors[index] = _pack(color)
+        current().palette_writes += 1
+
+    def make_transparent(self, index: int) -> None:
+        self._transparent.add(index)
+
+    def make_opaque(self, index: int) -> None:
+        self._transparent.discard(index)
+
+    def is_transparent(self, index: int) -> bool:
+        return index in self._transparent
+
+
+class TileGrid:
+    """
+    displayio.TileGrid
+    """
+
+    def __init__(
+        self,
+        bitmap,
+        *,
+        pixel_shader,
+        width: int = 1,
+        height: int = 1,
+        tile_width: int = None,
+        tile_height: int = None,
+        default_tile: int = 0,
+        x: int = 0,
+        y: int = 0,
+    ):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width or bitmap.width
+        self.tile_height = tile_height or bitmap.height
+        self._tiles = [default_tile] * (width * height)
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+    def __getitem__(self, index) -> int:
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        return self._tiles[index]
+
+    def __setitem__(self, index, tile: int) -> None:
+        if isinstance(index, tuple):
+            index = index[1] * self.width + index[0]
+        self._tiles[index] = tile
+
+    def render(self, fb, ox: int, oy: int, scale: int) -> None:
+        """
+        composite every tile into the framebuffer
+        """
+        per_row = self.bitmap.width // self.tile_width
+        for ty in range(self.height):
+            for tx in range(self.width):
+                tile = self._tiles[ty * self.width + tx]
+                fb.blit(
+                    self.bitmap,
+                    self.pixel_shader,
+                    (tile % per_row) * self.tile_width,
+                    (tile // per_row) * self.tile_height,
+                    self.tile_width,
+                    self.tile_height,
+                    ox + (self.x + tx * self.tile_width) * scale,
+                    oy + (self.y + ty * self.tile_height) * scale,
+                    scale,
+                )
+
+
+class Group:
+    """
+    displayio.Group
+    """
+
+    def __init__(self, *, scale: int = 1, x: int = 0, y: int = 0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._children = []
+
+    def append(self, layer) -> None:
+        self._children.append(layer)
+
+    def insert(self, index: int, layer) -> None:
+        self._children.insert(index, layer)
+
+    def remove(self, layer) -> None:
+        self._children.remove(layer)
+
+    def pop(self, index: int = -1):
+        return self._children.pop(index)
+
+    def index(self, layer) -> int:
+        return self._children.index(layer)
+
+    def __len__(self) -> int:
+        return len(self._children)
+
+    def __getitem__(self, index: int):
+        return self._children[index]
+
+    def __setitem__(self, index: int, layer) -> None:
+        self._children[index] = layer
+
+    def __iter__(self):
+        return iter(self._children)
+
+    def __contains__(self, layer) -> bool:
+        return layer in self._children
+
+    def render(self, fb, ox: int, oy: int, scale: int) -> None:
+        """
+        composite every visible child, back to front
+        """
+        ox += self.x * scale
+        oy += self.y * scale
+        scale *= self.scale
+        for child in self._children:
+            if not getattr(child, "hidden", False):
+                child.render(fb, ox, oy, scale)
+
+
+def _release_displays() -> None:
+    current().displays.clear()
+
+
+class Framebuffer:
+    """
+    the composited panel image, 0xRRGGBB per pixel
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.clear()
+
+    def clear(self) -> None:
+        if np is not None:
+            self.pixels = np.zeros((self.height, self.width), dtype=np.uint32)
+        else:
+            self.pixels = [0] * (self.width * self.height)
+
+    def blit(self, bitmap, palette, sx, sy, sw, sh, dx, dy, scale) -> None:
+        """
+        draw the sw x sh area of bitmap at (sx, sy) to (dx, dy), scaled
+        """
+        colors = palette._colors  # pylint: disable=protected-access
+        transparent = palette._transparent  # pylint: disable=protected-access
+        if np is not None:
+            source = np.frombuffer(bitmap._data, dtype=np.uint16).reshape(  # pylint: disable=protected-access
+                bitmap.height, bitmap.width
+            )[sy : sy + sh, sx : sx + sw]
+            lut = np.array(colors, dtype=np.uint32)
+            image = lut[np.minimum(source, len(colors) - 1)]
+            mask = np.ones(source.shape, dtype=bool)
+            for index in transparent:
+                mask &= source != index
+            if scale > 1:
+                image = image.repeat(scale, 0).repeat(scale, 1)
+                mask = mask.repeat(scale, 0).repeat(scale, 1)
+            x1, y1 = max(dx, 0), max(dy, 0)
+            x2 = min(dx + image.shape[1], self.width)
+            y2 = min(dy + image.shape[0], self.height)
+            if x1 >= x2 or y1 >= y2:
+                return
+            image = image[y1 - dy : y2 - dy, x1 - dx : x2 - dx]
+            mask = mask[y1 - dy : y2 - dy, x1 - dx : x2 - dx]
+            target = self.pixels[y1:y2, x1:x2]
+            target[mask] = image[mask]
+            return
+        data = bitmap._data  # pylint: disable=protected-access
+        for y in range(sh):
+            for x in range(sw):
+                value = data[(sy + y) * bitmap.width + sx + x]
+                if value in transparent:
+                    continue
+                color = colors[value]
+                for py in range(dy + y * scale, dy + (y + 1) * scale):
+                    if 0 <= py < self.height:
+                        for px in range(dx + x * scale, dx + (x + 1) * scale):
+                            if 0 <= px < self.width:
+                                self.pixels[py * self.width + px] = color
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, color: int) -> None:
+        """
+        solid rectangle, clipped to the panel
+        """
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + width, self.width), min(y + height, self.height)
+        if x1 >= x2 or y1 >= y2:
+            return
+        if np is not None:
+            self.pixels[y1:y2, x1:x2] = color
+            return
+        for py in range(y1, y2):
+            for px in range(x1, x2):
+                self.pixels[py * self.width + px] = color
+
+    def get(self, x: int, y: int) -> int:
+        """
+        packed color of one composited pixel
+        """
+        if np is not None:
+            return int(self.pixels[y, x])
+        return self.pixels[y * self.width + x]
+
+    def write_ppm(self, path: str) -> None:
+        """
+        save the framebuffer as a binary PPM image
+        """
+        with open(path, "wb") as ppm:
+            ppm.write(f"P6 {self.width} {self.height} 255\n".encode())
+            for y in range(self.height):
+                row = bytearray()
+                for x in range(self.width):
+                    color = self.get(x, y)
+                    row += bytes(((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF))
+                ppm.write(row)
+
+
+# ------------------------------------------------------- rgbmatrix / framebufferio
+
+
+class RGBMatrix:
+    """
+    rgbmatrix.RGBMatrix: only keeps the geometry and settings
+    """
+
+    def __init__(self, *, width: int, height: int = 0, bit_depth: int, **kwargs):
+        if not 1 <= bit_depth <= 6:
+            raise ValueError("bit_depth must be between 1 and 6 inclusive")
+        self.width = width
+        self.height = height
+        self.bit_depth = bit_depth
+        self.tile = kwargs.get("tile", 1)
+        self.serpentine = kwargs.get("serpentine", True)
+        self.brightness = 1.0
+        self.kwargs = kwargs
+
+    def refresh_cost_ns(self) -> int:
+        """
+        modelled time for one refresh at this size and bit depth
+        """
+        for machine, (composite, per_plane) in REFRESH_COST_NS.items():
+            if machine in current().machine:
+                return self.width * self.height * (composite + per_plane * self.bit_depth)
+        return 0
+
+    def deinit(self) -> None:
+        pass
+
+
+class FramebufferDisplay:
+    """
+    framebufferio.FramebufferDisplay compositing into a Framebuffer
+    with auto_refresh, frames are emulated at 60 fps of (virtual) time
+    """
+
+    AUTO_FPS = 60
+
+    def __init__(self, framebuffer, *, rotation: int = 0, auto_refresh: bool = True):
+        self.framebuffer = framebuffer
+        self.width = framebuffer.width
+        self.height = framebuffer.height
+        self.rotation = rotation
+        self.auto_refresh = bool(auto_refresh)
+        self.root_group = None
+        self.image = Framebuffer(self.width, self.height)
+        self.last_refresh_ns = None
+        self.last_call_ns = None
+        current().displays.append(self)
+
+    def show(self, group) -> None:
+        """
+        pre-9.0 way of setting root_group
+        """
+        self.root_group = group
+
+    def render(self) -> None:
+        """
+        composite the root group into the framebuffer image
+        """
+        sim = current()
+        start = _real_monotonic_ns()
+        self.image.clear()
+        if self.root_group is not None and not self.root_group.hidden:
+            self.root_group.render(self.image, 0, 0, 1)
+        sim.rendered += 1
+        cost = getattr(self.framebuffer, "refresh_cost_ns", lambda: 0)()
+        if sim.fast_sleep and cost:
+            # the refresh takes the modelled time, not however long the host took
+            sim.offset_ns += cost - (_real_monotonic_ns() - start)
+        self.last_refresh_ns = sim.monotonic_ns()
+
+    def refresh(
+        self, *, target_frames_per_second: int = 60, minimum_frames_per_second: int = 0
+    ) -> bool:
+        """
+        same timing rules as displayio's manual refresh: skip the frame
+        when the caller is already late, otherwise wait for the frame slot
+        """
+        sim = current()
+        now = sim.monotonic_ns()
+        if (
+            not self.auto_refresh
+            and self.last_refresh_ns is not None
+            and target_frames_per_second is not None
+        ):
+            frame_ns = 1_000_000_000 // target_frames_per_second
+            since_refresh = now - self.last_refresh_ns
+            if minimum_frames_per_second and since_refresh > (
+                1_000_000_000 // minimum_frames_per_second
+            ):
+                raise RuntimeError("Below minimum frame rate")
+            since_call = now - self.last_call_ns
+            self.last_call_ns = now
+            if since_call > frame_ns:
+                sim.frame_done()
+                return False
+            wait = frame_ns - (since_refresh % frame_ns)
+            if sim.fast_sleep:
+                sim.offset_ns += wait
+            else:
+                _real_sleep(wait / 1_000_000_000)
+        self.last_call_ns = sim.monotonic_ns()
+        self.render()
+        sim.frame_done()
+        return True
+
+    def auto_tick(self) -> None:
+        """
+        background refresh when auto_refresh is on
+        """
+        if not self.auto_refresh:
+            return
+        sim = current()
+        now = sim.monotonic_ns()
+        if self.last_refresh_ns is None or now - self.last_refresh_ns >= 1_000_000_000 // self.AUTO_FPS:
+            self.render()
+            sim.frame_done()
+
+
+# -------------------------------------------------------------- board and I/O
+
+
+class Pin:
+    """
+    board pin, only remembers its name
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"board.{self.name}"
+
+
+class I2C:
+    """
+    busio.I2C / board.I2C()
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.transactions = 0
+
+    def transfer(self) -> None:
+        """
+        one transaction by a driver on this bus, counted and charged
+        """
+        self.transactions += 1
+        sim = current()
+        sim.i2c_transactions += 1
+        sim.spend(I2C_TRANSACTION_NS)
+
+    def try_lock(self) -> bool:
+        return True
+
+    def unlock(self) -> None:
+        pass
+
+    def deinit(self) -> None:
+        pass
+
+
+class SPI(I2C):
+    """
+    busio.SPI / board.SPI()
+    """
+
+
+class Direction:
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+
+class Pull:
+    UP = "UP"
+    DOWN = "DOWN"
+
+
+class DigitalInOut:
+    """
+    digitalio.DigitalInOut; inputs read high (buttons not pressed)
+    unless the simulation scripts the pin
+    """
+
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self.pull = None
+        self._value = True
+
+    @property
+    def value(self) -> bool:
+        if self.direction == Direction.INPUT:
+            return current().read_input(self.pin, self._value)
+        return self._value
+
+    @value.setter
+    def value(self, value: bool) -> None:
+        self._value = value
+
+    def switch_to_output(self, value: bool = False, **kwargs) -> None:
+        self.direction = Direction.OUTPUT
+        self.value = value
+
+    def switch_to_input(self, pull=None) -> None:
+        self.direction = Direction.INPUT
+        self.pull = pull
+
+    def deinit(self) -> None:
+        pass
+
+
+class Debouncer:
+    """
+    adafruit_debouncer.Debouncer over a DigitalInOut or a callable
+    """
+
+    def __init__(self, io, interval: float = 0.010):
+        self.io = io
+        self.interval = interval
+        self.value = self._read()
+        self.fell = False
+        self.rose = False
+
+    def _read(self) -> bool:
+        return self.io() if callable(self.io) else self.io.value
+
+    def update(self) -> None:
+        sim = current()
+        sim.poll()
+        sim.idle_step()
+        sim.spend(DEBOUNCER_UPDATE_NS)
+        value = self._read()
+        self.fell = self.value and not value
+        self.rose = value and not self.value
+        self.value = value
+
+
+class KeyEvent:
+    """
+    keypad.Event
+    """
+
+    def __init__(self, key_number: int = 0, pressed: bool = True):
+        self.key_number = key_number
+        self.pressed = pressed
+        self.released = not pressed
+        self.timestamp = 0
+
+
+class EventQueue:
+    """
+    keypad.EventQueue, filled by the scanner that owns it when it is read
+    """
+
+    def __init__(self, scanner, max_events: int):
+        self._scanner = scanner
+        self._events = []
+        self._max_events = max_events
+        self.overflowed = False
+
+    def _put(self, key_number: int, pressed: bool, timestamp_ns: int) -> None:
+        if len(self._events) >= self._max_events:
+            self.overflowed = True
+            return
+        event = KeyEvent(key_number, pressed)
+        event.timestamp = timestamp_ns // 1_000_000
+        self._events.append(event)
+
+    def get(self):
+        self._scanner.scan()
+        current().spend(KEYPAD_READ_NS)
+        return self._events.pop(0) if self._events else None
+
+    def get_into(self, event: KeyEvent) -> bool:
+        queued = self.get()
+        if queued is None:
+            return False
+        event.key_number = queued.key_number
+        event.pressed = queued.pressed
+        event.released = queued.released
+        event.timestamp = queued.timestamp
+        return True
+
+    def clear(self) -> None:
+        self._events.clear()
+        self.overflowed = False
+
+    def __len__(self) -> int:
+        self._scanner.scan()
+        return len(self._events)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+class Keys:
+    """
+    keypad.Keys; the background scan is caught up whenever the queue is
+    read, sampling the scripted inputs once per interval of virtual time
+    """
+
+    def __init__(
+        self,
+        pins,
+        *,
+        value_when_pressed: bool,
+        pull: bool = True,
+        interval: float = 0.020,
+        max_events: int = 64,
+    ):
+        self.pins = tuple(pins)
+        self.key_count = len(self.pins)
+        self.value_when_pressed = value_when_pressed
+        self.interval_ns = int(interval * 1_000_000_000)
+        self.events = EventQueue(self, max_events)
+        self._pressed = [False] * self.key_count
+        self._scanned_ns = current().monotonic_ns()
+
+    def scan(self) -> None:
+        """
+        every scan the background scanner would have done since the last one
+        """
+        sim = current()
+        now = sim.monotonic_ns()
+        while self._scanned_ns + self.interval_ns <= now:
+            self._scanned_ns += self.interval_ns
+            for key_number, pin in enumerate(self.pins):
+                level = sim.read_input(pin, not self.value_when_pressed, self._scanned_ns)
+                pressed = level == self.value_when_pressed
+                if pressed != self._pressed[key_number]:
+                    self._pressed[key_number] = pressed
+                    self.events._put(key_number, pressed, self._scanned_ns)  # pylint: disable=protected-access
+
+    def reset(self) -> None:
+        self._pressed = [False] * self.key_count
+
+    def deinit(self) -> None:
+        pass
+
+
+class NeoPixel(list):
+    """
+    neopixel.NeoPixel
+    """
+
+    def __init__(self, pin, n: int, *, brightness: float = 1.0, auto_write: bool = True, **kwargs):
+        super().__init__([(0, 0, 0)] * n)
+        self.pin = pin
+        self.brightness = brightness
+        self.auto_write = auto_write
+
+    def fill(self, color) -> None:
+        for i in range(len(self)):
+            self[i] = color
+
+    def show(self) -> None:
+        pass
+
+    def deinit(self) -> None:
+        pass
+
+
+def _colorwheel(pos: int) -> int:
+    """
+    rainbowio.colorwheel
+    """
+    pos = int(pos) & 0xFF
+    if pos < 85:
+        return ((255 - pos * 3) << 16) | ((pos * 3) << 8)
+    if pos < 170:
+        pos -= 85
+        return ((255 - pos * 3) << 8) | (pos * 3)
+    pos -= 170
+    return ((pos * 3) << 16) | (255 - pos * 3)
+
+
+# ----------------------------------------------------------------- peripherals
+
+
+class LIS3DH_I2C:  # pylint: disable=invalid-name
+    """
+    adafruit_lis3dh.LIS3DH_I2C lying flat and never tapped
+    """
+
+    def __init__(self, i2c, *, address: int = 0x18, int1=None):
+        self.i2c = i2c
+        self.address = address
+        self.range = 0
+        self.data_rate = 0
+
+    @property
+    def tapped(self) -> bool:
+        self.i2c.transfer()  # reads the click source register
+        return False
+
+    @property
+    def acceleration(self) -> tuple:
+        self.i2c.transfer()
+        return (0.0, 0.0, 9.806)
+
+    def shake(self, shake_threshold: int = 30, avg_count: int = 10, total_delay: float = 0.1) -> bool:
+        return False
+
+    def set_tap(self, tap: int, threshold: int, **kwargs) -> None:
+        pass
+
+
+class _Clock:
+    """
+    a settable clock counting whole seconds from the virtual wall clock,
+    drift_ppm fast (negative: slow)
+    """
+
+    def __init__(self, drift_ppm: float):
+        self.drift_ppm = drift_ppm
+        self._offset = 0.0
+        self._set_at = current().wall_time()
+
+    def _read(self) -> time.struct_time:
+        now = current().wall_time()
+        return time.localtime(now + self._offset + (now - self._set_at) * self.drift_ppm / 1_000_000)
+
+    def _write(self, value: time.struct_time) -> None:
+        self._set_at = current().wall_time()
+        self._offset = time.mktime(value) - self._set_at
+
+
+class DS3231(_Clock):
+    """
+    adafruit_ds3231.DS3231 keeping time from the virtual clock; raises
+    ValueError like the driver when Simulation(has_ds3231=False)
+    """
+
+    def __init__(self, i2c):
+        sim = current()
+        if not sim.has_ds3231:
+            raise ValueError("No I2C device at address: 0x68")
+        super().__init__(sim.ds3231_drift_ppm)
+        self.i2c = i2c
+
+    @property
+    def datetime(self) -> time.struct_time:
+        self.i2c.transfer()
+        return self._read()
+
+    @datetime.setter
+    def datetime(self, value: time.struct_time) -> None:
+        self.i2c.transfer()
+        self._write(value)
+
+
+class SHT4x:
+    """
+    adafruit_sht4x.SHT4x in a comfortable room
+    """
+
+    def __init__(self, i2c, address: int = 0x44):
+        self.i2c = i2c
+        self.mode = 0
+
+    @property
+    def measurements(self) -> tuple:
+        self.i2c.transfer()
+        return (21.5, 45.0)
+
+
+class RTC(_Clock):
+    """
+    rtc.RTC, the microcontroller's own clock, behind time.localtime() on
+    the board (not in the simulator)
+    """
+
+    def __init__(self):
+        super().__init__(current().rtc_drift_ppm)
+
+    @property
+    def datetime(self) -> time.struct_time:
+        return self._read()
+
+    @datetime.setter
+    def datetime(self, value: time.struct_time) -> None:
+        self._write(value)
+
+
+# ---------------------------------------------------------------------- network
+
+
+class Response:
+    """
+    adafruit_requests.Response with a canned JSON body
+    """
+
+    def __init__(
+        self,
+        url: str,
+        payload,
+        status_code: int = 200,
+        on_close=None,
+        ns_per_byte: int = HTTP_NS_PER_BYTE,
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.headers = {"content-type": "application/json"}
+        self.content = json.dumps(payload).encode()
+        self.text = self.content.decode()
+        self.closed = False
+        self._on_close = on_close
+        self._ns_per_byte = ns_per_byte
+
+    def json(self):
+        current().sleep(len(self.content) * self._ns_per_byte / 1_000_000_000)
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False):
+        for i in range(0, len(self.content), chunk_size):
+            chunk = self.content[i : i + chunk_size]
+            current().sleep(len(chunk) * self._ns_per_byte / 1_000_000_000)
+            yield chunk
+
+    def close(self) -> None:
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _Sockets:
+    """
+    the sockets behind one requests session: a closed response leaves its
+    socket open for the next request to the same host (keep-alive), and
+    like adafruit_requests, a new request first closes the previous response
+    """
+
+    def __init__(
+        self,
+        max_sockets: int = ESP32SPI_MAX_SOCKETS,
+        connect_ns: int = HTTP_CONNECT_NS,
+        wait_ns: int = HTTP_WAIT_NS,
+        ns_per_byte: int = HTTP_NS_PER_BYTE,
+    ):
+        self.max_sockets = max_sockets
+        self.connect_ns = connect_ns
+        self.wait_ns = wait_ns
+        self.ns_per_byte = ns_per_byte
+        self.idle = []  # hosts with an open socket and no response on it
+        self.busy = 0
+        self.last_response = None
+
+    def open(self, url: str) -> str:
+        """
+        a socket for url's host, reusing an idle one or connecting
+        """
+        if self.last_response is not None:
+            self.last_response.close()
+        host = url.split("/")[2]
+        if host in self.idle:
+            self.idle.remove(host)
+        else:
+            if self.busy + len(self.idle) >= self.max_sockets:
+                if not self.idle:
+                    raise RuntimeError("hostsim: out of sockets")
+                self.idle.pop(0)
+            sim = current()
+            sim.http_connections += 1
+            sim.sleep(self.connect_ns / 1_000_000_000)
+        self.busy += 1
+        return host
+
+    def release(self, host: str) -> None:
+        self.busy -= 1
+        self.idle.append(host)
+
+
+def _route(url: str, sockets: _Sockets) -> Response:
+    sim = current()
+    sim.http_requests += 1
+    host = sockets.open(url)
+    sim.sleep(sockets.wait_ns / 1_000_000_000)
+    for prefix, payload in sim.routes.items():
+        if url.startswith(prefix):
+            if callable(payload):
+                payload = payload(sim.monotonic_ns() - sim.started_ns - sim.clock_offset_ns)
+            if isinstance(payload, BaseException):
+                sockets.release(host)
+                raise payload
+            response = Response(
+                url, payload, on_close=lambda: sockets.release(host), ns_per_byte=sockets.ns_per_byte
+            )
+            sockets.last_response = response
+            return response
+    sockets.release(host)
+    raise OSError(f"hostsim has no route for {url}")
+
+
+class ESP_SPIcontrol:  # pylint: disable=invalid-name
+    """
+    adafruit_esp32spi.ESP_SPIcontrol
+    """
+
+    def __init__(self, spi, cs_pin, ready_pin, reset_pin, gpio0_pin=None, **kwargs):
+        self.spi = spi
+        self.is_connected = False
+
+    def connect_AP(self, ssid, password, timeout_s: int = 10) -> int:  # pylint: disable=invalid-name
+        current().sleep(WIFI_CONNECT_NS / 1_000_000_000)
+        self.is_connected = True
+        return 3
+
+
+class ESPSPI_WiFiManager:  # pylint: disable=invalid-name
+    """
+    adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager answering from the routes table
+    """
+
+    def __init__(self, esp, secrets: dict, status_pixel=None, attempts: int = 2, **kwargs):
+        self.esp = esp
+        self.secrets = secrets
+        self.status_pixel = status_pixel
+        self.sockets = _Sockets()
+
+    def connect(self) -> None:
+        self.esp.connect_AP(self.secrets.get("ssid"), self.secrets.get("password"))
+
+    def reset(self) -> None:
+        current().wifi_resets += 1
+        self.esp.is_connected = False
+        self.sockets = _Sockets()
+
+    def pixel_status(self, value) -> None:
+        pass
+
+    def get(self, url: str, **kwargs) -> Response:
+        if not self.esp.is_connected:
+            self.connect()
+        return _route(url, self.sockets)
+
+    def post(self, url: str, **kwargs) -> Response:
+        return self.get(url, **kwargs)
+
+
+class Radio:
+    """
+    wifi.radio, the S3's own
+    """
+
+    def __init__(self):
+        self.connected = False
+        self._enabled = True
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        if self._enabled and not value:
+            current().wifi_resets += 1
+            self.connected = False
+        self._enabled = value
+
+    @property
+    def ipv4_address(self):
+        return "192.0.2.10" if self.connected else None
+
+    def connect(self, ssid, password=b"", *, timeout=None) -> None:
+        current().sleep(WIFI_CONNECT_NS / 1_000_000_000)
+        self.connected = True
+
+
+class SocketPool:
+    """
+    socketpool.SocketPool over the native radio
+    """
+
+    def __init__(self, radio):
+        self.radio = radio
+
+
+class Session:
+    """
+    adafruit_requests.Session answering from the routes table, with the
+    native radio's costs when it is over a socketpool.SocketPool
+    """
+
+    def __init__(self, socket_pool=None, ssl_context=None):
+        self.socket_pool = socket_pool
+        self.ssl_context = ssl_context
+        if isinstance(socket_pool, SocketPool):
+            self.sockets = _Sockets(
+                NATIVE_MAX_SOCKETS, NATIVE_CONNECT_NS, NATIVE_HTTP_WAIT_NS, NATIVE_HTTP_NS_PER_BYTE
+            )
+        else:
+            self.sockets = _Sockets()
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        return _route(url, self.sockets)
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Response:
+        return self.request("POST", url, **kwargs)
+
+
+# ------------------------------------------------------------ display helpers
+
+
+class RoundRect(Group):
+    """
+    adafruit_display_shapes.roundrect.RoundRect drawn as a square-cornered box
+    """
+
+    def __init__(self, x, y, width, height, r, *, fill=None, outline=None, stroke=1):
+        super().__init__(x=x, y=y)
+        self.width = width
+        self.height = height
+        self.r = r
+        self.fill = fill
+        self.outline = outline
+        self.stroke = stroke
+
+    def render(self, fb, ox: int, oy: int, scale: int) -> None:
+        x, y = ox + self.x * scale, oy + self.y * scale
+        width, height = self.width * scale, self.height * scale
+        if self.outline is not None:
+            fb.fill_rect(x, y, width, height, _pack(self.outline))
+            inset = self.stroke * scale
+            x, y, width, height = x + inset, y + inset, width - 2 * inset, height - 2 * inset
+        if self.fill is not None:
+            fb.fill_rect(x, y, width, height, _pack(self.fill))
+
+
+class Font:
+    """
+    terminalio.FONT / bitmap_font.load_font(): fixed-size glyph boxes
+    """
+
+    def __init__(self, name: str = "terminalio", width: int = 6, height: int = 8):
+        self.name = name
+        self.width = width
+        self.height = height
+
+    def get_bounding_box(self) -> tuple:
+        return (self.width, self.height, 0, 0)
+
+
+class Label(Group):
+    """
+    adafruit_display_text.label.Label; glyphs are not drawn
+    """
+
+    def __init__(self, font, *, text: str = "", color=0xFFFFFF, **kwargs):
+        super().__init__(x=kwargs.get("x", 0), y=kwargs.get("y", 0), scale=kwargs.get("scale", 1))
+        self.font = font
+        self.text = text
+        self.color = color
+        self.anchor_point = kwargs.get("anchor_point")
+        self.anchored_position = kwargs.get("anchored_position")
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, text: str) -> None:
+        current().spend(len(text) * LABEL_NS_PER_GLYPH)
+        self._text = text
+
+    @property
+    def bounding_box(self) -> tuple:
+        return (0, -self.font.height // 2, len(self.text) * self.font.width, self.font.height)
+
+
+def _load_font(path: str) -> Font:
+    return Font(path, 5, 7) if "5x7" in path else Font(path, 4, 6)
+
+
+# -------------------------------------------------------------- installation
+
+
+def _module(name: str, **attrs) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    return module
+
+
+def _board_pin(name: str) -> Pin:
+    if name.startswith("_"):
+        raise AttributeError(name)
+    return Pin(name)
+
+
+def _fake_modules(sim: Simulation) -> dict:
+    """
+    every CircuitPython/Adafruit module the scripts import
+    """
+    board = _module("board", I2C=I2C, SPI=SPI, STEMMA_I2C=I2C)
+    board.__getattr__ = _board_pin  # any pin name resolves
+    esp32spi = _module("adafruit_esp32spi.adafruit_esp32spi", ESP_SPIcontrol=ESP_SPIcontrol)
+    wifimanager = _module(
+        "adafruit_esp32spi.adafruit_esp32spi_wifimanager",
+        ESPSPI_WiFiManager=ESPSPI_WiFiManager,
+    )
+    package = _module(
+        "adafruit_esp32spi",
+        adafruit_esp32spi=esp32spi,
+        adafruit_esp32spi_wifimanager=wifimanager,
+    )
+    package.__path__ = []
+    roundrect = _module("adafruit_display_shapes.roundrect", RoundRect=RoundRect)
+    shapes = _module("adafruit_display_shapes", roundrect=roundrect, __path__=[])
+    label = _module("adafruit_display_text.label", Label=Label)
+    text = _module("adafruit_display_text", label=label, __path__=[])
+    bitmap_font = _module("adafruit_bitmap_font.bitmap_font", load_font=_load_font)
+    fonts = _module("adafruit_bitmap_font", bitmap_font=bitmap_font, __path__=[])
+    return {
+        "board": board,
+        "busio": _module("busio", I2C=I2C, SPI=SPI),
+        "digitalio": _module(
+            "digitalio", DigitalInOut=DigitalInOut, Direction=Direction, Pull=Pull
+        ),
+        "displayio": _module(
+            "displayio",
+            Bitmap=Bitmap,
+            Palette=Palette,
+            TileGrid=TileGrid,
+            Group=Group,
+            release_displays=_release_displays,
+        ),
+        "framebufferio": _module("framebufferio", FramebufferDisplay=FramebufferDisplay),
+        "rgbmatrix": _module("rgbmatrix", RGBMatrix=RGBMatrix),
+        "terminalio": _module("terminalio", FONT=Font()),
+        "rainbowio": _module("rainbowio", colorwheel=_colorwheel),
+        "neopixel": _module("neopixel", NeoPixel=NeoPixel),
+        "rtc": _module("rtc", RTC=RTC),
+        "microcontroller": _module(
+            "microcontroller", nvm=sim.nvm, cpu=types.SimpleNamespace(frequency=120_000_000)
+        ),
+        "keypad": _module("keypad", Keys=Keys, Event=KeyEvent, EventQueue=EventQueue),
+        "adafruit_debouncer": _module("adafruit_debouncer", Debouncer=Debouncer),
+        "adafruit_lis3dh": _module(
+            "adafruit_lis3dh",
+            LIS3DH_I2C=LIS3DH_I2C,
+            RANGE_2_G=0,
+            RANGE_4_G=1,
+            RANGE_8_G=2,
+            RANGE_16_G=3,
+        ),
+        "adafruit_ds3231": _module("adafruit_ds3231", DS3231=DS3231),
+        "adafruit_sht4x": _module(
+            "adafruit_sht4x",
+            SHT4x=SHT4x,
+            Mode=types.SimpleNamespace(NOHEAT_HIGHPRECISION=0),
+        ),
+        "adafruit_requests": _module("adafruit_requests", Session=Session),
+        "wifi": _module("wifi", radio=Radio()),
+        "socketpool": _module("socketpool", SocketPool=SocketPool),
+        "adafruit_esp32spi": package,
+        "adafruit_esp32spi.adafruit_esp32spi": esp32spi,
+        "adafruit_esp32spi.adafruit_esp32spi_wifimanager": wifimanager,
+        "adafruit_display_shapes": shapes,
+        "adafruit_display_shapes.roundrect": roundrect,
+        "adafruit_display_text": text,
+        "adafruit_display_text.label": label,
+        "adafruit_bitmap_font": fonts,
+        "adafruit_bitmap_font.bitmap_font": bitmap_font,
+        "_secrets": _module("_secrets", af_secrets={"ssid": "hostsim", "password": "hostsim"}),
+    }
+
+
+class _SimSelector(selectors.SelectSelector):
+    """
+    asyncio's wait for the next timer: advances the virtual clock instead
+    """
+
+    def select(self, timeout=None):
+        if timeout:
+            current().sleep(timeout)
+        return super().select(0)
+
+
+class _SimEventLoop(asyncio.SelectorEventLoop):
+    """
+    asyncio loop timed by the virtual clock, so asyncio.sleep() is as
+    fast as time.sleep() and tasks see the same time as the fakes
+    """
+
+    def __init__(self):
+        super().__init__(_SimSelector())
+
+    def run_forever(self) -> None:
+        sim = current()
+        sim.in_event_loop = True
+        try:
+            super().run_forever()
+        finally:
+            sim.in_event_loop = False
+
+    def call_exception_handler(self, context: dict) -> None:
+        # a stop inside a task nobody awaits is the end of the run, not an error
+        if not isinstance(context.get("exception"), StopSimulation):
+            super().call_exception_handler(context)
+
+    def time(self) -> float:
+        sim = current()
+        if sim.stop_reason is None:  # asyncio.run() still cancels the tasks after a stop
+            sim.poll()
+        return sim.monotonic_ns() / 1_000_000_000
+
+
+class _SimEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        return _SimEventLoop()
+
+
+def _mem_free() -> int:
+    """
+    gc.mem_free(): the simulated heap minus what tracemalloc sees in use
+    """
+    used = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    return max(0, HEAP_SIZE - used)
+
+
+def _mem_alloc() -> int:
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+class _Installed:
+    """
+    context manager: fake modules in sys.modules and the stdlib patched
+    to behave like CircuitPython, all undone on exit
+    """
+
+    def __init__(self, sim: Simulation):
+        self.sim = sim
+        self.saved_modules = {}
+        self.saved = {}
+        self.saved_policy = None
+
+    def __enter__(self):
+        global _sim  # pylint: disable=global-statement
+        _sim = self.sim
+        for name, module in _fake_modules(self.sim).items():
+            self.saved_modules[name] = sys.modules.get(name)
+            sys.modules[name] = module
+        machine = self.sim.machine
+        uname = types.SimpleNamespace(
+            sysname="hostsim", nodename="hostsim", release="9.0.0", version="9.0.0", machine=machine
+        )
+        implementation = types.SimpleNamespace(**vars(sys.implementation))
+        implementation.version = (9, 0, 0)
+        self.saved = {
+            (os, "getenv"): os.getenv,
+            (os, "uname"): os.uname,
+            (sys, "implementation"): sys.implementation,
+            (time, "sleep"): time.sleep,
+            (time, "monotonic"): time.monotonic,
+            (time, "monotonic_ns"): time.monotonic_ns,
+            (gc, "mem_free"): getattr(gc, "mem_free", None),
+            (gc, "mem_alloc"): getattr(gc, "mem_alloc", None),
+        }
+        sim = self.sim
+
+        def monotonic_ns() -> int:
+            sim.poll()
+            sim.idle_step()
+            return sim.monotonic_ns()
+
+        def monotonic() -> float:
+            return monotonic_ns() / 1_000_000_000
+
+        os.getenv = sim.getenv
+        os.uname = lambda: uname
+        sys.implementation = implementation
+        time.sleep = sim.sleep
+        time.monotonic = monotonic
+        time.monotonic_ns = monotonic_ns
+        gc.mem_free = _mem_free
+        gc.mem_alloc = _mem_alloc
+        self.saved_policy = asyncio.get_event_loop_policy()
+        asyncio.set_event_loop_policy(_SimEventLoopPolicy())
+        _forget_repo_modules()
+        return sim
+
+    def __exit__(self, *exc) -> None:
+        global _sim  # pylint: disable=global-statement
+        for (owner, name), value in self.saved.items():
+            if value is None:
+                if hasattr(owner, name):
+                    delattr(owner, name)
+            else:
+                setattr(owner, name, value)
+        for name, module in self.saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        asyncio.set_event_loop_policy(self.saved_policy)
+        _forget_repo_modules()
+        _sim = None
+
+
+def _forget_repo_modules() -> None:
+    """
+    drop this repo's modules from sys.modules so each run imports them
+    against the fakes of that run
+    """
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__dict__", {}).get("__file__") or ""
+        if name not in ("__main__", __name__) and os.path.dirname(os.path.abspath(path)) == REPO_DIR:
+            del sys.modules[name]
+
+
+def install(sim: Simulation) -> _Installed:
+    """
+    use as `with install(Simulation(...)) as sim:` to import and run
+    repo code against the fakes
+    """
+    return _Installed(sim)
+
+
+class Result:
+    """
+    what happened during one run_script() call
+    """
+
+    def __init__(self, script: str, sim: Simulation, elapsed_ns: int, error: str = None):
+        self.script = script
+        self.frames = sim.frames
+        self.rendered = sim.rendered
+        self.pixel_writes = sim.pixel_writes
+        self.palette_writes = sim.palette_writes
+        self.http_requests = sim.http_requests
+        self.http_connections = sim.http_connections
+        self.wifi_resets = sim.wifi_resets
+        self.i2c_transactions = sim.i2c_transactions
+        self.elapsed_ns = elapsed_ns
+        self.stop_reason = sim.stop_reason
+        self.error = error
+        self.peak_memory = sim.peak_memory
+        self.image = sim.displays[0].image if sim.displays else None
+
+    @property
+    def fps(self) -> float:
+        return self.frames * 1_000_000_000 / self.elapsed_ns if self.elapsed_ns else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "script": self.script,
+            "frames": self.frames,
+            "rendered": self.rendered,
+            "fps": round(self.fps, 2),
+            "pixel_writes": self.pixel_writes,
+            "palette_writes": self.palette_writes,
+            "http_requests": self.http_requests,
+            "http_connections": self.http_connections,
+            "wifi_resets": self.wifi_resets,
+            "i2c_transactions": self.i2c_transactions,
+            "elapsed_ms": round(self.elapsed_ns / 1_000_000, 2),
+            "peak_memory": self.peak_memory,
+            "stop_reason": self.stop_reason,
+            "error": self.error,
+        }
+
+
+def run_script(
+    script: str, frames: int = 100, trace_memory: bool = False, **kwargs
+) -> Result:
+    """
+    import an mp_*.py script against the fakes and run its main() for
+    `frames` frames; keyword arguments go to Simulation
+    trace_memory runs tracemalloc, so gc.mem_free() and the result's
+    peak_memory reflect what the script allocates
+    """
+    sim = Simulation(frames=frames, **kwargs)
+    error = None
+    with install(sim):
+        sys.path.insert(0, REPO_DIR)
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            start = _real_monotonic_ns()
+            try:
+                module = importlib.import_module(script)
+                module.main()
+                sim.stop_reason = "returned"
+            except StopSimulation:
+                pass
+            except SystemExit as exit_error:
+                sim.stop_reason = "exit"
+                error = f"SystemExit({exit_error.code})"
+            elapsed = _real_monotonic_ns() - start
+            if trace_memory:
+                sim.peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+            sys.path.remove(REPO_DIR)
+    return Result(script, sim, elapsed, error)
+
+
+def _parse_setting(text: str) -> tuple:
+    """
+    key=value from the command line, the same types settings.toml allows
+    """
+    key, _, value = text.partition("=")
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return key.strip(), value[1:-1]
+    try:
+        return key.strip(), int(value)
+    except ValueError:
+        return key.strip(), value
+
+
+def main() -> None:
+    """
+    command line: run one script headless and print what it did
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("script", help="module name, e.g. mp_lines")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="settings.toml value, may be repeated")
+    parser.add_argument("--machine", default=DEFAULT_MACHINE)
+    parser.add_argument("--max-seconds", type=float, default=30.0)
+    parser.add_argument("--real-sleep", action="store_true",
+                        help="really sleep instead of advancing the virtual clock")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="track allocations with tracemalloc (slower)")
+    parser.add_argument("--dump", metavar="PPM", help="write the last frame as a PPM image")
+    args = parser.parse_args()
+    result = run_script(
+        args.script.removesuffix(".py"),
+        frames=args.frames,
+        settings=dict(_parse_setting(item) for item in args.set),
+        machine=args.machine,
+        fast_sleep=not args.real_sleep,
+        max_seconds=args.max_seconds,
+        trace_memory=args.trace_memory,
+    )
+    print(json.dumps(result.as_dict(), indent=2))
+    if args.dump and result.image is not None:
+        result.image.write_ppm(args.dump)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+http_cache.py
+keep JSON responses across restarts, each endpoint for its own TTL, so a
+reboot only goes to the network for data that has gone stale
+    cache = HttpCache(BufferStore(microcontroller.nvm, NVM_OFFSET), {"geo": 3 * DAY, "weather": 10 * MINUTE})
+    location = await cache.fetch(task, "geo", http, "http://ip-api.com/json/")
+    print(cache.stats())   # hits, misses
+ages come from clock() in seconds, so give it a clock that survives a
+reset (the DS3231) unless the RTC is set at boot
+"""
+import json
+import time
+from tasks import fetch_json
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+NVM_OFFSET = 256  # in microcontroller.nvm, clear of calibrate.py's bit depth
+MAGIC = b"hc"  # marks a buffer that holds a cache
+HEADER_SIZE = 4  # MAGIC, then the JSON length as 2 bytes
+
+
+class BufferStore:
+    """
+    cache contents in a byte buffer that outlives the program:
+    microcontroller.nvm (flash, kept through power off; only written on a
+    miss) or alarm.sleep_memory (RAM, kept through deep sleep)
+    """
+
+    def __init__(self, buffer, offset: int = 0, size: int = None):
+        self.buffer = buffer
+        self.offset = offset
+        self.size = len(buffer) - offset if size is None else size
+
+    def load(self) -> bytes:
+        """
+        the saved bytes, or None if nothing was saved here
+        """
+        start = self.offset
+        header = bytes(self.buffer[start : start + HEADER_SIZE])
+        if header[:2] != MAGIC:
+            return None
+        length = int.from_bytes(header[2:], "little")
+        if length > self.size - HEADER_SIZE:
+            return None
+        return bytes(self.buffer[start + HEADER_SIZE : start + HEADER_SIZE + length])
+
+    def save(self, data: bytes) -> None:
+        """
+        replace the saved bytes; ValueError if they don't fit
+        """
+        if HEADER_SIZE + len(data) > self.size:
+            raise ValueError(f"{len(data)} bytes don't fit in {self.size - HEADER_SIZE}")
+        block = MAGIC + len(data).to_bytes(2, "little") + data
+        self.buffer[self.offset : self.offset + len(block)] = block
+
+
+class FileStore:
+    """
+    cache contents in a file on CIRCUITPY, which boot.py has to make writable
+    (storage.remount("/", readonly=False)); saving raises OSError otherwise
+    """
+
+    def __init__(self, path: str = "/http_cache.json"):
+        self.path = path
+
+    def load(self) -> bytes:
+        """
+        the saved bytes, or None if the file isn't there
+        """
+        try:
+            with open(self.path, "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def save(self, data: bytes) -> None:
+        """
+        replace the saved bytes
+        """
+        with open(self.path, "wb") as file:
+            file.write(data)
+
+
+class HttpCache:
+    """
+    JSON payloads by key, each fresh for ttls[key] seconds after it was stored
+    """
+
+    def __init__(self, store, ttls: dict, clock=time.time):
+        self.store = store
+        self.ttls = ttls
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0  # misses where a stale entry was there
+        self._entries = self._load()
+
+    def _load(self) -> dict:
+        data = self.store.load()
+        if not data:
+            return {}
+        try:
+            return json.loads(str(data, "utf-8"))
+        except ValueError:
+            return {}  # unreadable: start over
+
+    def get(self, key: str):
+        """
+        the payload stored under key if it is still fresh, else None
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self.clock() - entry[0]
+            if 0 <= age < self.ttls[key]:
+                self.hits += 1
+                return entry[1]
+            self.expired += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: str, payload) -> None:
+        """
+        store payload under key as of now, and save the cache
+        """
+        self._entries[key] = [self.clock(), payload]
+        try:
+            self.store.save(json.dumps(self._entries).encode())
+        except (OSError, ValueError) as error:
+            print(f"http cache: {key} not saved: {error}")
+
+    async def fetch(self, task, key: str, http, url: str, **options):
+        """
+        the cached payload for key, or fetch_json(task, http, url) when it is stale
+        """
+        payload = self.get(key)
+        if payload is None:
+            payload = await fetch_json(task, http, url, **options)
+            self.put(key, payload)
+        return payload
+
+    def stats(self) -> str:
+        """
+        one-line summary of hits and misses so far
+        """
+        return f"http cache: {self.hits} hits, {self.misses} misses ({self.expired} expired)"
@@ -0,0 +1,191 @@
+"""
+http_session.py
+one requests session per board, shared by every fetch: sockets stay open
+for the next request to the same host, every response gets closed, and no
+more sockets are open at once than the wifi hardware has
+    http = HttpSession(wifi)   # ESPSPI_WiFiManager (M4) or adafruit_requests.Session (S3)
+    with http.get("http://ip-api.com/json/") as response:
+        location = response.json()
+    print(http.stats())   # per host: requests, errors, time to headers and in total
+"""
+import time
+
+ESP32SPI_MAX_SOCKETS = 4  # what the M4's ESP32 co-processor firmware hands out
+NATIVE_MAX_SOCKETS = 8  # lwIP's limit on the S3's own radio
+
+
+def _host(url: str) -> str:
+    return url.split("/")[2] if "://" in url else url.split("/")[0]
+
+
+class HostStats:
+    """
+    latency of the requests to one host; headers_ns is the time until
+    get() returned, total_ns until the response was closed
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.headers_ns = 0
+        self.total_ns = 0
+        self.worst_ns = 0
+
+    def __str__(self) -> str:
+        done = max(1, self.requests - self.errors)
+        return (
+            f"{self.requests} requests, {self.errors} errors, headers "
+            + f"{self.headers_ns / done / 1_000_000:.0f} ms, total "
+            + f"{self.total_ns / done / 1_000_000:.0f} ms (worst {self.worst_ns / 1_000_000:.0f} ms)"
+        )
+
+
+class Response:
+    """
+    a backend response that reports its timing to the session when closed;
+    json() and content close it, like adafruit_requests does
+    """
+
+    def __init__(self, session, response, stats: HostStats, started_ns: int):
+        self._session = session
+        self._response = response
+        self._stats = stats
+        self._started_ns = started_ns
+        self.closed = False
+
+    @property
+    def status_code(self) -> int:
+        return self._response.status_code
+
+    @property
+    def headers(self) -> dict:
+        return self._response.headers
+
+    @property
+    def content(self) -> bytes:
+        content = self._response.content
+        self.close()
+        return content
+
+    @property
+    def text(self) -> str:
+        return str(self.content, "utf-8")
+
+    def json(self):
+        """
+        the body parsed as JSON, then close
+        """
+        value = self._response.json()
+        self.close()
+        return value
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False):
+        """
+        the body chunk by chunk; close it when done, or leave the with block
+        """
+        return self._response.iter_content(chunk_size=chunk_size, decode_unicode=decode_unicode)
+
+    def close(self) -> None:
+        """
+        give the socket back for the next request to this host
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            # raises on a socket the ESP32 already dropped
+            self._response.close()
+        finally:
+            elapsed = time.monotonic_ns() - self._started_ns
+            self._stats.total_ns += elapsed
+            self._stats.worst_ns = max(self._stats.worst_ns, elapsed)
+            self._session._closed(self)  # pylint: disable=protected-access
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+class HttpSession:
+    """
+    requests through backend (anything with get() and post(), the M4's
+    ESPSPI_WiFiManager or an adafruit_requests.Session over socketpool),
+    at most max_sockets responses open at once: past that the oldest open
+    one is closed, and counted in leaked
+    """
+
+    def __init__(self, backend, max_sockets: int = ESP32SPI_MAX_SOCKETS):
+        self.backend = backend
+        self.max_sockets = max_sockets
+        self.hosts = {}  # host -> HostStats
+        self.leaked = 0  # responses closed for the caller to free a socket
+        self._open = []  # responses not closed yet, oldest first
+
+    def request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        backend.get(url) or backend.post(url) as a Response to close (or use
+        in a with block); the backend's errors are counted and raised
+        """
+        while len(self._open) >= self.max_sockets:
+            self.leaked += 1
+            self._close_oldest()
+        host = _host(url)
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = HostStats()
+        stats.requests += 1
+        started = time.monotonic_ns()
+        try:
+            response = getattr(self.backend, method.lower())(url, **kwargs)
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.headers_ns += time.monotonic_ns() - started
+        response = Response(self, response, stats, started)
+        self._open.append(response)
+        return response
+
+    def get(self, url: str, **kwargs) -> Response:
+        """
+        request("GET", url)
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> Response:
+        """
+        request("POST", url)
+        """
+        return self.request("POST", url, **kwargs)
+
+    def _closed(self, response: Response) -> None:
+        if response in self._open:
+            self._open.remove(response)
+
+    def _close_oldest(self) -> None:
+        # taken off _open first, so a close that raises can't keep it there
+        response = self._open.pop(0)
+        try:
+            response.close()
+        except (OSError, RuntimeError) as error:
+            print("http: closing a dead socket:", error)
+
+    def reset(self) -> None:
+        """
+        close whatever is still open and reset the backend's connection (if
+        it has one to reset), after a failed request
+        """
+        while self._open:
+            self._close_oldest()
+        if hasattr(self.backend, "reset"):
+            self.backend.reset()
+
+    def stats(self) -> str:
+        """
+        one line per host, with the requests and their mean latency so far
+        """
+        lines = [f"http: {len(self._open)} open, {self.leaked} leaked"]
+        for host, stats in self.hosts.items():
+            lines.append(f"  {host}: {stats}")
+        return "\n".join(lines)
@@ -0,0 +1,202 @@
+"""
+json_fields.py
+pull a few fields out of a JSON document as it arrives in chunks, without
+building the rest of it: only the requested values (and the keys on the
+way to them) are ever allocated, and reading can stop once they are all in
+    fields = JsonFields(("query", "lat", "lon", "weather.0.description"))
+    for chunk in response.iter_content(chunk_size=256):
+        if fields.feed(chunk):
+            break
+    fields.result   # {"query": "192.0.2.1", "lat": 47.6, ...}
+paths are dotted keys, with list items by index; a path to an object or
+list returns the whole of it (so no other path can point inside it)
+"""
+import json
+
+QUOTE = 0x22
+BACKSLASH = 0x5C
+COMMA = 0x2C
+COLON = 0x3A
+OBJECT = 0x7B
+# tuples of ints: CircuitPython has no int in bytes (TypeError) or int in
+# bytearray (NotImplementedError), which CPython allows
+OPEN = (0x7B, 0x5B)  # { [
+CLOSE = (0x7D, 0x5D)  # } ]
+WHITESPACE = (0x20, 0x09, 0x0D, 0x0A)
+SCALAR_END = (COMMA,) + CLOSE + WHITESPACE
+
+
+def _decode(token: bytearray) -> str:
+    for byte in token:
+        if byte == BACKSLASH:
+            return json.loads('"' + str(token, "utf-8") + '"')
+    return str(token, "utf-8")
+
+
+def _scalar(token: bytearray):
+    text = str(token, "utf-8")
+    if text == "true":
+        return True
+    if text == "false":
+        return False
+    if text == "null":
+        return None
+    if "." in text or "e" in text or "E" in text:
+        return float(text)
+    return int(text)
+
+
+class JsonFields:
+    """
+    push parser for one JSON document that keeps only the values at paths
+    """
+
+    def __init__(self, paths):
+        self.result = {}  # path -> value, for the paths found so far
+        self._wanted = {}  # path as a tuple of keys and indexes -> path
+        self._prefixes = set()  # containers on the way to a wanted path
+        for path in paths:
+            parts = tuple(int(part) if part.isdigit() else part for part in path.split("."))
+            self._wanted[parts] = path
+            for end in range(len(parts)):
+                self._prefixes.add(parts[:end])
+        if any(parts in self._prefixes for parts in self._wanted):
+            raise ValueError("a path can't be inside another requested path")
+        self._path = []  # keys and indexes down to the current value
+        self._objects = []  # per open container: True for an object, False for a list
+        self._expect_key = False
+        self._in_string = False
+        self._in_scalar = False
+        self._escape = False
+        self._reading_key = False
+        self._token = None  # bytes of the string or scalar being read, if it is kept
+        self._name = None  # path the kept token or capture belongs to
+        self._skip = 0  # depth inside a container nobody wants (or one being captured)
+        self._capture = None  # raw bytes of a wanted container
+
+    @property
+    def done(self) -> bool:
+        """
+        True once every requested field has been found
+        """
+        return len(self.result) == len(self._wanted)
+
+    def feed(self, chunk) -> bool:
+        """
+        parse the next chunk of the document, return done
+        """
+        for byte in chunk:
+            if self._skip:
+                self._skip_byte(byte)
+                if not self._skip and self.done:
+                    break
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif byte == BACKSLASH:
+                    self._escape = True
+                elif byte == QUOTE:
+                    self._in_string = False
+                    self._end_string()
+                    if self.done:
+                        break
+                    continue
+                if self._token is not None:
+                    self._token.append(byte)
+                continue
+            if self._in_scalar:
+                if byte not in SCALAR_END:
+                    if self._token is not None:
+                        self._token.append(byte)
+                    continue
+                self._in_scalar = False
+                if self._token is not None:
+                    self._found(_scalar(self._token))
+            if byte in WHITESPACE or byte == COLON:
+                continue
+            if byte == COMMA:
+                if self._objects[-1]:
+                    self._expect_key = True
+                else:
+                    self._path[-1] += 1
+            elif byte in CLOSE:
+                self._objects.pop()
+                self._path.pop()
+                self._expect_key = False
+            elif self._expect_key:
+                self._in_string = True
+                self._reading_key = True
+                self._token = bytearray()
+            else:
+                self._begin_value(byte)
+            if self.done:
+                break
+        return self.done
+
+    def _begin_value(self, byte: int) -> None:
+        path = tuple(self._path)
+        self._name = self._wanted.get(path)
+        if byte == QUOTE:
+            self._in_string = True
+            self._token = bytearray() if self._name is not None else None
+        elif byte in OPEN:
+            if self._name is not None:
+                self._skip = 1
+                self._capture = bytearray((byte,))
+            elif path in self._prefixes:
+                self._objects.append(byte == OBJECT)
+                self._path.append(None if byte == OBJECT else 0)
+                self._expect_key = byte == OBJECT
+            else:
+                self._skip = 1
+        else:
+            self._in_scalar = True
+            self._token = bytearray((byte,)) if self._name is not None else None
+
+    def _end_string(self) -> None:
+        if self._reading_key:
+            self._reading_key = False
+            self._expect_key = False
+            self._path[-1] = _decode(self._token)
+        elif self._token is not None:
+            self._found(_decode(self._token))
+
+    def _found(self, value) -> None:
+        self.result[self._name] = value
+        self._token = None
+
+    def _skip_byte(self, byte: int) -> None:
+        """
+        one byte of a container that is skipped, or captured whole
+        """
+        if self._capture is not None:
+            self._capture.append(byte)
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif byte == BACKSLASH:
+                self._escape = True
+            elif byte == QUOTE:
+                self._in_string = False
+        elif byte == QUOTE:
+            self._in_string = True
+        elif byte in OPEN:
+            self._skip += 1
+        elif byte in CLOSE:
+            self._skip -= 1
+            if not self._skip and self._capture is not None:
+                self._found(json.loads(str(self._capture, "utf-8")))
+                self._capture = None
+
+
+def extract(chunks, paths) -> dict:
+    """
+    the values at paths in the document made of chunks (an iterable of
+    bytes), reading no further than the last one
+    """
+    fields = JsonFields(paths)
+    for chunk in chunks:
+        if fields.feed(chunk):
+            break
+    return fields.result
@@ -0,0 +1,112 @@
+"""
+lazy.py
+import driver libraries and set up peripherals only when a script first
+uses them, and keep a boot profile of what each one cost
+
+    adafruit_lis3dh = LazyModule("adafruit_lis3dh")     # instead of import adafruit_lis3dh
+    ds3231 = Lazy("DS3231", lambda: adafruit_ds3231.DS3231(i2c))
+    ...
+    print_profile()   # per-import/init time and gc.mem_free() delta
+"""
+import gc
+import time
+
+profile = []  # (name, ms, bytes of heap used, depth) per import or init, in load order
+_depth = 0  # how many _measure() calls are running, imports inside a factory nest
+
+
+def _measure(name: str, load):
+    """
+    run load(), recording its time and the heap it left allocated
+    """
+    global _depth  # pylint: disable=global-statement
+    gc.collect()
+    free = gc.mem_free()  # pylint: disable=no-member
+    entry = len(profile)
+    profile.append(None)  # keeps load order when load() measures more
+    start = time.monotonic_ns()
+    _depth += 1
+    try:
+        value = load()
+    finally:
+        _depth -= 1
+    elapsed_ms = (time.monotonic_ns() - start) / 1_000_000
+    gc.collect()
+    profile[entry] = (name, elapsed_ms, free - gc.mem_free(), _depth)  # pylint: disable=no-member
+    return value
+
+
+def timed_import(name: str):
+    """
+    import a module now (dotted names return the submodule) and profile it
+    """
+
+    def load():
+        module = __import__(name)
+        for part in name.split(".")[1:]:
+            module = getattr(module, part)
+        return module
+
+    return _measure(name, load)
+
+
+class LazyModule:
+    """
+    stand-in for a module that imports it on first attribute access
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = timed_import(self._name)
+        return getattr(self._module, attr)
+
+
+class Lazy:
+    """
+    stand-in for a peripheral that calls factory() to set it up on first
+    attribute access; do any configuration inside the factory
+    """
+
+    def __init__(self, name: str, factory):
+        self._name = name
+        self._factory = factory
+        self._value = None
+
+    def _load(self):
+        """
+        the real peripheral, setting it up if needed (underscored so it
+        can't hide one of the peripheral's own methods, like wifi.get())
+        """
+        if self._value is None:
+            self._value = _measure(self._name, self._factory)
+        return self._value
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        # ds3231.datetime = now sets the time on the real RTC
+        if attr.startswith("_"):
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self._load(), attr, value)
+
+
+def print_profile() -> None:
+    """
+    print what has been imported or set up so far, and the totals
+    (nested entries are already counted in the one above them)
+    """
+    total_ms = total_bytes = 0
+    for name, elapsed_ms, used, depth in (entry for entry in profile if entry):
+        name = "  " * depth + name
+        print(f"  {name:<48} {elapsed_ms:8.1f} ms {used:8} bytes")
+        if not depth:
+            total_ms += elapsed_ms
+            total_bytes += used
+    print(f"  {'total':<48} {total_ms:8.1f} ms {total_bytes:8} bytes")
+    print(f"  free: {gc.mem_free()} bytes")  # pylint: disable=no-member
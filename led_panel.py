@@ -1,7 +1,32 @@
 # pylint: disable=import-error,unused-import
-import os
 import board
+import framebufferio
 import rgbmatrix
+from panel_config import AUTO_BIT_DEPTH, PanelConfig, load_config
+
+
+def make_matrix(config: PanelConfig, bit_depth: int) -> rgbmatrix.RGBMatrix:
+    """
+    an RGBMatrix for the configured geometry on this board's pins
+    """
+    # the board profile names the pins, look them up here
+    pins = config.pins
+    panel_addr_pins = [getattr(board, name) for name in pins.addr]
+    if config.base_height > 32:
+        panel_addr_pins.append(getattr(board, pins.addr_e))
+
+    return rgbmatrix.RGBMatrix(
+        width=config.width,
+        height=config.height,
+        bit_depth=bit_depth,
+        tile=config.tile_down,
+        serpentine=config.serpentine,
+        rgb_pins=[getattr(board, name) for name in pins.rgb],
+        addr_pins=panel_addr_pins,
+        clock_pin=getattr(board, pins.clock),
+        latch_pin=getattr(board, pins.latch),
+        output_enable_pin=getattr(board, pins.output_enable),
+    )
 
 
 class LedPanel:
@@ -11,86 +36,72 @@ class LedPanel:
         # see https://learn.adafruit.com/rgb-led-matrices-matrix-panels-with-circuitpython/advanced-multiple-panels
         # for details on the tile/serpentine/chain values
 
-        # note: these values are read from settings.toml, only available in CircuitPython 8.0 and later
-        # fmt: off
-        panel_base_width = os.getenv("mx_base_width", "32")  # width of a single panel
-        panel_base_height = os.getenv("mx_base_height", "32")  # height of a single panel
-        panel_bit_depth = os.getenv("mx_bit_depth", "3")  # valid values: 1-6
-        panel_chain_across = os.getenv("mx_chain_across", "1")  # number of panels across
-        panel_tile_down = os.getenv("mx_tile_down", "1")  # number of panels high
-        panel_serpentine = (os.getenv("mx_serpentine") == "True", "True")  # whether alternate panels are rotated to shorten cabling
-        # fmt: on
+        # settings.toml is parsed once into a typed PanelConfig, see panel_config.py
+        self.config = load_config()
 
-        panel_width = panel_base_width * panel_chain_across
-        panel_height = panel_base_height * panel_tile_down
+        # mx_bit_depth = "auto" uses the deepest bit depth that still refreshes at
+        # mx_target_fps, measured once and remembered in nvm, see calibrate.py
+        self.bit_depth = self.config.bit_depth
+        if self.bit_depth == AUTO_BIT_DEPTH:
+            import calibrate  # pylint: disable=import-outside-toplevel
 
-        # what kind of board are we
-        if (
-            "MatrixPortal S3" in os.uname().machine
-            or "Matrix Portal M4" in os.uname().machine
-        ):  # Adafruit Matrix Portal M4/S3
-            panel_rgb_pins = [
-                board.MTX_R1,
-                board.MTX_G1,
-                board.MTX_B1,
-                board.MTX_R2,
-                board.MTX_G2,
-                board.MTX_B2,
-            ]
-            panel_addr_pins = [
-                board.MTX_ADDRA,
-                board.MTX_ADDRB,
-                board.MTX_ADDRC,
-                board.MTX_ADDRD,
-            ]
-            if panel_base_height > 32:
-                panel_addr_pins.append(board.MTX_ADDRE)
-            panel_clock_pin = board.MTX_CLK
-            panel_latch_pin = board.MTX_LAT
-            panel_output_enable_pin = board.MTX_OE
+            self.bit_depth = calibrate.calibrated_bit_depth(self.config)
 
-        elif "Pimoroni Interstate 75" in os.uname().machine:  # regular Interstate 75
-            panel_rgb_pins = [
-                board.R0,
-                board.G0,
-                board.B0,
-                board.R1,
-                board.G1,
-                board.B1,
-            ]
-            panel_addr_pins = [board.ROW_A, board.ROW_B, board.ROW_C, board.ROW_D]
-            if panel_base_height > 32:
-                panel_addr_pins.append(board.ROW_E)
-            panel_clock_pin = board.CLK
-            panel_latch_pin = board.LAT
-            panel_output_enable_pin = board.OE
+        # create the matrix
+        self.matrix = make_matrix(self.config, self.bit_depth)
 
-        elif "Raspberry Pi Pico W with rp2040" in os.uname().machine:  # Interstate 75 W
-            panel_rgb_pins = [
-                board.GP0,
-                board.GP1,
-                board.GP2,
-                board.GP3,
-                board.GP4,
-                board.GP5,
-            ]
-            panel_addr_pins = [board.GP6, board.GP7, board.GP8, board.GP9]
-            if panel_base_height > 32:
-                panel_addr_pins.append(board.GP10)
-            panel_clock_pin = board.GP11
-            panel_latch_pin = board.GP12
-            panel_output_enable_pin = board.GP13
+        # mx_auto_refresh = "False" switches to manual refresh: scripts batch their
+        # changes and call refresh() once per frame instead of the display
+        # refreshing in the background, mid-update
+        self.auto_refresh = self.config.auto_refresh
+        self.target_fps = self.config.target_fps  # manual refresh rate cap
+        self.minimum_fps = self.config.minimum_fps  # 0 never raises when behind
+        self.display = None
+        self.refresh_count = 0  # frames actually pushed to the panel
+        self.skipped_count = 0  # refresh() calls dropped to catch up
 
-        # create the matrix
-        self.matrix = rgbmatrix.RGBMatrix(
-            width=panel_width,
-            height=panel_height,
-            bit_depth=panel_bit_depth,
-            tile=panel_tile_down,
-            serpentine=panel_serpentine,
-            rgb_pins=panel_rgb_pins,
-            addr_pins=panel_addr_pins,
-            clock_pin=panel_clock_pin,
-            latch_pin=panel_latch_pin,
-            output_enable_pin=panel_output_enable_pin,
+    def create_display(self) -> framebufferio.FramebufferDisplay:
+        """
+        wrap the matrix in a FramebufferDisplay using the configured refresh mode
+        """
+        self.display = framebufferio.FramebufferDisplay(
+            self.matrix, auto_refresh=self.auto_refresh
         )
+        return self.display
+
+    def refresh(self) -> bool:
+        """
+        end of frame: push all pending changes to the panel in one refresh,
+        paced to mx_target_fps (for loops that run as fast as they can)
+        does nothing under auto-refresh, which pushes changes on its own
+        returns False when the frame was skipped to catch up
+        """
+        if self.auto_refresh:
+            return True
+        if self.display.refresh(
+            target_frames_per_second=self.target_fps,
+            minimum_frames_per_second=self.minimum_fps,
+        ):
+            self.refresh_count += 1
+            return True
+        self.skipped_count += 1
+        return False
+
+    def refresh_now(self) -> None:
+        """
+        push pending changes immediately, for code that paces itself
+        (displayio skips a paced refresh whenever the previous call was
+        longer than one target frame ago, so slow loops must not use refresh())
+        """
+        if self.auto_refresh:
+            return
+        self.display.refresh(target_frames_per_second=None)
+        self.refresh_count += 1
+
+    def refresh_stats(self) -> str:
+        """
+        one-line summary of manual refreshes done and skipped
+        """
+        if self.auto_refresh:
+            return "auto refresh: not counted"
+        return f"{self.refresh_count} refreshes, {self.skipped_count} skipped"
@@ -5,25 +5,15 @@ very basic matrixportal code
 not for individual resale
 """
 import time
-import os
 import random
-import sys
 import board
-import busio
 import displayio
-import framebufferio
-import rgbmatrix
-import terminalio
-from rainbowio import colorwheel
 from digitalio import DigitalInOut, Direction, Pull
 from adafruit_debouncer import Debouncer
-import neopixel
-from adafruit_esp32spi import adafruit_esp32spi
-from adafruit_esp32spi import adafruit_esp32spi_wifimanager
-import adafruit_requests as requests
-import adafruit_lis3dh  # accelerometer
-import adafruit_ds3231  # RTC
 from led_panel import LedPanel
+from scheduler import FrameScheduler, Tween
+from lazy import print_profile
+from runtime import Peripherals, compatibility_check
 
 
 # LED gamma correction table -
@@ -50,53 +40,6 @@ from led_panel import LedPanel
 # fmt: on
 
 
-def get_secrets() -> dict:
-    """
-    retrieve wifi secrets from settings.toml
-    (requires CircuitPython >= 8.0)
-    """
-    secrets = {
-        "ssid": os.getenv("CIRCUITPY_WIFI_SSID"),
-        "password": os.getenv("CIRCUITPY_WIFI_PASSWORD"),
-    }
-    if secrets == {"ssid": None, "password": None}:
-        print("WiFi secrets are kept in settings.toml, please add them there!")
-    return secrets
-
-
-def compatibility_check() -> None:
-    """
-    basic checks to make sure the board and version are correct
-    """
-    if "Matrix" not in os.uname().machine:
-        print(f"unsupported board type: {os.uname().machine}")
-        print("this code is designed to run on MatrixPortal M4/S3")
-        sys.exit(1)
-    if sys.implementation.version[0] < 8:
-        print(
-            f"unsupported CircuitPython major version: {sys.implementation.version[0]}"
-        )
-        print("this code is designed to run on CircuitPython 8.0 or later")
-        sys.exit(1)
-
-
-def create_wifi_M4(
-    wifi_secrets: dict,
-) -> adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager:
-    """
-    set up a WifiManager structure
-    """
-    esp32_cs = DigitalInOut(board.ESP_CS)
-    esp32_ready = DigitalInOut(board.ESP_BUSY)
-    esp32_reset = DigitalInOut(board.ESP_RESET)
-    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-    status_light = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
-    return adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(
-        esp, wifi_secrets, status_light
-    )
-
-
 def code_line():
     """
     generate a vertical line of pixels
@@ -128,39 +71,15 @@ def main() -> None:
     displayio.release_displays()
 
     panel = LedPanel()
-    panel_auto_refresh = (
-        os.getenv("mx_auto_refresh") == "True",
-        "True",
-    )  # or False if refreshing the display manually
-    display = framebufferio.FramebufferDisplay(
-        panel.matrix, auto_refresh=panel_auto_refresh
-    )
+    display = panel.create_display()  # mx_auto_refresh = "False" to refresh manually
 
     master_group = displayio.Group()
 
     display.root_group = master_group
 
-    i2c = board.I2C()  # read for accelerometer and RTC
-
-    # accelerometer - https://docs.circuitpython.org/projects/lis3dh/en/latest/
-    try:
-        lis3dh = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
-        # Set range of accelerometer (can be RANGE_2_G, RANGE_4_G, RANGE_8_G or RANGE_16_G).
-        lis3dh.range = adafruit_lis3dh.RANGE_2_G
-        # then do stuff with lis3dh.acceleration or the shake/tap functions
-    except ValueError as error:
-        print(f"unable to initialize LIS3DH: {error}")
-
-    # RTC - https://learn.adafruit.com/adafruit-ds3231-precision-rtc-breakout/circuitpython
-    try:
-        ds3231 = adafruit_ds3231.DS3231(i2c)
-        current_time = ds3231.datetime  # struct_time
-    except ValueError as error:
-        print(f"unable to initialize DS3231: {error}")
-
-    # if M4, create wifi object with secrets and use wifi.get() / wifi.post()
-    if "Matrix Portal M4" in os.uname().machine:
-        wifi = create_wifi_M4(get_secrets())
+    # accelerometer, RTC and wifi, each imported and set up the first time
+    # it is used: hw.lis3dh.acceleration, hw.ds3231.datetime, hw.wifi.get()
+    hw = Peripherals()
 
     # set up MatrixPortal buttons
     button_up = DigitalInOut(board.BUTTON_UP)
@@ -170,6 +89,15 @@ def main() -> None:
     switch_up = Debouncer(button_up)
     switch_down = Debouncer(button_down)
 
+    # every drop falls at the same rate (one pixel per 50 ms) and they all
+    # share one frame clock, so a new drop starts every two seconds
+    # whether or not the earlier ones are still falling
+    scheduler = FrameScheduler(fps=20, refresh=panel.refresh_now)
+    next_drop = time.monotonic()
+
+    print("boot profile:")
+    print_profile()
+
     # do stuff loop
     while True:
         # check button status
@@ -190,23 +118,34 @@ def main() -> None:
         # else:
         #     print("up pressed")
 
-        group1 = displayio.Group()
-
-        tile1 = code_line()
-        group1.append(tile1)
-
-        group1.x = random.randint(0, panel.matrix.width)
-        group1.y = -8
-
-        master_group.append(group1)
-        display.root_group = master_group
-
-        time.sleep(2)
-
-        pos = group1.y
-        for i in range(pos, panel.matrix.height + 8):
-            time.sleep(0.05)
-            group1.y = i
+        if time.monotonic() >= next_drop:
+            next_drop += 2
+
+            group1 = displayio.Group()
+
+            tile1 = code_line()
+            group1.append(tile1)
+
+            group1.x = random.randint(0, panel.matrix.width)
+            group1.y = -8
+
+            master_group.append(group1)
+            scheduler.add(
+                Tween(
+                    group1,
+                    "y",
+                    -8,
+                    panel.matrix.height + 7,
+                    (panel.matrix.height + 15) * 0.05,
+                    on_done=master_group.remove,
+                )
+            )
+
+        scheduler.tick()
+        if scheduler.frames == 1000:
+            print(scheduler.stats())
+            print(panel.refresh_stats())
+            scheduler.reset_stats()
 
 
 if __name__ == "__main__":
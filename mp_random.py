@@ -4,29 +4,13 @@ mp_random.py
 draw some random dots over and over
 """
 import time
-import os
-import sys
 import random
 import board
-import busio
 import displayio
 import framebufferio
 import rgbmatrix
-import terminalio
-from rainbowio import colorwheel
-from digitalio import DigitalInOut
-import neopixel
-from adafruit_esp32spi import adafruit_esp32spi
-from adafruit_esp32spi import adafruit_esp32spi_wifimanager
-import adafruit_requests as requests
-import adafruit_lis3dh  # accelerometer
-import adafruit_ds3231  # RTC
-
-try:
-    from _secrets import af_secrets as secrets
-except ImportError:
-    print("WiFi secrets are kept in secrets.py, please add them there!")
-    raise
+from lazy import print_profile
+from runtime import Peripherals, compatibility_check
 
 
 def main():
@@ -34,11 +18,8 @@ def main():
     they call it main.
     """
 
-    board_type = os.uname().machine
-    if "Matrix Portal M4" not in board_type:
-        print(f"unsupported board type: {board_type}")
-        print("this code is designed to run on MatrixPortal M4")
-        sys.exit(1)
+    # is it safe
+    compatibility_check(("Matrix Portal M4",))
 
     # get rid of any pre-existing display
     displayio.release_displays()
@@ -98,27 +79,9 @@ def main():
 
     display.show(master_group)
 
-    i2c = board.I2C()  # read for accelerometer and RTC
-
-    # accelerometer - https://docs.circuitpython.org/projects/lis3dh/en/latest/
-    lis3dh = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
-    # Set range of accelerometer (can be RANGE_2_G, RANGE_4_G, RANGE_8_G or RANGE_16_G).
-    lis3dh.range = adafruit_lis3dh.RANGE_2_G
-    # then do stuff with lis3dh.acceleration or the shake/tap functions
-
-    # RTC - https://learn.adafruit.com/adafruit-ds3231-precision-rtc-breakout/circuitpython
-    ds3231 = adafruit_ds3231.DS3231(i2c)
-    current_time = ds3231.datetime  # struct_time
-
-    # wifi
-    esp32_cs = DigitalInOut(board.ESP_CS)
-    esp32_ready = DigitalInOut(board.ESP_BUSY)
-    esp32_reset = DigitalInOut(board.ESP_RESET)
-    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-    status_light = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
-    wifi = adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(esp, secrets, status_light)
-    # now do things like wifi.get() and wifi.post()
+    # accelerometer, RTC and wifi, each imported and set up the first time
+    # it is used: hw.lis3dh.acceleration, hw.ds3231.datetime, hw.wifi.get()
+    hw = Peripherals()
 
     bitmap = displayio.Bitmap(matrix.width, matrix.height, 256)
     palette = displayio.Palette(256)
@@ -131,6 +94,8 @@ def main():
     tile_grid = displayio.TileGrid(bitmap, pixel_shader=palette)
     master_group.append(tile_grid)
     initial = time.monotonic()
+    print("boot profile:")
+    print_profile()
     while True:
         x = random.randint(0, matrix.width - 1)
         y = random.randint(0, matrix.height - 1)
@@ -7,24 +7,15 @@ now featuring gamma correction!
 import time
 import random
 import os
-import sys
 import board
-import busio
 import displayio
-import framebufferio
-import rgbmatrix
-import terminalio
-import adafruit_fancyled.adafruit_fancyled as fancy
-from rainbowio import colorwheel
 from digitalio import DigitalInOut, Direction, Pull
 from adafruit_debouncer import Debouncer
-import neopixel
-from adafruit_esp32spi import adafruit_esp32spi
-from adafruit_esp32spi import adafruit_esp32spi_wifimanager
-import adafruit_requests as requests
-import adafruit_lis3dh  # accelerometer
-import adafruit_ds3231  # RTC
 from led_panel import LedPanel
+from gamma import Gamma
+from dissolve import Dissolve
+from lazy import print_profile
+from runtime import Peripherals, compatibility_check
 
 
 # LED gamma correction table -
@@ -51,53 +42,6 @@ from led_panel import LedPanel
 # fmt: on
 
 
-def get_secrets() -> dict:
-    """
-    retrieve wifi secrets from settings.toml
-    (requires CircuitPython >= 8.0)
-    """
-    secrets = {
-        "ssid": os.getenv("CIRCUITPY_WIFI_SSID"),
-        "password": os.getenv("CIRCUITPY_WIFI_PASSWORD"),
-    }
-    if secrets == {"ssid": None, "password": None}:
-        print("WiFi secrets are kept in settings.toml, please add them there!")
-    return secrets
-
-
-def compatibility_check() -> None:
-    """
-    basic checks to make sure the board and version are correct
-    """
-    if "Matrix" not in os.uname().machine:
-        print(f"unsupported board type: {os.uname().machine}")
-        print("this code is designed to run on MatrixPortal M4/S3")
-        sys.exit(1)
-    if sys.implementation.version[0] < 8:
-        print(
-            f"unsupported CircuitPython major version: {sys.implementation.version[0]}"
-        )
-        print("this code is designed to run on CircuitPython 8.0 or later")
-        sys.exit(1)
-
-
-def create_wifi_M4(
-    wifi_secrets: dict,
-) -> adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager:
-    """
-    set up a WifiManager structure
-    """
-    esp32_cs = DigitalInOut(board.ESP_CS)
-    esp32_ready = DigitalInOut(board.ESP_BUSY)
-    esp32_reset = DigitalInOut(board.ESP_RESET)
-    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-    status_light = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
-    return adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(
-        esp, wifi_secrets, status_light
-    )
-
-
 def main() -> None:
     """
     ...main.
@@ -110,39 +54,15 @@ def main() -> None:
     displayio.release_displays()
 
     panel = LedPanel()
-    panel_auto_refresh = (
-        os.getenv("mx_auto_refresh") == "True",
-        "True",
-    )  # or False if refreshing the display manually
-    display = framebufferio.FramebufferDisplay(
-        panel.matrix, auto_refresh=panel_auto_refresh
-    )
+    display = panel.create_display()  # mx_auto_refresh = "False" to refresh manually
 
     master_group = displayio.Group()
 
     display.root_group = master_group
 
-    i2c = board.I2C()  # read for accelerometer and RTC
-
-    # accelerometer - https://docs.circuitpython.org/projects/lis3dh/en/latest/
-    try:
-        lis3dh = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
-        # Set range of accelerometer (can be RANGE_2_G, RANGE_4_G, RANGE_8_G or RANGE_16_G).
-        lis3dh.range = adafruit_lis3dh.RANGE_2_G
-        # then do stuff with lis3dh.acceleration or the shake/tap functions
-    except ValueError as error:
-        print(f"unable to initialize LIS3DH: {error}")
-
-    # RTC - https://learn.adafruit.com/adafruit-ds3231-precision-rtc-breakout/circuitpython
-    try:
-        ds3231 = adafruit_ds3231.DS3231(i2c)
-        current_time = ds3231.datetime  # struct_time
-    except ValueError as error:
-        print(f"unable to initialize DS3231: {error}")
-
-    # if M4, create wifi object with secrets and use wifi.get() / wifi.post()
-    if "Matrix Portal M4" in os.uname().machine:
-        wifi = create_wifi_M4(get_secrets())
+    # accelerometer, RTC and wifi, each imported and set up the first time
+    # it is used: hw.lis3dh.acceleration, hw.ds3231.datetime, hw.wifi.get()
+    hw = Peripherals()
 
     # set up MatrixPortal buttons
     button_up = DigitalInOut(board.BUTTON_UP)
@@ -155,47 +75,53 @@ def main() -> None:
     bitmap = displayio.Bitmap(panel.matrix.width, panel.matrix.height, 256)
     palette = displayio.Palette(256)
     palette[0] = (0, 0, 0)
-    for i in range(1, 254):
-        r = random.randint(32, 96)
-        g = random.randint(32, 96)
-        b = random.randint(32, 96)
-        gc = fancy.CRGB(r, g, b)
-        gc = fancy.gamma_adjust(gc, gamma_value=1.8)
-        palette[i] = gc.pack()
+    gamma_start = Gamma(1.8)
+    gamma_refresh = Gamma(2.5)  # fancy.gamma_adjust's default curve
+    gamma_start.correct_palette(
+        [
+            (random.randint(32, 96), random.randint(32, 96), random.randint(32, 96))
+            for _ in range(1, 254)
+        ],
+        palette,
+        start=1,
+    )
     tile_grid = displayio.TileGrid(bitmap, pixel_shader=palette)
     master_group.append(tile_grid)
     initial = time.monotonic()
-    total_pixels = panel.matrix.width * panel.matrix.height
-    colored_pixels = 0
+    # settings.toml may hold the seed as a number or a quoted string
+    seed = os.getenv("mx_dissolve_seed", 1)
+    try:
+        seed = int(seed)
+    except ValueError:
+        raise ValueError(f"mx_dissolve_seed must be a whole number, not {repr(seed)}") from None
+    dissolve = Dissolve(panel.matrix.width, panel.matrix.height, seed=seed)
+    filled = False
+    print("boot profile:")
+    print_profile()
+
     while True:
         # wifi.pixel_status((0, 255, 0))
-        while colored_pixels < total_pixels:
-            x = random.randint(0, panel.matrix.width - 1)
-            y = random.randint(0, panel.matrix.height - 1)
-            color = random.randint(32, 254)
-            if bitmap[x, y] == 0:
-                bitmap[x, y] = color
-                colored_pixels += 1
-        #                 print(f"colored pixels = {colored_pixels}")
+        if not filled:
+            for x, y in dissolve:
+                bitmap[x, y] = random.randint(32, 254)
+            panel.refresh_now()
+            filled = True
         now = time.monotonic()
         if now - initial > 5:
             # wifi.pixel_status((0, 32, 0))
-            color = 0
-            while colored_pixels > 0:
-                x = random.randint(0, panel.matrix.width - 1)
-                y = random.randint(0, panel.matrix.height - 1)
-                if bitmap[x, y] != color:
-                    bitmap[x, y] = color
-                    colored_pixels -= 1
-            #                     print(f"colored pixels = {colored_pixels}")
+            for x, y in dissolve:
+                bitmap[x, y] = 0
+            panel.refresh_now()
+            filled = False
             initial = now
-            for i in range(1, 254):
-                r = random.randint(1, 255)
-                g = random.randint(1, 255)
-                b = random.randint(1, 255)
-                gc = fancy.CRGB(r, g, b)
-                gc = fancy.gamma_adjust(gc)
-                palette[i] = gc.pack()
+            gamma_refresh.correct_palette(
+                [
+                    (random.randint(1, 255), random.randint(1, 255), random.randint(1, 255))
+                    for _ in range(1, 254)
+                ],
+                palette,
+                start=1,
+            )
 
 
 if __name__ == "__main__":
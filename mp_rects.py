@@ -11,6 +11,7 @@ import framebufferio
 import rgbmatrix
 import terminalio
 from rainbowio import colorwheel
+from scheduler import FrameScheduler, Tween
 
 def make_rect(color: int, width: int, height: int) -> displayio.TileGrid:
     """
@@ -48,22 +49,12 @@ def make_rect(color: int, width: int, height: int) -> displayio.TileGrid:
     return displayio.TileGrid(bitmap1, pixel_shader=palette1)
 
 
-def move_down(rect: displayio.Group()) -> None:
+def bounce(rect: displayio.Group) -> Tween:
     """
-    move a rectangle's Group down (todo: add gravity?)
+    move a rectangle's Group down and back up forever (todo: add gravity?)
+    ten 25 ms steps each way, same as the old sleep loop
     """
-    for i in range(10):
-        time.sleep(0.025)
-        rect.y = i
-
-
-def move_up(rect: displayio.Group()) -> None:
-    """
-    move a rectangle's Group up (todo: add gravity?)
-    """
-    for i in range(9, -1, -1):
-        time.sleep(0.025)
-        rect.y = i
+    return Tween(rect, "y", 0, 9, 0.25, bounce=True)
 
 
 def main():
@@ -170,13 +161,17 @@ def main():
 
     time.sleep(2)
 
+    # all three rectangles move together, one frame at a time
+    scheduler = FrameScheduler(fps=40)
+    scheduler.add(bounce(group1))
+    scheduler.add(bounce(group2))
+    scheduler.add(bounce(group3))
+
     while True:
-        move_down(group1)
-        move_down(group2)
-        move_down(group3)
-        move_up(group1)
-        move_up(group2)
-        move_up(group3)
+        scheduler.tick()
+        if scheduler.frames == 1000:
+            print(scheduler.stats())
+            scheduler.reset_stats()
 
 
 if __name__ == "__main__":
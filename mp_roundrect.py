@@ -4,26 +4,15 @@ mp_roundrect.py
 will this even work?
 """
 import time
-import os
-import sys
 import board
-import busio
 import displayio
-import framebufferio
-import rgbmatrix
-import terminalio
-from rainbowio import colorwheel
-from digitalio import DigitalInOut, Direction, Pull
-from adafruit_debouncer import Debouncer
-import adafruit_fancyled.adafruit_fancyled as fancy
-import neopixel
-from adafruit_esp32spi import adafruit_esp32spi
-from adafruit_esp32spi import adafruit_esp32spi_wifimanager
 from adafruit_display_shapes.roundrect import RoundRect
-import adafruit_requests as requests
-import adafruit_lis3dh  # accelerometer
-import adafruit_ds3231  # RTC
 from led_panel import LedPanel
+from gamma import Gamma
+from lazy import print_profile
+from buttons import Buttons
+from runtime import Peripherals, compatibility_check
+from tasks import TaskRunner
 
 
 # LED gamma correction table -
@@ -50,53 +39,6 @@ from led_panel import LedPanel
 # fmt: on
 
 
-def get_secrets() -> dict:
-    """
-    retrieve wifi secrets from settings.toml
-    (requires CircuitPython >= 8.0)
-    """
-    secrets = {
-        "ssid": os.getenv("CIRCUITPY_WIFI_SSID"),
-        "password": os.getenv("CIRCUITPY_WIFI_PASSWORD"),
-    }
-    if secrets == {"ssid": None, "password": None}:
-        print("WiFi secrets are kept in settings.toml, please add them there!")
-    return secrets
-
-
-def compatibility_check() -> None:
-    """
-    basic checks to make sure the board and version are correct
-    """
-    if "Matrix" not in os.uname().machine:
-        print(f"unsupported board type: {os.uname().machine}")
-        print("this code is designed to run on MatrixPortal M4/S3")
-        sys.exit(1)
-    if sys.implementation.version[0] < 8:
-        print(
-            f"unsupported CircuitPython major version: {sys.implementation.version[0]}"
-        )
-        print("this code is designed to run on CircuitPython 8.0 or later")
-        sys.exit(1)
-
-
-def create_wifi_M4(
-    wifi_secrets: dict,
-) -> adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager:
-    """
-    set up a WifiManager structure
-    """
-    esp32_cs = DigitalInOut(board.ESP_CS)
-    esp32_ready = DigitalInOut(board.ESP_BUSY)
-    esp32_reset = DigitalInOut(board.ESP_RESET)
-    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-    status_light = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
-    return adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(
-        esp, wifi_secrets, status_light
-    )
-
-
 def main() -> None:
     """
     ...main.
@@ -109,47 +51,18 @@ def main() -> None:
     displayio.release_displays()
 
     panel = LedPanel()
-    panel_auto_refresh = (
-        os.getenv("mx_auto_refresh") == "True",
-        "True",
-    )  # or False if refreshing the display manually
-    display = framebufferio.FramebufferDisplay(
-        panel.matrix, auto_refresh=panel_auto_refresh
-    )
+    display = panel.create_display()  # mx_auto_refresh = "False" to refresh manually
 
     master_group = displayio.Group()
 
     display.root_group = master_group
 
-    i2c = board.I2C()  # read for accelerometer and RTC
-
-    # accelerometer - https://docs.circuitpython.org/projects/lis3dh/en/latest/
-    try:
-        lis3dh = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
-        # Set range of accelerometer (can be RANGE_2_G, RANGE_4_G, RANGE_8_G or RANGE_16_G).
-        lis3dh.range = adafruit_lis3dh.RANGE_2_G
-        # then do stuff with lis3dh.acceleration or the shake/tap functions
-    except ValueError as error:
-        print(f"unable to initialize LIS3DH: {error}")
-
-    # RTC - https://learn.adafruit.com/adafruit-ds3231-precision-rtc-breakout/circuitpython
-    try:
-        ds3231 = adafruit_ds3231.DS3231(i2c)
-        current_time = ds3231.datetime  # struct_time
-    except ValueError as error:
-        print(f"unable to initialize DS3231: {error}")
-
-    # if M4, create wifi object with secrets and use wifi.get() / wifi.post()
-    if "Matrix Portal M4" in os.uname().machine:
-        wifi = create_wifi_M4(get_secrets())
-
-    # set up MatrixPortal buttons
-    button_up = DigitalInOut(board.BUTTON_UP)
-    button_down = DigitalInOut(board.BUTTON_DOWN)
-    button_up.direction = button_down.direction = Direction.INPUT
-    button_up.pull = button_down.pull = Pull.UP
-    switch_up = Debouncer(button_up)
-    switch_down = Debouncer(button_down)
+    # accelerometer, RTC and wifi, each imported and set up the first time
+    # it is used: hw.lis3dh.acceleration, hw.ds3231.datetime, hw.wifi.get()
+    hw = Peripherals()
+
+    # MatrixPortal buttons, debounced by keypad in the background
+    buttons = Buttons()
 
     rr_size = 10
     rr_start = int((panel.matrix.height / 2) - (rr_size / 2))
@@ -180,40 +93,64 @@ def main() -> None:
     master_group.append(rr_2)
     master_group.append(rr_3)
 
-    # do stuff loop
-    while True:
-        # check button status
-        switch_up.update()
-        switch_down.update()
-
-        # see below for button checks
-        if switch_down.fell:
-            rr_1.fill = fancy.gamma_adjust(
-                fancy.CRGB(255, 0, 0), gamma_value=1.8
-            ).pack()  # red
-            rr_2.fill = fancy.gamma_adjust(
-                fancy.CRGB(255, 255, 0), gamma_value=1.8
-            ).pack()  # yellow
-            rr_3.fill = fancy.gamma_adjust(
-                fancy.CRGB(0, 255, 0), gamma_value=1.8
-            ).pack()  # green
-            rr_1.y = 0 if rr_1.y > panel.matrix.height else rr_1.y + 1
-            rr_2.y = 0 if rr_2.y > panel.matrix.height else rr_2.y + 1
-            rr_3.y = 0 if rr_3.y > panel.matrix.height else rr_3.y + 1
-        if switch_up.fell:
-            rr_1.fill = fancy.gamma_adjust(
-                fancy.CRGB(255, 192, 203), gamma_value=1.8
-            ).pack()  # pink
-            rr_2.fill = fancy.gamma_adjust(
-                fancy.CRGB(255, 165, 0), gamma_value=1.8
-            ).pack()  # orange
-            rr_3.fill = fancy.gamma_adjust(
-                fancy.CRGB(255, 0, 255), gamma_value=1.8
-            ).pack()  # purple
-            rr_1.y = panel.matrix.height if rr_1.y < 0 else rr_1.y - 1
-            rr_2.y = panel.matrix.height if rr_2.y < 0 else rr_2.y - 1
-            rr_3.y = panel.matrix.height if rr_3.y < 0 else rr_3.y - 1
+    # button fills, gamma-corrected once up front instead of on every press
+    (
+        fill_red,
+        fill_yellow,
+        fill_green,
+        fill_pink,
+        fill_orange,
+        fill_purple,
+    ) = Gamma(1.8).correct_palette(
+        [
+            (255, 0, 0),
+            (255, 255, 0),
+            (0, 255, 0),
+            (255, 192, 203),
+            (255, 165, 0),
+            (255, 0, 255),
+        ]
+    )
 
+    print("boot profile:")
+    print_profile()
+
+    changed = True  # the initial rects still have to reach the panel
+
+    def read_buttons():
+        nonlocal changed
+        # (only pressed buttons change the display, so only then refresh it)
+        for name, pressed in buttons.events():
+            if not pressed:
+                continue
+            if name == "BUTTON_DOWN":
+                rr_1.fill = fill_red
+                rr_2.fill = fill_yellow
+                rr_3.fill = fill_green
+                rr_1.y = 0 if rr_1.y > panel.matrix.height else rr_1.y + 1
+                rr_2.y = 0 if rr_2.y > panel.matrix.height else rr_2.y + 1
+                rr_3.y = 0 if rr_3.y > panel.matrix.height else rr_3.y + 1
+            else:
+                rr_1.fill = fill_pink
+                rr_2.fill = fill_orange
+                rr_3.fill = fill_purple
+                rr_1.y = panel.matrix.height if rr_1.y < 0 else rr_1.y - 1
+                rr_2.y = panel.matrix.height if rr_2.y < 0 else rr_2.y - 1
+                rr_3.y = panel.matrix.height if rr_3.y < 0 else rr_3.y - 1
+            changed = True
+
+    def render():
+        nonlocal changed
+        if changed:
+            panel.refresh_now()
+            changed = False
+
+    # do stuff tasks: keypad queues the button presses, read them every 50 ms
+    runner = TaskRunner()
+    runner.every("buttons", 0.05, read_buttons)
+    runner.every("render", 1 / panel.target_fps, render)
+    runner.every("stats", 30, runner.print_stats, delay=30)
+    runner.run()
 
 if __name__ == "__main__":
     main()
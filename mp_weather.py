@@ -4,56 +4,20 @@ mp_simpleclock.py
 just the text ma'am
 """
 import time
-import json
 import os
-import sys
 import random
-import board
-import busio
 import displayio
-import framebufferio
-import rgbmatrix
-import terminalio
-from rainbowio import colorwheel
-from digitalio import DigitalInOut
-import neopixel
-from adafruit_esp32spi import adafruit_esp32spi
-from adafruit_esp32spi import adafruit_esp32spi_wifimanager
-# import adafruit_requests as requests
-import adafruit_lis3dh  # accelerometer
-import adafruit_ds3231  # RTC
+import microcontroller
 from led_panel import LedPanel
+from gamma import Gamma
 from adafruit_display_text import label
 from adafruit_bitmap_font import bitmap_font
-import adafruit_fancyled.adafruit_fancyled as fancy
-
-secrets = {
-    "ssid": os.getenv("CIRCUITPY_WIFI_SSID"),
-    "password": os.getenv("CIRCUITPY_WIFI_PASSWORD"),
-}
-if secrets == {"ssid": None, "password": None}:
-    try:
-        # Fallback on secrets.py until depreciation is over and option is removed
-        from _secrets import af_secrets as secrets
-    except ImportError:
-        print("WiFi secrets are kept in settings.toml, please add them there!")
-        raise
-
-
-def compatibility_check():
-    """
-    basic checks to make sure the board and version are correct
-    """
-    board_type = os.uname().machine
-    if "Matrix Portal M4" not in board_type:
-        print(f"unsupported board type: {board_type}")
-        print("this code is designed to run on MatrixPortal M4")
-        sys.exit(1)
-    cp_info = sys.implementation
-    if cp_info.version[0] < 8:
-        print(f"unsupported CircuitPython major version: {cp_info.version[0]}")
-        print("this code is designed to run on CircuitPython 8.0 or later")
-        sys.exit(1)
+from lazy import print_profile
+from runtime import Peripherals, compatibility_check
+from tasks import TaskRunner
+from http_cache import DAY, MINUTE, NVM_OFFSET, BufferStore, HttpCache
+from retry import RetryError
+from rtc_clock import CachedClock, DigitLabels, pick_clock
 
 
 def main():
@@ -68,35 +32,33 @@ def main():
     displayio.release_displays()
 
     panel = LedPanel()
-    panel_auto_refresh = (os.getenv("panel_auto_refresh") == "True", "True")  # or False if refreshing the display manually
-    display = framebufferio.FramebufferDisplay(panel.matrix, auto_refresh=panel_auto_refresh)
+    display = panel.create_display()  # mx_auto_refresh = "False" to refresh manually
 
     master_group = displayio.Group()
 
     display.root_group=master_group
 
-    i2c = board.I2C()  # read for accelerometer and RTC
-
-    # accelerometer - https://docs.circuitpython.org/projects/lis3dh/en/latest/
-    lis3dh = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
-    # Set range of accelerometer (can be RANGE_2_G, RANGE_4_G, RANGE_8_G or RANGE_16_G).
-    lis3dh.range = adafruit_lis3dh.RANGE_4_G
-    # then do stuff with lis3dh.acceleration or the shake/tap functions
-    lis3dh.set_tap(2, 60)
-
-    # RTC - https://learn.adafruit.com/adafruit-ds3231-precision-rtc-breakout/circuitpython
-    ds3231 = adafruit_ds3231.DS3231(i2c)
-    current_time = ds3231.datetime  # struct_time
-
-    # wifi
-    esp32_cs = DigitalInOut(board.ESP_CS)
-    esp32_ready = DigitalInOut(board.ESP_BUSY)
-    esp32_reset = DigitalInOut(board.ESP_RESET)
-    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-    status_light = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=1)
-    wifi = adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(esp, secrets, status_light, attempts=6, debug=True)
-    # now do things like wifi.get() and wifi.post()
+    # accelerometer, RTC and wifi, each imported and set up the first time
+    # it is used: hw.lis3dh.acceleration, hw.ds3231.datetime, hw.http.get()
+    hw = Peripherals(
+        lis3dh_range="RANGE_4_G",
+        lis3dh_tap=2,
+        wifi_options={"brightness": 1, "attempts": 6, "debug": True},
+    )
+    # the DS3231 (or rtc.RTC() without one) is read once a minute, the
+    # seconds in between are counted by time.monotonic_ns(), see rtc_clock.py
+    hw_clock = pick_clock(hw)
+    clock = CachedClock(lambda: hw_clock.datetime)
+    current_time = clock.now()  # struct_time
+
+    # location and weather survive restarts in nvm, aged by the DS3231 so a
+    # reset doesn't make them look fresh (rtc.RTC() starts over at boot, which
+    # makes every saved entry look like it's from the future: expired)
+    cache = HttpCache(
+        BufferStore(microcontroller.nvm, NVM_OFFSET),
+        {"geo": 3 * DAY, "weather": 10 * MINUTE},
+        clock=clock.seconds,
+    )
 
     font = bitmap_font.load_font("/fonts/4x6.pcf")
     font2 = bitmap_font.load_font("/fonts/5x7.pcf")
@@ -108,20 +70,7 @@ def main():
     ip_label_anchored_position = (0, 0)
     ip_label.text = "IP"
     master_group.append(ip_label)
-    url_getip="http://ip-api.com/json/"
-    while True:
-        try:
-            response=wifi.get(url_getip)
-            break
-        except RuntimeError as e:
-            print("Failed to get data, retrying\n", e)
-            wifi.reset()
-            continue
-    getip=response.json()
-    ip=getip["query"]
-    print(ip)
-    response.close()
-
+    panel.refresh_now()
     loc_label = label.Label(font2)
     loc_label.x = 0
     loc_label.y = 11
@@ -137,79 +86,96 @@ def main():
     w_label_anchored_position = (0, 0)
     w_label.text = "weather"
     master_group.append(w_label)
-    url_w = "https://api.openweathermap.org/data/2.5/weather?lat=" + str(getip["lat"]) + "&lon=" + str(getip["lon"]) + "&appid=" + os.getenv("ow_apikey") + "&units=imperial"
-    while True:
-        try:
-            response=wifi.get(url_w)
-            break
-        except RuntimeError as e:
-            print("Failed to get data, retrying\n", e)
-            wifi.reset()
-            continue
-    w=response.json()
-    print(json.dumps(w))
-
-    master_group.pop()
-    master_group.pop()
-    master_group.pop()
-
-    text_label = label.Label(font)
-    text_label.x = 0
-    text_label.y = 3
-    text_label.color=(255,0,255)
-    text_label.anchored_position = (0, 0)
-    text_label.text="{hours:02d}{minutes:02d}{seconds:02d}".format(hours=current_time[3], minutes=current_time[4], seconds=current_time[5])
-    master_group.append(text_label)
+    panel.refresh_now()
+
+    clock_group = displayio.Group()
+    # a label per digit, so a tick only lays out the digits that changed
+    digits = DigitLabels(font, 6, x=0, y=3, color=(255,0,255))
+    digits.text="{hours:02d}{minutes:02d}{seconds:02d}".format(hours=current_time[3], minutes=current_time[4], seconds=current_time[5])
+    clock_group.append(digits.group)
     label2 = label.Label(font)
     label2.x = 0
     label2.y = 9
-    gc = fancy.CRGB(255, 0, 0)
-    gc = fancy.gamma_adjust(gc, gamma_value=1.8)
-    label2.color=gc.pack()
+    gamma = Gamma(1.8)
+    label2.color=gamma.correct(255, 0, 0)
     label2.text = "abcdefgh"
-    master_group.append(label2)
+    clock_group.append(label2)
     label3 = label.Label(font)
     label3.x = 0
     label3.y = 15
-    gc = fancy.CRGB(255, 255, 0)
-    gc = fancy.gamma_adjust(gc, gamma_value=1.8)
-    label3.color=gc.pack()
+    label3.color=gamma.correct(255, 255, 0)
     label3.text = "ijklmnop"
-    master_group.append(label3)
+    clock_group.append(label3)
     label4 = label.Label(font)
     label4.x = 0
     label4.y = 21
     label4.color = (255, 255, 0)
     label4.text = "qrstuvwx"
-    master_group.append(label4)
+    clock_group.append(label4)
     label5 = label.Label(font)
     label5.x = 0
     label5.y = 27
     label5.color = (255, 255, 0)
     label5.text = "yz123456"
-    master_group.append(label5)
-    print(text_label.bounding_box)
-    while True:
-        current_time = ds3231.datetime
-        text_label.text="{hours:02d}{minutes:02d}{seconds:02d}".format(hours=current_time[3], minutes=current_time[4], seconds=current_time[5])
+    clock_group.append(label5)
+
+    async def fetch_weather(task):
+        # failed fetches back off (hw.retry, see retry.py) while rendering goes on;
+        # once a fetch gives up, show it and wait out the breaker's cooldown
+        while True:
+            try:
+                # only the fields used here are parsed out of the responses, see json_fields.py
+                getip = await cache.fetch(task, "geo", hw.http, "http://ip-api.com/json/", fields=("query", "lat", "lon"), retry=hw.retry)
+                print(getip["query"])
+                url_w = "https://api.openweathermap.org/data/2.5/weather?lat=" + str(getip["lat"]) + "&lon=" + str(getip["lon"]) + "&appid=" + os.getenv("ow_apikey") + "&units=imperial"
+                w = await cache.fetch(task, "weather", hw.http, url_w, fields=("name", "main.temp", "main.humidity", "weather.0.description"), retry=hw.retry)
+                break
+            except RetryError as error:
+                print(error)
+                w_label.text = "offline"
+                await task.sleep(hw.retry.pause())
+        print(w)
+        print(cache.stats())
+        print(hw.http.stats())
+        print(hw.retry.stats())
+        # swap the status labels for the clock
+        master_group.pop()
+        master_group.pop()
+        master_group.pop()
+        master_group.append(clock_group)
+
+    def read_clock():
+        nonlocal current_time
+        current_time = clock.now()
+
+    def poll_tap():
+        if hw.lis3dh.tapped:
+            print("Tapped!")
+
+    def render():
+        digits.text="{hours:02d}{minutes:02d}{seconds:02d}".format(hours=current_time[3], minutes=current_time[4], seconds=current_time[5])
         r,g,b = (random.randint(32,255),random.randint(32,255),random.randint(32,255))
-        gc = fancy.CRGB(r, g, b)
-        gc = fancy.gamma_adjust(gc, gamma_value=1.8)
-        text_label.color=gc.pack()
+        digits.color=gamma.correct(r, g, b)
         r,g,b = (random.randint(1,255),random.randint(1,255),random.randint(1,255))
-        gc = fancy.CRGB(r, g, b)
-        gc = fancy.gamma_adjust(gc, gamma_value=1.8)
-        label2.color=gc.pack()
+        label2.color=gamma.correct(r, g, b)
         r,g,b = (random.randint(32,255),random.randint(32,255),random.randint(32,255))
         label3.color=(r, g, b)
         r,g,b = (random.randint(128,255),random.randint(128,255),random.randint(128,255))
         label4.color=(r, g, b)
         r,g,b = (random.randint(32,128),random.randint(32,128),random.randint(32,128))
         label5.color=(r, g, b)
-        if lis3dh.tapped:
-            print("Tapped!")
-
-        time.sleep(1)
+        panel.refresh_now()
+
+    # rendering keeps its 1 s cadence while the fetches are in flight
+    runner = TaskRunner()
+    runner.spawn("fetch", fetch_weather)
+    runner.every("clock", 1, read_clock)
+    runner.every("lis3dh", 1, poll_tap)  # a tap stays latched in CLICK_SRC until read
+    runner.every("render", 1, render)
+    runner.every("stats", 30, runner.print_stats, delay=30)
+    print("boot profile:")
+    print_profile()
+    runner.run()
 
 if __name__ == "__main__":
     main()
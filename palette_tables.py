@@ -0,0 +1,50 @@
+"""
+palette_tables.py
+load the packed, gamma-corrected palette tables written by build_palettes.py
+"""
+import array
+import os
+
+PALETTE_DIR = "palettes"
+GAMMA_VALUES = (1.8, 2.2, 2.8)
+BIT_DEPTHS = (1, 2, 3, 4, 5, 6)
+
+
+def table_name(name: str, gamma_value: float, bit_depth: int) -> str:
+    """
+    file name for one compiled table, e.g. rainbow_g18_b6.bin
+    """
+    return f"{name}_g{int(round(gamma_value * 10))}_b{bit_depth}.bin"
+
+
+def table_path(name: str, gamma_value: float, bit_depth: int, base: str = "") -> str:
+    """
+    path to one compiled table, relative to base (the CIRCUITPY root by default)
+    """
+    if base:
+        return f"{base}/{PALETTE_DIR}/{table_name(name, gamma_value, bit_depth)}"
+    return f"{PALETTE_DIR}/{table_name(name, gamma_value, bit_depth)}"
+
+
+def load_table(
+    name: str, gamma_value: float = 1.8, bit_depth: int = 6, base: str = ""
+) -> array.array:
+    """
+    read a compiled table into an array of packed 0xRRGGBB values
+    (little-endian uint32, the byte order of every supported board)
+    raises OSError if the table has not been built
+    """
+    path = table_path(name, gamma_value, bit_depth, base)
+    size = os.stat(path)[6]
+    table = array.array("I", (0 for _ in range(size // 4)))
+    with open(path, "rb") as table_file:
+        table_file.readinto(table)  # bulk copy straight into the array
+    return table
+
+
+def fill_palette(palette, table) -> None:
+    """
+    copy a loaded table into a displayio.Palette of at least the same length
+    """
+    for i, color in enumerate(table):
+        palette[i] = color
@@ -0,0 +1,155 @@
+"""
+panel_config.py
+parse the mx_* settings from settings.toml once into a typed, validated,
+read-only PanelConfig shared by every script
+"""
+import os
+import time
+from collections import namedtuple
+
+PanelConfig = namedtuple(
+    "PanelConfig",
+    (
+        "board_name",  # BOARD_PROFILES key the machine matched
+        "pins",  # BoardPins for that board
+        "base_width",  # width of a single panel
+        "base_height",  # height of a single panel
+        "bit_depth",  # 1-6, or AUTO_BIT_DEPTH for mx_bit_depth = "auto"
+        "chain_across",  # number of panels across
+        "tile_down",  # number of panels high
+        "serpentine",  # whether alternate panels are rotated to shorten cabling
+        "width",  # whole display
+        "height",
+        "auto_refresh",
+        "target_fps",  # manual refresh rate cap
+        "minimum_fps",  # 0 never raises when behind
+        "load_ms",  # how long parsing took
+    ),
+)
+
+# pin names on board, resolved with getattr(board, name) when the matrix is built
+BoardPins = namedtuple(
+    "BoardPins", ("rgb", "addr", "addr_e", "clock", "latch", "output_enable")
+)
+
+_MATRIXPORTAL_PINS = BoardPins(
+    rgb=("MTX_R1", "MTX_G1", "MTX_B1", "MTX_R2", "MTX_G2", "MTX_B2"),
+    addr=("MTX_ADDRA", "MTX_ADDRB", "MTX_ADDRC", "MTX_ADDRD"),
+    addr_e="MTX_ADDRE",
+    clock="MTX_CLK",
+    latch="MTX_LAT",
+    output_enable="MTX_OE",
+)
+
+# (substring of os.uname().machine, profile name, pins), checked in order
+BOARD_PROFILES = (
+    ("MatrixPortal S3", "matrixportal_s3", _MATRIXPORTAL_PINS),
+    ("Matrix Portal M4", "matrixportal_m4", _MATRIXPORTAL_PINS),
+    (
+        "Pimoroni Interstate 75",
+        "interstate75",
+        BoardPins(
+            rgb=("R0", "G0", "B0", "R1", "G1", "B1"),
+            addr=("ROW_A", "ROW_B", "ROW_C", "ROW_D"),
+            addr_e="ROW_E",
+            clock="CLK",
+            latch="LAT",
+            output_enable="OE",
+        ),
+    ),
+    (
+        "Raspberry Pi Pico W with rp2040",
+        "interstate75w",
+        BoardPins(
+            rgb=("GP0", "GP1", "GP2", "GP3", "GP4", "GP5"),
+            addr=("GP6", "GP7", "GP8", "GP9"),
+            addr_e="GP10",
+            clock="GP11",
+            latch="GP12",
+            output_enable="GP13",
+        ),
+    ),
+)
+
+AUTO_BIT_DEPTH = 0  # bit_depth when the depth is to be calibrated
+
+_config = None  # cached by load_config()
+
+
+def _get_int(key: str, default: int, low: int, high: int) -> int:
+    """
+    integer setting; settings.toml may hold it as a number or a quoted string
+    """
+    value = os.getenv(key, default)
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValueError(f"{key} must be a whole number, not {repr(value)}") from None
+    if not low <= value <= high:
+        raise ValueError(f"{key} must be between {low} and {high}, not {value}")
+    return value
+
+
+def _get_bool(key: str, default: bool) -> bool:
+    """
+    true/false setting; settings.toml has no booleans, so "True"/"False" or 1/0
+    """
+    value = os.getenv(key)
+    if value is None:
+        return default
+    if value in ("True", "true", 1, "1"):
+        return True
+    if value in ("False", "false", 0, "0"):
+        return False
+    raise ValueError(f'{key} must be "True" or "False", not {repr(value)}')
+
+
+def board_profile(machine: str) -> tuple:
+    """
+    (profile name, BoardPins) for a machine string from os.uname()
+    """
+    for match, name, pins in BOARD_PROFILES:
+        if match in machine:
+            return name, pins
+    raise ValueError(f"no matrix pin profile for board: {machine}")
+
+
+def load_config(reload: bool = False) -> PanelConfig:
+    """
+    the panel configuration, parsed on first use and cached after that
+    """
+    global _config  # pylint: disable=global-statement
+    if _config is not None and not reload:
+        return _config
+
+    start = time.monotonic_ns()
+    board_name, pins = board_profile(os.uname().machine)
+    base_width = _get_int("mx_base_width", 32, 8, 128)
+    base_height = _get_int("mx_base_height", 32, 8, 64)
+    chain_across = _get_int("mx_chain_across", 1, 1, 16)
+    tile_down = _get_int("mx_tile_down", 1, 1, 16)
+    _config = PanelConfig(
+        board_name=board_name,
+        pins=pins,
+        base_width=base_width,
+        base_height=base_height,
+        bit_depth=(
+            AUTO_BIT_DEPTH
+            if os.getenv("mx_bit_depth") == "auto"
+            else _get_int("mx_bit_depth", 3, 1, 6)
+        ),
+        chain_across=chain_across,
+        tile_down=tile_down,
+        serpentine=_get_bool("mx_serpentine", True),
+        width=base_width * chain_across,
+        height=base_height * tile_down,
+        auto_refresh=_get_bool("mx_auto_refresh", True),
+        target_fps=_get_int("mx_target_fps", 60, 1, 250),
+        minimum_fps=_get_int("mx_minimum_fps", 0, 0, 250),
+        load_ms=(time.monotonic_ns() - start) / 1_000_000,
+    )
+    print(
+        f"panel config: {_config.width}x{_config.height} on {board_name}, "
+        + f"bit depth {_config.bit_depth or 'auto'}, loaded in {_config.load_ms:.2f} ms"
+    )
+    return _config
@@ -0,0 +1,213 @@
+"""
+rainbow.py
+source colors for the mp_lines rainbow, before gamma correction
+(build_palettes.py compiles these into the tables in palettes/)
+"""
+
+# fmt: off
+RAINBOW_RGB = (
+    # red to orange
+    (255, 0, 0),
+    (255, 5, 0),
+    (255, 11, 0),
+    (255, 16, 0),
+    (255, 21, 0),
+    (255, 27, 0),
+    (255, 32, 0),
+    (255, 37, 0),
+    (255, 43, 0),
+    (255, 48, 0),
+    (255, 53, 0),
+    (255, 59, 0),
+    (255, 64, 0),
+    (255, 69, 0),
+    (255, 75, 0),
+    (255, 80, 0),
+    (255, 85, 0),
+    (255, 90, 0),
+    (255, 96, 0),
+    (255, 101, 0),
+    (255, 106, 0),
+    (255, 112, 0),
+    (255, 117, 0),
+    (255, 122, 0),
+    (255, 128, 0),
+    (255, 133, 0),
+    (255, 138, 0),
+    (255, 144, 0),
+    (255, 149, 0),
+    (255, 154, 0),
+    (255, 160, 0),
+    (255, 165, 0),
+
+    # orange to yellow
+    (255, 165, 0),
+    (255, 168, 0),
+    (255, 171, 0),
+    (255, 174, 0),
+    (255, 177, 0),
+    (255, 180, 0),
+    (255, 182, 0),
+    (255, 185, 0),
+    (255, 188, 0),
+    (255, 191, 0),
+    (255, 194, 0),
+    (255, 197, 0),
+    (255, 200, 0),
+    (255, 203, 0),
+    (255, 206, 0),
+    (255, 209, 0),
+    (255, 211, 0),
+    (255, 214, 0),
+    (255, 217, 0),
+    (255, 220, 0),
+    (255, 223, 0),
+    (255, 226, 0),
+    (255, 229, 0),
+    (255, 232, 0),
+    (255, 235, 0),
+    (255, 238, 0),
+    (255, 240, 0),
+    (255, 243, 0),
+    (255, 246, 0),
+    (255, 249, 0),
+    (255, 252, 0),
+    (255, 255, 0),
+
+    # yellow to green
+    (255, 255, 0),
+    (247, 255, 0),
+    (239, 255, 0),
+    (230, 255, 0),
+    (222, 255, 0),
+    (214, 255, 0),
+    (206, 255, 0),
+    (197, 255, 0),
+    (189, 255, 0),
+    (181, 255, 0),
+    (173, 255, 0),
+    (165, 255, 0),
+    (156, 255, 0),
+    (148, 255, 0),
+    (140, 255, 0),
+    (132, 255, 0),
+    (123, 255, 0),
+    (115, 255, 0),
+    (107, 255, 0),
+    (99, 255, 0),
+    (90, 255, 0),
+    (82, 255, 0),
+    (74, 255, 0),
+    (66, 255, 0),
+    (58, 255, 0),
+    (49, 255, 0),
+    (41, 255, 0),
+    (33, 255, 0),
+    (25, 255, 0),
+    (16, 255, 0),
+    (8, 255, 0),
+    (0, 255, 0),
+
+    # green to blue
+    (0, 255, 0),
+    (0, 247, 8),
+    (0, 239, 16),
+    (0, 230, 25),
+    (0, 222, 33),
+    (0, 214, 41),
+    (0, 206, 49),
+    (0, 197, 58),
+    (0, 189, 66),
+    (0, 181, 74),
+    (0, 173, 82),
+    (0, 165, 90),
+    (0, 156, 99),
+    (0, 148, 107),
+    (0, 140, 115),
+    (0, 132, 123),
+    (0, 123, 132),
+    (0, 115, 140),
+    (0, 107, 148),
+    (0, 99, 156),
+    (0, 90, 165),
+    (0, 82, 173),
+    (0, 74, 181),
+    (0, 66, 189),
+    (0, 58, 197),
+    (0, 49, 206),
+    (0, 41, 214),
+    (0, 33, 222),
+    (0, 25, 230),
+    (0, 16, 239),
+    (0, 8, 247),
+    (0, 0, 255),
+
+    # blue to purple
+    (0, 0, 255),
+    (5, 1, 255),
+    (10, 2, 254),
+    (15, 3, 254),
+    (21, 4, 253),
+    (26, 5, 253),
+    (31, 6, 252),
+    (36, 7, 252),
+    (41, 8, 251),
+    (46, 9, 251),
+    (52, 10, 250),
+    (57, 11, 250),
+    (62, 12, 249),
+    (67, 13, 249),
+    (72, 14, 248),
+    (77, 15, 248),
+    (83, 17, 247),
+    (88, 18, 247),
+    (93, 19, 246),
+    (98, 20, 246),
+    (103, 21, 245),
+    (108, 22, 245),
+    (114, 23, 244),
+    (119, 24, 244),
+    (124, 25, 243),
+    (129, 26, 243),
+    (134, 27, 242),
+    (139, 28, 242),
+    (145, 29, 241),
+    (150, 30, 241),
+    (155, 31, 240),
+    (160, 32, 240),
+
+    # purple to red
+    (160, 32, 240),
+    (163, 31, 232),
+    (166, 30, 225),
+    (169, 29, 217),
+    (172, 28, 209),
+    (175, 27, 201),
+    (178, 26, 194),
+    (181, 25, 186),
+    (185, 24, 178),
+    (188, 23, 170),
+    (191, 22, 163),
+    (194, 21, 155),
+    (197, 20, 147),
+    (200, 19, 139),
+    (203, 18, 132),
+    (206, 17, 124),
+    (209, 15, 116),
+    (212, 14, 108),
+    (215, 13, 101),
+    (218, 12, 93),
+    (221, 11, 85),
+    (224, 10, 77),
+    (227, 9, 70),
+    (230, 8, 62),
+    (234, 7, 54),
+    (237, 6, 46),
+    (240, 5, 39),
+    (243, 4, 31),
+    (246, 3, 23),
+    (249, 2, 15),
+    (252, 1, 8),
+    (255, 0, 0),
+)
+# fmt: on
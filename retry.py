@@ -0,0 +1,181 @@
+"""
+retry.py
+one retry policy for everything that goes to the network: jittered
+exponential backoff between attempts, a time budget per call, and a circuit
+breaker that stops trying for a while after several calls in a row ran out
+of budget, so being offline doesn't hammer the ESP32 with resets
+    retry = Retry(budget=60)
+    payload = await retry.call(task, read_once, url, reset=http.reset)   # in a task
+    payload = retry.call_blocking(read_once, url, reset=http.reset)       # outside asyncio
+    print(retry.stats())   # attempts, failures, time spent waiting
+calls raise RetryError once the budget is spent or while the breaker is
+open; retry.pause() is how long to leave it before calling again
+"""
+import random
+import time
+
+NS = 1_000_000_000
+
+
+class RetryError(RuntimeError):
+    """
+    a call that gave up: out of budget, or refused by the open breaker
+    """
+
+
+class Retry:
+    """
+    retry policy with its state and counters, shared by the calls that go
+    through the same radio: the nth retry of a call waits base * factor**n
+    seconds (at most max_delay, the last jitter of it randomized), all of a
+    call's attempts and waits fit in budget seconds (None: no limit); after
+    trip_after calls in a row give up (None: never), calls fail straight
+    away for cooldown seconds, then one attempt is let through to probe;
+    reset() is called after reset_after failed attempts in a row
+    """
+
+    def __init__(
+        self,
+        base: float = 1.0,
+        factor: float = 2.0,
+        max_delay: float = 30.0,
+        jitter: float = 0.5,
+        budget: float = 60.0,
+        trip_after: int = 3,
+        cooldown: float = 300.0,
+        reset_after: int = 2,
+        errors: tuple = (RuntimeError, OSError),
+    ):
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget_ns = None if budget is None else int(budget * NS)
+        self.trip_after = trip_after
+        self.cooldown_ns = int(cooldown * NS)
+        self.reset_after = reset_after
+        self.errors = errors
+        # counters
+        self.calls = 0
+        self.attempts = 0
+        self.failures = 0  # failed attempts
+        self.resets = 0
+        self.gave_up = 0  # calls that ran out of budget
+        self.rejected = 0  # calls refused while the breaker was open
+        self.trips = 0
+        self.waited_ns = 0  # backing off between attempts
+        self.spent_ns = 0  # in calls, attempts and waits together
+        # breaker
+        self._failed_calls = 0  # in a row
+        self._open_until = None  # monotonic_ns the breaker stays open to
+
+    @property
+    def open(self) -> bool:
+        """
+        True while calls are refused
+        """
+        return self._open_until is not None and time.monotonic_ns() < self._open_until
+
+    def pause(self) -> float:
+        """
+        seconds until a call is worth making after a RetryError: the rest
+        of the cooldown if the breaker is open, else max_delay
+        """
+        if self._open_until is None:
+            return self.max_delay
+        return max(self.max_delay, (self._open_until - time.monotonic_ns()) / NS)
+
+    def _delay(self, retries: int) -> float:
+        delay = min(self.max_delay, self.base * self.factor ** retries)
+        return delay * (1 - self.jitter * random.random())
+
+    def _begin(self) -> bool:
+        """
+        count a call; raise RetryError if the breaker refuses it, else
+        return whether it only gets one attempt (the probe after a cooldown)
+        """
+        self.calls += 1
+        if self._open_until is None:
+            return False
+        if time.monotonic_ns() < self._open_until:
+            self.rejected += 1
+            raise RetryError(f"offline, retrying in {self.pause():.0f} s")
+        return True
+
+    def _failed(self, error, started: int, retries: int, probe: bool, reset) -> float:
+        """
+        count a failed attempt and return the seconds to wait before the
+        next one, or give up with RetryError
+        """
+        self.failures += 1
+        if reset is not None and (retries + 1) % self.reset_after == 0:
+            self.resets += 1
+            reset()
+        delay = self._delay(retries)
+        elapsed = time.monotonic_ns() - started
+        if probe or (self.budget_ns is not None and elapsed + delay * NS > self.budget_ns):
+            self.gave_up += 1
+            self.spent_ns += elapsed
+            self._failed_calls += 1
+            if probe or (self.trip_after is not None and self._failed_calls >= self.trip_after):
+                self.trips += 1
+                self._open_until = time.monotonic_ns() + self.cooldown_ns
+            raise RetryError(f"gave up after {retries + 1} attempts: {error}")
+        print(f"attempt {retries + 1} failed, retrying in {delay:.1f} s:", error)
+        self.waited_ns += int(delay * NS)
+        return delay
+
+    def _succeeded(self, started: int) -> None:
+        self.spent_ns += time.monotonic_ns() - started
+        self._failed_calls = 0
+        self._open_until = None
+
+    async def call(self, task, attempt, *args, reset=None):
+        """
+        await attempt(*args) until it doesn't raise one of errors, waiting
+        with task.sleep() in between so the other tasks keep running
+        """
+        probe = self._begin()
+        started = time.monotonic_ns()
+        retries = 0
+        while True:
+            self.attempts += 1
+            try:
+                value = await attempt(*args)
+            except self.errors as error:
+                await task.sleep(self._failed(error, started, retries, probe, reset))
+                retries += 1
+                continue
+            self._succeeded(started)
+            return value
+
+    def call_blocking(self, attempt, *args, reset=None):
+        """
+        call(), for code outside asyncio: attempt(*args) is a plain function
+        and the waits block
+        """
+        probe = self._begin()
+        started = time.monotonic_ns()
+        retries = 0
+        while True:
+            self.attempts += 1
+            try:
+                value = attempt(*args)
+            except self.errors as error:
+                time.sleep(self._failed(error, started, retries, probe, reset))
+                retries += 1
+                continue
+            self._succeeded(started)
+            return value
+
+    def stats(self) -> str:
+        """
+        one-line summary of the calls so far
+        """
+        state = "open" if self.open else "closed"
+        return (
+            f"retry: {self.calls} calls, {self.attempts} attempts, {self.failures} failed, "
+            + f"{self.resets} resets, {self.gave_up} gave up, {self.rejected} refused, "
+            + f"{self.trips} trips ({state}), {self.waited_ns / NS:.1f} s waiting, "
+            + f"{self.spent_ns / NS:.1f} s in calls"
+        )
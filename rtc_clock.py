@@ -0,0 +1,127 @@
+"""
+rtc_clock.py
+the time of day for clock faces without an I2C transaction every tick:
+CachedClock reads the RTC once and counts on from time.monotonic_ns(),
+reading it again every resync seconds, and DigitLabels shows a string as
+one label per character, laying out again only the ones that changed;
+pick_clock(hw) is the DS3231, or rtc.RTC() on a board without one
+    hw_clock = pick_clock(hw)
+    clock = CachedClock(lambda: hw_clock.datetime)   # or a TimeSync's now
+    digits = DigitLabels(font, 6, x=1, y=3)
+    group.append(digits.group)
+    now = clock.now()
+    digits.text = "{:02d}{:02d}{:02d}".format(now.tm_hour, now.tm_min, now.tm_sec)
+"""
+# pylint: disable=import-error
+import time
+import displayio
+import rtc
+from lazy import LazyModule
+
+# only DigitLabels needs it, pick_clock() alone doesn't load it
+label = LazyModule("adafruit_display_text.label")
+
+NS = 1_000_000_000
+
+
+def pick_clock(hw):
+    """
+    hw.ds3231 if it answers, else rtc.RTC(), which starts over at every
+    boot and drifts a lot more
+    """
+    try:
+        hw.ds3231.datetime  # pylint: disable=pointless-statement
+        return hw.ds3231
+    except (ValueError, OSError) as error:
+        print(f"no DS3231 ({error}), keeping time in rtc.RTC()")
+        return rtc.RTC()
+
+
+class CachedClock:
+    """
+    read() (a struct_time, e.g. the DS3231's datetime) once, then counted on
+    by time.monotonic_ns(), which drifts more than the RTC, until resync
+    seconds later; the read is taken to be half way through its second
+    """
+
+    def __init__(self, read, resync: float = 60):
+        self.read = read
+        self.resync_ns = int(resync * NS)
+        self.reads = 0
+        self.corrections = 0  # resyncs that found the count a second or more out
+        self._seconds = None  # epoch seconds at _read_ns
+        self._read_ns = 0
+
+    def _resync(self, now_ns: int) -> None:
+        seconds = time.mktime(self.read())
+        self.reads += 1
+        if self._seconds is not None and seconds != self._counted(now_ns):
+            self.corrections += 1
+        self._seconds = seconds
+        self._read_ns = now_ns - NS // 2
+
+    def _counted(self, now_ns: int) -> int:
+        return self._seconds + (now_ns - self._read_ns) // NS
+
+    def seconds(self) -> int:
+        """
+        now in seconds since the epoch
+        """
+        now_ns = time.monotonic_ns()
+        if self._seconds is None or now_ns - self._read_ns >= self.resync_ns:
+            self._resync(now_ns)
+        return self._counted(now_ns)
+
+    def now(self) -> time.struct_time:
+        """
+        now as a struct_time, like the RTC's datetime
+        """
+        return time.localtime(self.seconds())
+
+    def stats(self) -> str:
+        """
+        one-line summary of the RTC reads so far
+        """
+        return f"clock: {self.reads} RTC reads, {self.corrections} corrections"
+
+
+class DigitLabels:
+    """
+    count one-character labels in a row, advancing by the font's width;
+    setting text only touches the labels whose character changed
+    """
+
+    def __init__(self, font, count: int, x: int = 0, y: int = 0, color=0xFFFFFF):
+        self.group = displayio.Group(x=x, y=y)
+        advance = font.get_bounding_box()[0]
+        self.labels = []
+        for i in range(count):
+            digit = label.Label(font, text=" ", color=color)
+            digit.x = i * advance
+            self.group.append(digit)
+            self.labels.append(digit)
+        self._text = " " * count
+        self._color = color
+        self.updates = 0  # labels laid out again
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @text.setter
+    def text(self, text: str) -> None:
+        for i, character in enumerate(text):
+            if character != self._text[i]:
+                self.labels[i].text = character
+                self.updates += 1
+        self._text = text
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, color) -> None:
+        self._color = color
+        for digit in self.labels:
+            digit.color = color
@@ -0,0 +1,231 @@
+"""
+runtime.py
+board detection, wifi secrets and MatrixPortal peripheral setup shared by
+every script; ship it compiled as runtime.mpy (see build_mpy.py) so the
+board doesn't have to compile it on every boot
+"""
+# pylint: disable=import-error
+import os
+import sys
+import board
+import busio
+from digitalio import DigitalInOut
+from lazy import Lazy, LazyModule
+
+# drivers, and the network stack on top of them, are imported on first use,
+# see lazy.py
+http_session = LazyModule("http_session")
+retry = LazyModule("retry")
+neopixel = LazyModule("neopixel")
+adafruit_esp32spi = LazyModule("adafruit_esp32spi.adafruit_esp32spi")
+adafruit_esp32spi_wifimanager = LazyModule("adafruit_esp32spi.adafruit_esp32spi_wifimanager")
+wifi = LazyModule("wifi")  # the S3's own radio
+socketpool = LazyModule("socketpool")
+ssl = LazyModule("ssl")
+adafruit_requests = LazyModule("adafruit_requests")
+adafruit_lis3dh = LazyModule("adafruit_lis3dh")  # accelerometer
+adafruit_ds3231 = LazyModule("adafruit_ds3231")  # RTC
+adafruit_sht4x = LazyModule("adafruit_sht4x")  # temperature/humidity
+
+MACHINE = os.uname().machine  # read once for every check below
+IS_M4 = "Matrix Portal M4" in MACHINE
+IS_S3 = "MatrixPortal S3" in MACHINE
+
+MATRIXPORTALS = ("Matrix Portal M4", "MatrixPortal S3")
+
+
+def get_secrets() -> dict:
+    """
+    retrieve wifi secrets from settings.toml
+    (requires CircuitPython >= 8.0), falling back on _secrets.py
+    """
+    secrets = {
+        "ssid": os.getenv("CIRCUITPY_WIFI_SSID"),
+        "password": os.getenv("CIRCUITPY_WIFI_PASSWORD"),
+    }
+    if secrets == {"ssid": None, "password": None}:
+        try:
+            # Fallback on secrets.py until depreciation is over and option is removed
+            from _secrets import af_secrets  # pylint: disable=import-outside-toplevel
+
+            return af_secrets
+        except ImportError:
+            print("WiFi secrets are kept in settings.toml, please add them there!")
+    return secrets
+
+
+def compatibility_check(boards: tuple = MATRIXPORTALS) -> None:
+    """
+    basic checks to make sure the board and version are correct
+    """
+    if not any(name in MACHINE for name in boards):
+        print(f"unsupported board type: {MACHINE}")
+        print(f"this code is designed to run on {' or '.join(boards)}")
+        sys.exit(1)
+    if sys.implementation.version[0] < 8:
+        print(
+            f"unsupported CircuitPython major version: {sys.implementation.version[0]}"
+        )
+        print("this code is designed to run on CircuitPython 8.0 or later")
+        sys.exit(1)
+
+
+def create_wifi_m4(
+    wifi_secrets: dict, brightness: float = 0.2, **options
+) -> "adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager":
+    """
+    set up a WifiManager structure on the M4's ESP32 co-processor
+    options go to ESPSPI_WiFiManager (attempts, debug, ...)
+    """
+    esp32_cs = DigitalInOut(board.ESP_CS)
+    esp32_ready = DigitalInOut(board.ESP_BUSY)
+    esp32_reset = DigitalInOut(board.ESP_RESET)
+    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
+    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
+    status_light = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=brightness)
+    return adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(
+        esp, wifi_secrets, status_light, **options
+    )
+
+
+class NativeWiFiManager:
+    """
+    the S3's own radio behind the same connect(), get(), post() and reset()
+    as ESPSPI_WiFiManager, requests going through one adafruit_requests
+    Session over socketpool
+    """
+
+    def __init__(self, wifi_secrets: dict, attempts: int = 2):
+        self.secrets = wifi_secrets
+        self.attempts = attempts
+        self._session = None
+
+    def connect(self) -> None:
+        """
+        join the access point, unless the radio is on it already
+        (CircuitPython joins CIRCUITPY_WIFI_SSID at boot by itself)
+        """
+        failures = 0
+        while not wifi.radio.connected:
+            try:
+                wifi.radio.connect(self.secrets["ssid"], self.secrets["password"])
+            except ConnectionError as error:
+                failures += 1
+                if failures >= self.attempts:
+                    raise
+                print("Failed to connect, retrying\n", error)
+
+    def _requests(self) -> "adafruit_requests.Session":
+        self.connect()
+        if self._session is None:
+            pool = socketpool.SocketPool(wifi.radio)
+            self._session = adafruit_requests.Session(pool, ssl.create_default_context())
+        return self._session
+
+    def get(self, url: str, **kwargs) -> "adafruit_requests.Response":
+        """
+        GET url, connecting first if needed
+        """
+        return self._requests().get(url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> "adafruit_requests.Response":
+        """
+        POST to url, connecting first if needed
+        """
+        return self._requests().post(url, **kwargs)
+
+    def reset(self) -> None:
+        """
+        drop the session's sockets and restart the radio, after failed requests
+        """
+        self._session = None
+        wifi.radio.enabled = False
+        wifi.radio.enabled = True
+
+
+def create_wifi_s3(wifi_secrets: dict, attempts: int = 2, **options) -> NativeWiFiManager:
+    """
+    the S3's native wifi, with the same interface as create_wifi_m4()
+    options only ESPSPI_WiFiManager has (brightness, debug, ...) are ignored
+    """
+    return NativeWiFiManager(wifi_secrets, attempts)
+
+
+def create_wifi(**options):
+    """
+    wifi for this board: use wifi.get() / wifi.post()
+    the native radio where there is one, it is several times faster than
+    the M4's ESP32 over SPI (see bench_wifi.py)
+    """
+    if IS_S3:
+        return create_wifi_s3(get_secrets(), **options)
+    if IS_M4:
+        return create_wifi_m4(get_secrets(), **options)
+    raise RuntimeError(f"no wifi support for {MACHINE}")
+
+
+def create_lis3dh(
+    i2c: busio.I2C, accel_range: str = "RANGE_2_G", tap: int = 0
+) -> "adafruit_lis3dh.LIS3DH_I2C":
+    """
+    set up the accelerometer
+    range can be RANGE_2_G, RANGE_4_G, RANGE_8_G or RANGE_16_G,
+    tap 1 or 2 enables single or double tap detection
+    """
+    lis3dh = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
+    lis3dh.range = getattr(adafruit_lis3dh, accel_range)
+    if tap:
+        lis3dh.set_tap(tap, 60)
+    return lis3dh
+
+
+def create_sht4x(i2c: busio.I2C) -> "adafruit_sht4x.SHT4x":
+    """
+    set up the temperature/humidity sensor
+    """
+    sht = adafruit_sht4x.SHT4x(i2c)
+    sht.mode = adafruit_sht4x.Mode.NOHEAT_HIGHPRECISION
+    return sht
+
+
+def create_http(backend):
+    """
+    HttpSession over backend, with as many sockets as the board's wifi has
+    """
+    if IS_M4:
+        return http_session.HttpSession(backend, http_session.ESP32SPI_MAX_SOCKETS)
+    return http_session.HttpSession(backend, http_session.NATIVE_MAX_SOCKETS)
+
+
+class Peripherals:
+    """
+    the MatrixPortal add-ons, each imported and set up the first time
+    something on it is used:
+    lis3dh.acceleration, ds3231.datetime, sht4x.measurements, http.get()
+    (http is the wifi behind a shared HttpSession, see http_session.py;
+    retry is the backoff and circuit breaker every fetch should go through)
+    """
+
+    def __init__(
+        self, lis3dh_range: str = "RANGE_2_G", lis3dh_tap: int = 0, wifi_options: dict = None
+    ):
+        self._i2c = None
+        # accelerometer - https://docs.circuitpython.org/projects/lis3dh/en/latest/
+        self.lis3dh = Lazy("LIS3DH", lambda: create_lis3dh(self.i2c, lis3dh_range, lis3dh_tap))
+        # RTC - https://learn.adafruit.com/adafruit-ds3231-precision-rtc-breakout/circuitpython
+        self.ds3231 = Lazy("DS3231", lambda: adafruit_ds3231.DS3231(self.i2c))
+        # temperature/humidity - https://learn.adafruit.com/adafruit-sht40-temperature-humidity-sensor/python-circuitpython
+        self.sht4x = Lazy("SHT4x", lambda: create_sht4x(self.i2c))
+        self.wifi = Lazy("wifi", lambda: create_wifi(**(wifi_options or {})))
+        self.http = Lazy("http", lambda: create_http(self.wifi))
+        # pylint: disable-next=unnecessary-lambda
+        self.retry = Lazy("retry", lambda: retry.Retry())  # naming retry.Retry would import it now
+
+    @property
+    def i2c(self) -> busio.I2C:
+        """
+        the board's I2C bus, shared by the sensors and RTC
+        """
+        if self._i2c is None:
+            self._i2c = board.I2C()
+        return self._i2c
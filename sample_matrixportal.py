@@ -15,44 +15,25 @@ import displayio
 import framebufferio
 import rgbmatrix
 import terminalio
-import neopixel
-import adafruit_lis3dh
 import adafruit_requests as requests
 from rainbowio import colorwheel
-from digitalio import DigitalInOut, Direction, Pull
-from adafruit_debouncer import Debouncer
+
+# MatrixPortal buttons as debounced events
+from buttons import Buttons
 
 # import custom panel class
 from led_panel import LedPanel
 
-# import add-on boards
-try:
-    import adafruit_ds3231  # RTC
-    import adafruit_sht4x  # temperature/humidity
-except ImportError as e:
-    print(f"unable to import add-on board libraries: {e}")
-    print("ensure all libraries are installed")
-    sys.exit(1)
-
-# import wifi elements
-if "MatrixPortal S3" in os.uname().machine:
-    try:
-        import ipaddress
-        import ssl
-        import wifi
-        import socketpool
-    except ImportError as e:
-        print(f"unable to import S3 wifi libraries: {e}")
-        print("ensure all libraries are installed")
-        sys.exit(1)
-elif "Matrix Portal M4" in os.uname().machine:
-    try:
-        from adafruit_esp32spi import adafruit_esp32spi
-        from adafruit_esp32spi import adafruit_esp32spi_wifimanager
-    except ImportError as e:
-        print(f"unable to import M4 wifi libraries: {e}")
-        print("ensure all libraries are installed")
-        sys.exit(1)
+# board detection and add-on boards (accelerometer, RTC, temperature/humidity, wifi);
+# their libraries are imported when first used
+from runtime import Peripherals, compatibility_check
+
+# buttons, sensors and rendering each run as an asyncio task
+from tasks import TaskRunner
+
+# network time for the DS3231 (or rtc.RTC), see time_sync.py
+from rtc_clock import pick_clock
+from time_sync import HttpTime, TimeSync
 
 
 # LED gamma correction table -
@@ -79,63 +60,6 @@ elif "Matrix Portal M4" in os.uname().machine:
 # fmt: on
 
 
-def get_secrets() -> dict:
-    """
-    retrieve wifi secrets from settings.toml
-    (requires CircuitPython >= 8.0)
-    """
-    secrets = {
-        "ssid": os.getenv("CIRCUITPY_WIFI_SSID"),
-        "password": os.getenv("CIRCUITPY_WIFI_PASSWORD"),
-    }
-    if secrets == {"ssid": None, "password": None}:
-        print("WiFi secrets are kept in settings.toml, please add them there!")
-    return secrets
-
-
-def compatibility_check() -> None:
-    """
-    basic checks to make sure the board and version are correct
-    """
-    if (
-        "MatrixPortal S3" not in os.uname().machine
-        and "Matrix Portal M4" not in os.uname().machine
-    ):
-        print(f"unsupported board type: {os.uname().machine}")
-        print("this code is designed to run on MatrixPortal M4/S3")
-        sys.exit(1)
-    if sys.implementation.version[0] < 8:
-        print(
-            f"unsupported CircuitPython major version: {sys.implementation.version[0]}"
-        )
-        print("this code is designed to run on CircuitPython 8.0 or later")
-        sys.exit(1)
-
-
-def create_wifi_m4(
-    wifi_secrets: dict,
-) -> adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager:
-    """
-    set up a WifiManager structure
-    """
-    esp32_cs = DigitalInOut(board.ESP_CS)
-    esp32_ready = DigitalInOut(board.ESP_BUSY)
-    esp32_reset = DigitalInOut(board.ESP_RESET)
-    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-    status_light = neopixel.NeoPixel(board.NEOPIXEL, 1, brightness=0.2)
-    return adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(
-        esp, wifi_secrets, status_light
-    )
-
-
-def create_wifi_s3(wifi_secrets: dict) -> str:  # pylint:disable=unused-argument
-    """
-    set up a wifi instance
-    """
-    return "nope"
-
-
 def main() -> None:  # pylint:disable=too-many-locals
     """
     ...main.
@@ -152,49 +76,30 @@ def main() -> None:  # pylint:disable=too-many-locals
     displayio.release_displays()
 
     panel = LedPanel()
-    panel_auto_refresh = (
-        os.getenv("mx_auto_refresh") == "True",
-        "True",
-    )  # or False if refreshing the display manually
-    display = framebufferio.FramebufferDisplay(
-        panel.matrix, auto_refresh=panel_auto_refresh
-    )
+    display = panel.create_display()  # mx_auto_refresh = "False" to refresh manually
 
     master_group = displayio.Group()
 
     display.root_group = master_group
 
-    i2c = board.I2C()
-
+    # accelerometer, RTC, temperature/humidity and wifi, each set up the first time it is used
     # accelerometer - https://docs.circuitpython.org/projects/lis3dh/en/latest/
-    try:
-        lis3dh = adafruit_lis3dh.LIS3DH_I2C(i2c, address=0x19)
-        lis3dh.range = adafruit_lis3dh.RANGE_2_G
-        lis3dh.set_tap(2, 60)  # enable double-tap
-        # then do stuff with lis3dh.acceleration or the shake/tap functions
-        # range can also be RANGE_4_G, RANGE_8_G, or RANGE_16_G
-    except ValueError as error:
-        print(f"unable to initialize LIS3DH: {error}")
+    # do stuff with hw.lis3dh.acceleration or the shake/tap functions (double-tap is enabled)
+    # use hw.http.get() / hw.http.post(), over the ESP32 on the M4 or the S3's own radio
+    hw = Peripherals(lis3dh_tap=2)
 
     # RTC - https://learn.adafruit.com/adafruit-ds3231-precision-rtc-breakout/circuitpython
-    try:
-        ds3231 = adafruit_ds3231.DS3231(i2c)
-        current_time = ds3231.datetime  # struct_time
-        print("--\nfound DS3231, relying on it for time")
-        print(
-            f"current date/time: {current_time.tm_year}/{current_time.tm_mon:02d}/{current_time.tm_mday:02d} @ {current_time.tm_hour:02d}:{current_time.tm_min:02d}"
-        )
-        has_rtc = True
-    except ValueError as error:
-        print(f"**\nunable to initialize DS3231: {error}")
-        print("time will not be accurate until wifi connection available")
-        has_rtc = False
+    # without a DS3231, time is kept in the microcontroller's own rtc.RTC(),
+    # which isn't accurate until the first sync below
+    clock = pick_clock(hw)
+    current_time = clock.datetime  # struct_time
+    print(
+        f"--\ncurrent date/time: {current_time.tm_year}/{current_time.tm_mon:02d}/{current_time.tm_mday:02d} @ {current_time.tm_hour:02d}:{current_time.tm_min:02d}"
+    )
 
     # temperature/humidity - https://learn.adafruit.com/adafruit-sht40-temperature-humidity-sensor/python-circuitpython
     try:
-        sht = adafruit_sht4x.SHT4x(i2c)
-        sht.mode = adafruit_sht4x.Mode.NOHEAT_HIGHPRECISION
-        temperature, relative_humidity = sht.measurements
+        temperature, relative_humidity = hw.sht4x.measurements
         print("--\nfound SHT4x, relying on it for temperature/humidity")
         print(
             f"current temperature: {temperature:.1f}°C, {(temperature * (9/5)) + 32:.1f}°F"
@@ -204,48 +109,53 @@ def main() -> None:  # pylint:disable=too-many-locals
         print(f"**\nunable to initialize SHT4x: {error}")
         print("temperature/humidity will not be available internally")
 
-    # create wifi object with secrets
-    # if M4, use wifi.get() / wifi.post()
-    if "Matrix Portal M4" in os.uname().machine:
-        wifi_mp = create_wifi_m4(get_secrets())  # pylint: disable=unused-variable
-    elif "MatrixPortal S3" in os.uname().machine:
-        wifi_mp = create_wifi_s3(get_secrets())  # pylint: disable=unused-variable
-
-    # set up MatrixPortal buttons
-    button_up = DigitalInOut(board.BUTTON_UP)
-    button_down = DigitalInOut(board.BUTTON_DOWN)
-    button_up.direction = button_down.direction = Direction.INPUT
-    button_up.pull = button_down.pull = Pull.UP
-    switch_up = Debouncer(button_up)
-    switch_down = Debouncer(button_down)
-
-    if not has_rtc:
-        # eventually do wifi time check here but for now:
-        pass
+    # set up MatrixPortal buttons, scanned and debounced by keypad in the background
+    buttons = Buttons()
+
+    # keep the clock set from the network in the background
+    sync = TimeSync(clock, HttpTime(hw.http, retry=hw.retry))
 
     # end_mem = gc.mem_free()  # pylint:disable=no-member
     # print(f"final memory: {end_mem} bytes")
 
-    # do stuff loop
-    while True:
-        # check button status
-        switch_up.update()
-        switch_down.update()
-
-        # see below for button checks
-        # if switch_up.fell:
-        #     print("Just pressed up")
-        # if switch_up.rose:
-        #     print("Just released up")
-        # if switch_down.fell:
-        #     print("Just pressed down")
-        # if switch_down.rose:
-        #     print("Just released down")
-        # if switch_up.value:
-        #     pass
-        # else:
+    # do stuff tasks, each handing the CPU back between steps
+    def read_buttons():
+        # presses and releases queued since the last read
+        for name, pressed in buttons.events():
+            # see below for button checks
+            # if name == "BUTTON_UP" and pressed:
+            #     print("Just pressed up")
+            # if name == "BUTTON_UP" and not pressed:
+            #     print("Just released up")
+            # if name == "BUTTON_DOWN" and pressed:
+            #     print("Just pressed down")
+            # if name == "BUTTON_DOWN" and not pressed:
+            #     print("Just released down")
+            pass
+        # if "BUTTON_UP" in buttons.held:
         #     print("up pressed")
 
+    def poll_tap():
+        if hw.lis3dh.tapped:
+            print("tapped")
+
+    def read_clock():
+        nonlocal current_time
+        current_time = sync.now()
+
+    def render():
+        # batch any display changes above, then push them in one refresh
+        # (does nothing unless mx_auto_refresh = "False"; the runner paces it)
+        panel.refresh_now()
+
+    runner = TaskRunner()
+    runner.spawn("time sync", sync.run)
+    runner.every("buttons", 0.05, read_buttons)
+    runner.every("lis3dh", 1, poll_tap)  # a tap stays latched in CLICK_SRC until read
+    runner.every("ds3231", 1, read_clock)
+    runner.every("render", 1 / panel.target_fps, render)
+    runner.every("stats", 30, runner.print_stats, delay=30)
+    runner.run()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,169 @@
+"""
+scheduler.py
+tick-based frame scheduler for displayio animations
+every animation is advanced once per frame from the same clock, so adding
+objects doesn't slow the animation down; late frames are dropped and the
+animations catch up by interpolating from elapsed time
+"""
+import time
+
+
+class Tween:
+    """
+    move one attribute of a displayio object (usually x or y) from start to end
+    over duration seconds; bounce=True runs there and back forever
+    on_done is called with the target when a non-bouncing tween finishes
+    """
+
+    def __init__(
+        self,
+        target,
+        attr: str,
+        start: int,
+        end: int,
+        duration: float,
+        bounce: bool = False,
+        on_done=None,
+    ):
+        self.target = target
+        self.attr = attr
+        self.start = start
+        self.end = end
+        self.duration_ns = int(duration * 1_000_000_000)
+        self.bounce = bounce
+        self.on_done = on_done
+        self.started_ns = None
+        setattr(target, attr, start)
+
+    def update(self, now_ns: int) -> bool:
+        """
+        set the attribute for time now_ns, return False once finished
+        """
+        if self.started_ns is None:
+            self.started_ns = now_ns
+        elapsed = now_ns - self.started_ns
+        if self.bounce:
+            elapsed %= 2 * self.duration_ns
+            if elapsed > self.duration_ns:
+                elapsed = 2 * self.duration_ns - elapsed
+        elif elapsed >= self.duration_ns:
+            setattr(self.target, self.attr, self.end)
+            if self.on_done is not None:
+                self.on_done(self.target)
+            return False
+        value = self.start + (self.end - self.start) * elapsed // self.duration_ns
+        if getattr(self.target, self.attr) != value:
+            setattr(self.target, self.attr, value)
+        return True
+
+
+class FrameScheduler:
+    """
+    run every registered animation once per frame at a fixed target rate
+    animations are objects with update(now_ns) -> bool (False when finished)
+    refresh, if given, is called once at the end of every frame
+    """
+
+    def __init__(self, fps: int = 40, refresh=None):
+        self.frame_ns = 1_000_000_000 // fps
+        self.refresh = refresh
+        self.animations = []
+        self.deadline_ns = None
+        self.last_ns = None
+        # stats since the last reset_stats()
+        self.frames = 0
+        self.dropped = 0
+        self._interval_sum = 0
+        self._interval_sq_sum = 0
+        self._stats_start_ns = time.monotonic_ns()
+
+    def add(self, animation) -> None:
+        """
+        start advancing an animation on the next frame
+        """
+        self.animations.append(animation)
+
+    def remove(self, animation) -> None:
+        """
+        stop advancing an animation
+        """
+        if animation in self.animations:
+            self.animations.remove(animation)
+
+    @property
+    def idle(self) -> bool:
+        """
+        True when there is nothing left to animate
+        """
+        return not self.animations
+
+    def tick(self) -> None:
+        """
+        wait for the next frame slot, then advance every animation once
+        if we're more than a frame behind, the missed frames are dropped
+        """
+        now = time.monotonic_ns()
+        if self.deadline_ns is None:
+            self.deadline_ns = now
+        wait = self.deadline_ns - now
+        if wait > 0:
+            time.sleep(wait / 1_000_000_000)
+            now = time.monotonic_ns()
+        late = now - self.deadline_ns
+        if late >= self.frame_ns:
+            self.dropped += late // self.frame_ns
+            self.deadline_ns = now
+        self.deadline_ns += self.frame_ns
+
+        for animation in list(self.animations):
+            if not animation.update(now):
+                self.animations.remove(animation)
+        if self.refresh is not None:
+            self.refresh()
+
+        if self.last_ns is not None:
+            interval = now - self.last_ns
+            self._interval_sum += interval
+            self._interval_sq_sum += interval * interval
+        self.last_ns = now
+        self.frames += 1
+
+    @property
+    def fps(self) -> float:
+        """
+        frames per second achieved since the last reset_stats()
+        """
+        elapsed = time.monotonic_ns() - self._stats_start_ns
+        return self.frames * 1_000_000_000 / elapsed if elapsed else 0.0
+
+    @property
+    def jitter_ms(self) -> float:
+        """
+        standard deviation of the frame-to-frame interval, in ms
+        """
+        count = self.frames - 1
+        if count < 1:
+            return 0.0
+        mean = self._interval_sum / count
+        variance = max(0.0, self._interval_sq_sum / count - mean * mean)
+        return variance**0.5 / 1_000_000
+
+    def stats(self) -> str:
+        """
+        one-line summary of the frame rate, jitter and dropped frames
+        """
+        return (
+            f"{self.fps:.1f} fps (target {1_000_000_000 / self.frame_ns:.0f}), "
+            + f"jitter {self.jitter_ms:.2f} ms, {self.dropped} frames dropped"
+        )
+
+    def reset_stats(self) -> None:
+        """
+        start a new measurement window
+        """
+        self.frames = 0
+        self.dropped = 0
+        self._interval_sum = 0
+        self._interval_sq_sum = 0
+        self.last_ns = None
+        self._stats_start_ns = time.monotonic_ns()
@@ -9,20 +9,12 @@ and tweaked ever so slightly
 # SPDX-License-Identifier: MIT
 
 import time
-import board
-import busio
-from digitalio import DigitalInOut
-import neopixel
 import rtc
-from adafruit_esp32spi import adafruit_esp32spi
-from adafruit_esp32spi import adafruit_esp32spi_wifimanager
-import adafruit_ds3231
-
-try:
-    from _secrets import af_secrets as secrets
-except ImportError:
-    print("WiFi secrets are kept in secrets.py, please add them there!")
-    raise
+from retry import RetryError
+from runtime import Peripherals
+from tasks import TaskRunner
+from rtc_clock import pick_clock
+from time_sync import HttpTime, TimeSync
 
 def main():
     """
@@ -31,52 +23,31 @@ def main():
 
     print("ESP32 local time")
 
-    TIME_API = "http://worldtimeapi.org/api/ip"
-
-    esp32_cs = DigitalInOut(board.ESP_CS)
-    esp32_ready = DigitalInOut(board.ESP_BUSY)
-    esp32_reset = DigitalInOut(board.ESP_RESET)
-    spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-    esp = adafruit_esp32spi.ESP_SPIcontrol(spi, esp32_cs, esp32_ready, esp32_reset)
-    status_light = neopixel.NeoPixel(
-        board.NEOPIXEL, 1, brightness=0.2
-    )  # Uncomment for Most Boards
-    wifi = adafruit_esp32spi_wifimanager.ESPSPI_WiFiManager(esp, secrets, status_light)
-
-    i2c = board.I2C()
-    ds3231 = adafruit_ds3231.DS3231(i2c)
-    # the_rtc = rtc.RTC()
-
-    response = None
-    while True:
-        try:
-            print("Fetching json from", TIME_API)
-            response = wifi.get(TIME_API)
-            break
-        except OSError as e:
-            print("Failed to get data, retrying\n", e)
-            continue
-
-    json = response.json()
-    current_time = json["datetime"]
-    the_date, the_time = current_time.split("T")
-    year, month, mday = [int(x) for x in the_date.split("-")]
-    the_time = the_time.split(".")[0]
-    hours, minutes, seconds = [int(x) for x in the_time.split(":")]
-
-    # We can also fill in these extra nice things
-    year_day = json["day_of_year"]
-    week_day = json["day_of_week"]
-    is_dst = json["dst"]
-
-    now = time.struct_time(
-        (year, month, mday, hours, minutes, seconds, week_day, year_day, is_dst)
-    )
-    print(now)
-    ds3231.datetime = now
-    #the_rtc.datetime = now
+    # wifi (behind the shared HttpSession) and RTC, see runtime.py
+    hw = Peripherals()
+    # worldtimeapi.org's time sets the DS3231 (if there is one) and rtc.RTC(),
+    # see time_sync.py
+    sync = TimeSync(pick_clock(hw), HttpTime(hw.http, retry=hw.retry))
+
+    async def set_time(task):
+        # backs off between attempts and resets the wifi now and then, see retry.py
+        while True:
+            try:
+                await sync.sync(task)
+                return
+            except RetryError as e:
+                print(e)
+                await task.sleep(hw.retry.pause())
+
+    runner = TaskRunner()
+    runner.spawn("set_time", set_time)
+    runner.run()
+    print(sync.now())
+    print(sync.stats())
 
     print(time.localtime())
+    print(hw.http.stats())
+    print(hw.retry.stats())
 
 if __name__ == "__main__":
     main()
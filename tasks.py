@@ -0,0 +1,203 @@
+"""
+tasks.py
+asyncio main loop: buttons, sensors, network fetches and rendering each run
+as their own task and hand the CPU back between steps, so a slow sensor or
+a fetch in flight doesn't stall the others; every task's CPU time is counted
+    runner = TaskRunner()
+    runner.every("buttons", 0.005, poll_buttons)     # step() every 5 ms
+    runner.every("render", 1 / 30, render)
+    runner.spawn("fetch", fetch_weather)             # async fetch_weather(task)
+    runner.every("stats", 30, runner.print_stats, delay=30)
+    runner.run()
+needs the asyncio and adafruit_ticks libraries (circup install asyncio)
+"""
+import asyncio
+import json
+import time
+from json_fields import JsonFields
+from retry import Retry
+
+
+class Task:
+    """
+    one task's CPU accounting: everything between being resumed and the
+    next task.sleep() is charged to it
+    """
+
+    def __init__(self, name: str, interval: float = None):
+        self.name = name
+        self.periodic = interval is not None  # None for spawned tasks
+        self.interval_ns = int((interval or 0) * 1_000_000_000)  # 0: as often as possible
+        self.cpu_ns = 0
+        self.slices = 0
+        self.longest_ns = 0  # longest slice: how long it kept everyone else waiting
+        self.steps = 0
+        self.late = 0  # periodic slots missed
+        self.worst_gap_ns = 0  # longest time between two steps
+        self.done = False
+        self._resumed_ns = None
+
+    def resume(self) -> None:
+        """
+        start charging CPU time to this task
+        """
+        self._resumed_ns = time.monotonic_ns()
+
+    def charge(self) -> None:
+        """
+        stop charging, adding the slice since resume() to the totals
+        """
+        used = time.monotonic_ns() - self._resumed_ns
+        self.cpu_ns += used
+        self.slices += 1
+        self.longest_ns = max(self.longest_ns, used)
+
+    async def sleep(self, seconds: float = 0) -> None:
+        """
+        give the other tasks the CPU for at least seconds (0: just let them run)
+        """
+        self.charge()
+        await asyncio.sleep(seconds)
+        self.resume()
+
+
+async def _every(task: Task, step, delay: float) -> None:
+    """
+    call step() on task's interval, dropping slots it is too late for
+    """
+    task.resume()
+    if delay:
+        await task.sleep(delay)
+    deadline = last = time.monotonic_ns()
+    while True:
+        step()
+        task.steps += 1
+        deadline += task.interval_ns
+        now = time.monotonic_ns()
+        if task.steps > 1:
+            task.worst_gap_ns = max(task.worst_gap_ns, now - last)
+        last = now
+        if task.interval_ns and now - deadline >= task.interval_ns:
+            task.late += (now - deadline) // task.interval_ns
+            deadline = now
+        await task.sleep(max(0, deadline - now) / 1_000_000_000)
+
+
+async def _spawned(task: Task, function, args: tuple) -> None:
+    task.resume()
+    try:
+        await function(task, *args)
+    finally:
+        task.charge()
+        task.done = True
+
+
+class TaskRunner:
+    """
+    the tasks of one script, run together by run()
+    """
+
+    def __init__(self):
+        self.tasks = []
+        self._coroutines = []
+        self._running = []  # asyncio tasks, kept so they aren't collected
+        self._started_ns = None
+
+    def every(self, name: str, interval: float, step, delay: float = 0) -> Task:
+        """
+        call step() every interval seconds, the first time after delay
+        (interval 0 runs it whenever the other tasks let it, like a busy loop)
+        """
+        task = Task(name, interval)
+        self.tasks.append(task)
+        self._coroutines.append(_every(task, step, delay))
+        return task
+
+    def spawn(self, name: str, function, *args) -> Task:
+        """
+        run async function(task, *args) once, from run() or straight away
+        when called from a running task; it should await task.sleep()
+        between chunks of work so the other tasks keep running
+        """
+        task = Task(name)
+        self.tasks.append(task)
+        coroutine = _spawned(task, function, args)
+        if self._started_ns is None:
+            self._coroutines.append(coroutine)
+        else:
+            self._running.append(asyncio.create_task(coroutine))
+        return task
+
+    async def _main(self) -> None:
+        self._started_ns = time.monotonic_ns()
+        self._running = [asyncio.create_task(coroutine) for coroutine in self._coroutines]
+        self._coroutines = []
+        await asyncio.gather(*self._running)
+
+    def run(self) -> None:
+        """
+        run every task (normally forever)
+        """
+        asyncio.run(self._main())
+
+    def print_stats(self) -> None:
+        """
+        CPU time per task since run(), and how steady the periodic ones were
+        """
+        elapsed_ns = max(1, time.monotonic_ns() - self._started_ns)
+        busy_ns = 0
+        print(f"tasks after {elapsed_ns / 1_000_000_000:.1f} s:")
+        for task in self.tasks:
+            busy_ns += task.cpu_ns
+            line = (
+                f"  {task.name:<10} {task.cpu_ns / 1_000_000:9.1f} ms cpu "
+                + f"{100 * task.cpu_ns / elapsed_ns:5.1f}%, longest slice "
+                + f"{task.longest_ns / 1_000_000:6.1f} ms"
+            )
+            if task.periodic:
+                line += (
+                    f", {task.steps} steps, {task.late} late, worst gap "
+                    + f"{task.worst_gap_ns / 1_000_000:.1f} ms"
+                )
+            elif task.done:
+                line += ", done"
+            print(line)
+        idle_ns = max(0, elapsed_ns - busy_ns)
+        print(f"  {'idle':<10} {idle_ns / 1_000_000:9.1f} ms     {100 * idle_ns / elapsed_ns:5.1f}%")
+
+
+async def _read_json(task: Task, http, url: str, chunk_size: int, fields: tuple):
+    response = http.get(url)
+    try:
+        body = bytearray() if fields is None else JsonFields(fields)
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if fields is None:
+                body.extend(chunk)
+            elif body.feed(chunk):
+                break
+            await task.sleep()
+    finally:
+        response.close()
+    if fields is not None:
+        return body.result
+    return json.loads(str(body, "utf-8"))
+
+
+async def fetch_json(
+    task: Task, http, url: str, chunk_size: int = 256, fields: tuple = None, retry: Retry = None
+):
+    """
+    http.get(url) read in chunks with a task.sleep() between them, so other
+    tasks run while the body arrives (http.get() itself still blocks until
+    the headers are in)
+    http is an HttpSession (see http_session.py) or a bare wifi manager;
+    the response is closed either way, so its socket can be reused
+    failed attempts are retried by retry (see retry.py; pass the board's
+    shared one so its circuit breaker sees every fetch), which backs off
+    between them and resets http now and then; RetryError once it gives up
+    fields returns just those paths, see json_fields.py, parsing as the
+    chunks arrive and stopping once they are all in
+    """
+    if retry is None:
+        retry = Retry()
+    return await retry.call(task, _read_json, task, http, url, chunk_size, fields, reset=http.reset)
@@ -0,0 +1,179 @@
+"""
+time_sync.py
+keep the DS3231 (or, without one, the microcontroller's own rtc.RTC) set
+from the network in the background: every sync measures how far the clock
+drifted since it was last set and schedules the next one from that, and
+readings in between are corrected for the measured drift
+    sync = TimeSync(pick_clock(hw), HttpTime(hw.http, retry=hw.retry))   # see rtc_clock.py
+    runner.spawn("time sync", sync.run)
+    now = sync.now()      # struct_time, drift-corrected
+    print(sync.stats())   # syncs, last offset, drift in ppm, next sync
+"""
+# pylint: disable=import-error
+import time
+import rtc
+from lazy import LazyModule
+from retry import Retry, RetryError
+from tasks import fetch_json
+
+adafruit_ntp = LazyModule("adafruit_ntp")
+
+HOUR = 3600
+DAY = 24 * HOUR
+WORLDTIME_URL = "http://worldtimeapi.org/api/ip"  # local time for the IP's time zone
+RESOLUTION = 1  # the clocks count whole seconds, offsets this small can't be measured
+
+
+class HttpTime:
+    """
+    local time from worldtimeapi.org (time zone by IP address) through
+    fetch_json, only reading the fields it needs
+    """
+
+    def __init__(self, http, url: str = WORLDTIME_URL, retry: Retry = None):
+        self.http = http
+        self.url = url
+        self.retry = Retry() if retry is None else retry
+
+    async def now(self, task) -> tuple:
+        """
+        local time now: (seconds since the epoch, fraction of the second)
+        """
+        fields = await fetch_json(
+            task,
+            self.http,
+            self.url,
+            fields=("unixtime", "raw_offset", "dst_offset", "datetime"),
+            retry=self.retry,
+        )
+        # unixtime is whole seconds, the microseconds are in datetime
+        fraction = int(fields["datetime"][20:26]) / 1_000_000
+        return fields["unixtime"] + fields["raw_offset"] + fields["dst_offset"], fraction
+
+
+class NtpTime:
+    """
+    UTC plus tz_offset hours from an NTP server through adafruit_ntp; needs
+    a socketpool.SocketPool, so the S3's own radio
+    """
+
+    def __init__(self, pool, tz_offset: float = 0, server: str = "pool.ntp.org", retry: Retry = None):
+        self.retry = Retry() if retry is None else retry
+        self._ntp = adafruit_ntp.NTP(pool, server=server, tz_offset=tz_offset)
+
+    async def _read(self) -> tuple:
+        # datetime is whole seconds: on average half of one has gone by
+        return time.mktime(self._ntp.datetime), 0.5
+
+    async def now(self, task) -> tuple:
+        """
+        local time now: (seconds since the epoch, fraction of the second)
+        """
+        return await self.retry.call(task, self._read)
+
+
+class TimeSync:
+    """
+    clock (anything with a datetime struct_time, a DS3231 or rtc.RTC) set
+    from source (HttpTime or NtpTime) when it is more than RESOLUTION off;
+    syncs come as often as drifting tolerance seconds takes, between
+    min_interval and max_interval; rtc.RTC is set too, so time.localtime()
+    follows a DS3231
+    """
+
+    def __init__(
+        self,
+        clock,
+        source,
+        tolerance: float = 2.0,
+        min_interval: float = HOUR,
+        max_interval: float = 7 * DAY,
+    ):
+        self.clock = clock
+        self.source = source
+        self.tolerance = tolerance
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.system = None if isinstance(clock, rtc.RTC) else rtc.RTC()
+        self.syncs = 0
+        self.failures = 0  # syncs that gave up, see retry.py
+        self.offset = None  # clock minus source at the last sync, in seconds (a float)
+        self.drift = None  # clock error per second, once it has been measurable
+        self.next_interval = min_interval
+        self._set_at = None  # source time the clock was last set (or found right) at
+        # every offset measured and the time it built up over, pooled so
+        # the whole-second rounding of each one averages out
+        self._drifted = 0
+        self._measured = 0
+
+    def now(self) -> time.struct_time:
+        """
+        the clock's time, less the drift measured since it was set
+        """
+        seconds = time.mktime(self.clock.datetime)
+        if self.drift and self._set_at is not None:
+            seconds -= round(self.drift * (seconds - self._set_at))
+        return time.localtime(seconds)
+
+    async def sync(self, task) -> None:
+        """
+        read source, measure the clock against it, set the clock if it is
+        off and work out when to sync next; RetryError if source gives up
+        """
+        # epoch seconds stay ints: CircuitPython's floats can't hold them
+        true, fraction = await self.source.now(task)
+        # the clock reads whole seconds, on average half of one behind
+        self.offset = (time.mktime(self.clock.datetime) - true) + (0.5 - fraction)
+        if self._set_at is None:
+            # first sync: nothing to measure drift against yet
+            rate = None
+        else:
+            elapsed = max(1, true - self._set_at)
+            if abs(self.offset) > RESOLUTION:
+                self._drifted += self.offset
+                self._measured += elapsed
+                self.drift = self._drifted / self._measured
+            # a drift too small to see yet can only be under RESOLUTION / elapsed
+            rate = abs(self.drift) if self.drift else RESOLUTION / elapsed
+        if self._set_at is None or abs(self.offset) > RESOLUTION:
+            # left alone while it is right, so the next sync measures a longer
+            # stretch; set as the next second starts, which is when the clock
+            # starts counting it
+            await task.sleep(1 - fraction)
+            true += 1
+            now = time.localtime(true)
+            self.clock.datetime = now
+            if self.system is not None:
+                self.system.datetime = now
+            self._set_at = true
+        interval = self.min_interval if rate is None else self.tolerance / rate
+        self.next_interval = min(self.max_interval, max(self.min_interval, interval))
+        self.syncs += 1
+
+    async def run(self, task) -> None:
+        """
+        sync for ever, as a TaskRunner task
+        """
+        while True:
+            try:
+                await self.sync(task)
+                delay = self.next_interval
+            except RetryError as error:
+                self.failures += 1
+                print("time sync:", error)
+                delay = self.source.retry.pause()
+            await task.sleep(delay)
+
+    def stats(self) -> str:
+        """
+        one-line summary: syncs, the last offset and the drift measured
+        """
+        if self.drift:
+            drift = f"{self.drift * 1_000_000:+.1f} ppm"
+        else:
+            drift = "not measurable yet"
+        offset = "-" if self.offset is None else f"{self.offset:+.1f} s"
+        return (
+            f"time sync: {self.syncs} syncs ({self.failures} failed), last offset {offset}, "
+            + f"drift {drift}, next in {self.next_interval / HOUR:.1f} h"
+        )